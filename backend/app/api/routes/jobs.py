@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+from app.core.admission import AudioRejectedError, admit_audio
+from app.core.config import settings
+from app.core.jobs import (
+    FINISHED_STATUSES,
+    JobRunner,
+    get_job_runner,
+    new_job_id,
+)
+from app.core.uploads import UploadTooLargeError, spool_upload
+from app.db.database import get_db
+from app.models.transcription import Transcription, TranscriptionJob
+from app.schemas.transcription import JobResponse, TranscriptionResponse
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+router = APIRouter()
+
+# How often a long-poll re-reads the job row, in seconds
+POLL_INTERVAL = 0.25
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    audio_file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    runner: JobRunner = Depends(get_job_runner),
+):
+    """
+    Queue an uploaded audio file for transcription and return immediately.
+
+    The upload is written to disk and its audio header checked, a job row is stored, then one
+    of the local job workers transcribes it on the inference executor shared with /transcribe, shorter audio first under INFERENCE_SCHEDULER=sjf. Poll GET /jobs/{job_id} or long-poll GET /jobs/{job_id}/wait for the result.
+
+    Args:
+        audio_file (UploadFile): The audio file to be transcribed. Must be an audio file format.
+        db (Session): SQLAlchemy database session dependency injection.
+        runner (JobRunner): Job worker pool dependency injection.
+
+    Returns:
+        JobResponse: the queued job, with status 202
+
+    Raises:
+        HTTPException:
+            - 400: If the uploaded file is not an audio file, or its audio header is unreadable
+            - 413: If the upload is larger than UPLOAD_MAX_BYTES or longer than AUDIO_MAX_SECONDS
+            - 422: If the audio has more channels or a higher sample rate than allowed
+    """  # noqa: E501
+    if not audio_file.content_type.startswith("audio/"):
+        raise HTTPException(status_code=400, detail="File must be an audio file")  # noqa: E501
+
+    job_id = new_job_id()
+    upload = None
+    try:
+        # Spool the upload where the job will read it, hashing it on the way
+        upload = await spool_upload(
+            audio_file, path=runner.new_upload_path(job_id)
+        )
+        info = admit_audio(upload.path)
+        job = runner.create_job(
+            db,
+            job_id,
+            audio_file.filename,
+            upload.path,
+            upload.content_hash,
+            cost=info.cost,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioRejectedError as e:
+        upload.remove()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        if upload is not None:
+            upload.remove()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return _job_response(db, job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Return the state and timings of a job, with its transcription once done.
+
+    Raises:
+        HTTPException:
+            - 404: If there is no job with this id
+    """
+    return _job_response(db, _get_job_or_404(db, job_id))
+
+
+@router.get("/jobs/{job_id}/wait", response_model=JobResponse)
+async def wait_for_job(
+    job_id: str, timeout: float = 30, db: Session = Depends(get_db)
+):
+    """
+    Long-poll a job: respond as soon as it is done or failed, or after `timeout` seconds
+    (capped by JOB_MAX_WAIT_SECONDS) with its current state.
+
+    Raises:
+        HTTPException:
+            - 404: If there is no job with this id
+    """  # noqa: E501
+    deadline = time.monotonic() + min(timeout, settings.JOB_MAX_WAIT_SECONDS)
+    job = _get_job_or_404(db, job_id)
+    while job.status not in FINISHED_STATUSES:
+        if time.monotonic() >= deadline:
+            break
+        # Give the connection back to the pool while waiting
+        db.close()
+        await asyncio.sleep(POLL_INTERVAL)
+        job = _get_job_or_404(db, job_id)
+    return _job_response(db, job)
+
+
+def _get_job_or_404(db: Session, job_id: str) -> TranscriptionJob:
+    job = db.get(TranscriptionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _job_response(db: Session, job: TranscriptionJob) -> JobResponse:
+    response = JobResponse.model_validate(job)
+    if job.transcription_id is not None:
+        transcription = db.get(Transcription, job.transcription_id)
+        if transcription is not None:
+            response.transcription = TranscriptionResponse(
+                id=transcription.id,
+                filename=transcription.filename,
+                transcription_content=transcription.transcription_content,
+                original_filename=job.original_filename,
+                created_at=transcription.created_at,
+            )
+    return response
@@ -1,42 +1,171 @@
-import io
-import os
-from typing import List
-
+import json
+from typing import List, Literal, Optional
+
+from app.core.admission import AudioRejectedError, admit_audio
+from app.core.config import settings
+from app.core.executor import (
+    InferenceExecutor,
+    QueueFullError,
+    get_inference_executor,
+)
+from app.core.metrics import Metrics, get_metrics, metrics
+from app.core.model_registry import (
+    ModelRegistry,
+    get_model_registry,
+    iter_transcribe_file,
+    transcribe_file,
+    transcribe_files,
+)
+from app.core.result_cache import (
+    ResultCache,
+    get_result_cache,
+    make_cache_key,
+)
+from app.core.uploads import UploadTooLargeError, spool_upload
+from app.crud import (
+    add_transcription,
+    add_transcriptions,
+    get_segments,
+    iter_transcriptions,
+    list_transcriptions,
+    locate_segments,
+)
+from app.db import fts
 from app.db.database import get_db
+from app.db.writer import GroupCommitWriter, get_db_writer
 from app.models.transcription import Transcription
-from app.schemas.transcription import TranscriptionResponse
-from audio_processor.transcriber import AudioTranscriber
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from app.schemas.transcription import (
+    BatchFileResult,
+    BatchTranscriptionResponse,
+    SearchResult,
+    SegmentMatch,
+    SegmentResponse,
+    TranscriptionResponse,
+    TranscriptionSummary,
+)
+from audio_processor.decoding import MAX_BEAM_SIZE, DecodingOptions
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+# Page sizes for GET /transcriptions
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 @router.get("/health")
 def health_check():
     return {"status": "healthy"}
 
 
+@router.get("/model")
+def model_info(registry: ModelRegistry = Depends(get_model_registry)):
+    """
+    Report the shared Whisper model's load state, load time and resident size.
+    """  # noqa: E501
+    return registry.stats()
+
+
+@router.get("/executor")
+def executor_info(
+    executor: InferenceExecutor = Depends(get_inference_executor),
+):
+    """
+    Report inference pool occupancy and queue-wait/run time per job, for sizing workers.
+    """  # noqa: E501
+    return executor.stats()
+
+
+@router.get("/cache")
+def cache_info(cache: ResultCache = Depends(get_result_cache)):
+    """
+    Report result cache hit/miss counters and in-memory LRU usage.
+    """
+    return cache.stats()
+
+
+@router.get("/metrics")
+def metrics_info(
+    service_metrics: Metrics = Depends(get_metrics),
+    registry: ModelRegistry = Depends(get_model_registry),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+):
+    """
+    Report per-stage latency, audio duration and real-time factor histograms, queue depth,
+    in-flight requests, model load time and cache hit rate in the Prometheus text format.
+    """  # noqa: E501
+    return Response(
+        service_metrics.render(executor, registry, cache),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def create_transcription(
-    audio_file: UploadFile = File(...), db: Session = Depends(get_db)
+    response: Response,
+    audio_file: UploadFile = File(...),
+    profile: Optional[Literal["greedy", "beam", "accurate"]] = Form(None),
+    beam_size: Optional[int] = Form(None, ge=1, le=MAX_BEAM_SIZE),
+    language: Optional[str] = Form(None),
+    task: Optional[Literal["transcribe", "translate"]] = Form(None),
+    temperature_fallback: Optional[bool] = Form(None),
+    max_tokens_per_second: Optional[float] = Form(None, ge=0),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    writer: Optional[GroupCommitWriter] = Depends(get_db_writer),
 ):
     """
     Process and transcribe an uploaded audio file, storing the transcription in the database.
 
     This endpoint handles audio file upload, transcription, and storage. It includes duplicate
     filename handling by appending incremental numbers to filenames that already exist.
+    Byte-identical audio already transcribed with the same model and decoding options is
+    served from the result cache without running Whisper again, while still creating a new
+    filename record.
+
+    The optional decoding fields override the deployment's DECODING_* settings for this
+    upload; see audio_processor.decoding.
 
     Args:
         audio_file (UploadFile): The audio file to be transcribed. Must be an audio file format.
+        profile (str): "greedy", "beam" or "accurate" search settings
+        beam_size (int): Beams for beam search, 1 for greedy
+        language (str): Spoken language code or name, e.g. "en", which skips language detection
+        task (str): "transcribe", or "translate" into English
+        temperature_fallback (bool): Re-decode windows that look like repetition loops by
+            sampling at rising temperatures
+        max_tokens_per_second (float): Token budget per second of audio, 0 for no cap
         db (Session): SQLAlchemy database session dependency injection.
+        registry (ModelRegistry): Shared model registry dependency injection.
+        executor (InferenceExecutor): Bounded inference pool dependency injection.
+        cache (ResultCache): Content-hash result cache dependency injection.
+        writer (GroupCommitWriter): Group-commit writer when DB_GROUP_COMMIT is enabled.
 
     Returns:
         TranscriptionResponse: transcription object with all fields
 
     Raises:
         HTTPException:
-            - 400: If the uploaded file is not an audio file
+            - 400: If the uploaded file is not an audio file, its audio header is unreadable, or
+              the decoding options are invalid
+            - 413: If the upload is larger than UPLOAD_MAX_BYTES or longer than AUDIO_MAX_SECONDS
+            - 422: If the audio has more channels or a higher sample rate than allowed
+            - 503: If the inference queue is full, with a Retry-After header
             - 500: If transcription fails or other server-side errors occur
     """  # noqa: E501
     # Check if file is an audio file
@@ -44,31 +173,65 @@ async def create_transcription(
     if not audio_file.content_type.startswith("audio/"):
         raise HTTPException(status_code=400, detail="File must be an audio file")  # noqa: E501
 
-    try:
-        # Initialize the transcriber
-        transcriber = AudioTranscriber()
-
-        # Read the uploaded file
-        contents = await audio_file.read()
-        audio_wav = io.BytesIO(contents)
-
-        # Use process_audio_object to handle transcription
-        text = transcriber.process_audio_object(audio_wav)
+    decoding = _decoding_options(
+        registry,
+        profile=profile,
+        beam_size=beam_size,
+        language=language,
+        task=task,
+        temperature_fallback=temperature_fallback,
+        max_tokens_per_second=max_tokens_per_second,
+    )
 
-        if text is None:
-            raise HTTPException(status_code=500, detail="Failed to transcribe audio")  # noqa: E501
+    upload = None
+    try:
+        # Spool the upload to disk, hashing it as it arrives, and check its
+        # header before it can take a worker
+        upload = await spool_upload(audio_file)
+        info = admit_audio(upload.path)
+        content_hash = upload.content_hash
+        cache_key = make_cache_key(
+            content_hash, registry.model_name, decoding.cache_params()
+        )
 
-        # Handle duplicate filename
+        text = cache.get(db, cache_key)
+        cached = text is not None
+        if cached:
+            response.headers["X-Cache"] = "HIT"
+            segments = cache.get_segments(db, cache_key)
+        else:
+            # Decode, resample and transcribe on the inference pool so the
+            # event loop keeps serving other requests meanwhile
+            (text, segments), waited, ran = await executor.run(
+                transcribe_file,
+                registry,
+                upload.path,
+                decoding,
+                content_hash,
+                cost=info.cost,
+            )
+            response.headers["X-Cache"] = "MISS"
+            response.headers["Server-Timing"] = (
+                f"queue;dur={waited * 1000:.1f}, "
+                f"inference;dur={ran * 1000:.1f}"
+            )
+
+            if text is None:
+                raise HTTPException(status_code=500, detail="Failed to transcribe audio")  # noqa: E501
+
+        # Save to database, handling duplicate filenames
         original_filename = audio_file.filename
-        final_filename = _get_unique_filename(db, original_filename)
-
-        # Save to database
-        db_transcription = Transcription(
-            filename=final_filename, transcription_content=text
+        db_transcription = await _store_result(
+            db,
+            writer,
+            cache,
+            None if cached else cache_key,
+            content_hash,
+            registry.model_name,
+            original_filename,
+            text,
+            segments,
         )
-        db.add(db_transcription)
-        db.commit()
-        db.refresh(db_transcription)
 
         return TranscriptionResponse(
             id=db_transcription.id,
@@ -78,80 +241,653 @@ async def create_transcription(
             created_at=db_transcription.created_at,
         )
 
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/transcriptions", response_model=List[TranscriptionResponse])
-def get_transcriptions(db: Session = Depends(get_db)):
+    finally:
+        if upload is not None:
+            upload.remove()
+
+
+@router.post("/transcribe/batch", response_model=BatchTranscriptionResponse)
+async def create_transcriptions(
+    response: Response,
+    audio_files: List[UploadFile] = File(...),
+    profile: Optional[Literal["greedy", "beam", "accurate"]] = Form(None),
+    beam_size: Optional[int] = Form(None, ge=1, le=MAX_BEAM_SIZE),
+    language: Optional[str] = Form(None),
+    task: Optional[Literal["transcribe", "translate"]] = Form(None),
+    temperature_fallback: Optional[bool] = Form(None),
+    max_tokens_per_second: Optional[float] = Form(None, ge=0),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    writer: Optional[GroupCommitWriter] = Depends(get_db_writer),
+):
     """
-    Retrieve all transcriptions from the database.
+    Transcribe many uploaded audio files in one request, storing every transcription in one transaction.
 
-    This endpoint returns a list of all transcription records, including their IDs,
-    filenames, transcribed content, and creation timestamps.
+    The files are decoded concurrently and all their 30s windows go through Whisper together,
+    so short files share forward passes, as one job on the inference pool, scheduled by their
+    total duration. Each file's audio header is checked as for POST /transcribe. Files already in
+    the result cache, and repeats of the same audio within the batch, are not transcribed
+    again. Filenames are made unique as for POST /transcribe, reserved for the whole batch
+    at once. A file that is not audio, is too large or too long, or cannot be decoded fails on
+    its own, with an error in its result, without failing the others.
 
     Args:
+        audio_files (List[UploadFile]): The audio files, at most BATCH_UPLOAD_MAX_FILES
+        profile, beam_size, language, task, temperature_fallback, max_tokens_per_second:
+            Decoding options for every file, as for POST /transcribe
         db (Session): SQLAlchemy database session dependency injection.
+        registry (ModelRegistry): Shared model registry dependency injection.
+        executor (InferenceExecutor): Bounded inference pool dependency injection.
+        cache (ResultCache): Content-hash result cache dependency injection.
+        writer (GroupCommitWriter): Group-commit writer when DB_GROUP_COMMIT is enabled.
 
     Returns:
-        List[TranscriptionResponse]: A list of transcription objects
+        BatchTranscriptionResponse: each file's stored transcription or error, in upload order
+
+    Raises:
+        HTTPException:
+            - 400: If there are more than BATCH_UPLOAD_MAX_FILES files, or the decoding options are invalid
+            - 503: If the inference queue is full, with a Retry-After header
+            - 500: If storing the transcriptions fails
     """  # noqa: E501
-    transcriptions = db.query(Transcription).all()
-    return transcriptions
+    if len(audio_files) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_UPLOAD_MAX_FILES} files per batch",  # noqa: E501
+        )
+    decoding = _decoding_options(
+        registry,
+        profile=profile,
+        beam_size=beam_size,
+        language=language,
+        task=task,
+        temperature_fallback=temperature_fallback,
+        max_tokens_per_second=max_tokens_per_second,
+    )
+
+    results = [BatchFileResult(original_filename=f.filename) for f in audio_files]  # noqa: E501
+    uploads = [None] * len(audio_files)
+    durations = [0.0] * len(audio_files)
+    try:
+        for i, audio_file in enumerate(audio_files):
+            if not audio_file.content_type.startswith("audio/"):
+                results[i].error = "File must be an audio file"
+                continue
+            try:
+                uploads[i] = await spool_upload(audio_file)
+                durations[i] = admit_audio(uploads[i].path).duration
+            except (UploadTooLargeError, AudioRejectedError) as e:
+                results[i].error = str(e)
+                if uploads[i] is not None:
+                    uploads[i].remove()
+                    uploads[i] = None
+
+        # (text, segments, cache key to store them under or None) per file
+        outcomes = {}
+        # Files missing from the result cache by cache key, so the same
+        # audio uploaded twice is transcribed once
+        pending = {}
+        for i, upload in enumerate(uploads):
+            if upload is None:
+                continue
+            cache_key = make_cache_key(
+                upload.content_hash,
+                registry.model_name,
+                decoding.cache_params(),
+            )
+            text = cache.get(db, cache_key)
+            if text is not None:
+                outcomes[i] = (text, cache.get_segments(db, cache_key), None)
+                results[i].cached = True
+            else:
+                pending.setdefault(cache_key, []).append(i)
+
+        if pending:
+            first = [indices[0] for indices in pending.values()]
+            transcribed, waited, ran = await executor.run(
+                transcribe_files,
+                registry,
+                [uploads[i].path for i in first],
+                decoding,
+                [uploads[i].content_hash for i in first],
+                settings.BATCH_UPLOAD_DECODE_WORKERS,
+                cost=sum(durations[i] for i in first),
+            )
+            response.headers["Server-Timing"] = (
+                f"queue;dur={waited * 1000:.1f}, "
+                f"inference;dur={ran * 1000:.1f}"
+            )
+            for (cache_key, indices), outcome in zip(
+                pending.items(), transcribed
+            ):
+                for i in indices:
+                    if isinstance(outcome, Exception):
+                        results[i].error = f"Failed to transcribe audio: {outcome}"  # noqa: E501
+                    else:
+                        text, segments = outcome
+                        # Only the first copy adds the cache entry
+                        key = cache_key if i == indices[0] else None
+                        outcomes[i] = (text, segments, key)
+
+        stored = sorted(outcomes)
+        entries = [
+            (
+                outcomes[i][2],
+                uploads[i].content_hash,
+                results[i].original_filename,
+                outcomes[i][0],
+                outcomes[i][1],
+            )
+            for i in stored
+        ]
+        rows = await _store_results(
+            db, writer, cache, registry.model_name, entries
+        )
+        for i, row in zip(stored, rows):
+            results[i].transcription = TranscriptionResponse(
+                id=row.id,
+                filename=row.filename,
+                transcription_content=row.transcription_content,
+                original_filename=results[i].original_filename,
+                created_at=row.created_at,
+            )
+
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for upload in uploads:
+            if upload is not None:
+                upload.remove()
+
+    return BatchTranscriptionResponse(
+        results=results,
+        succeeded=len(rows),
+        failed=len(results) - len(rows),
+    )
 
 
-@router.get("/search")
-def search_transcriptions(query: str, db: Session = Depends(get_db)):
+@router.post("/transcribe/stream")
+async def stream_transcription(
+    audio_file: UploadFile = File(...),
+    profile: Optional[Literal["greedy", "beam", "accurate"]] = Form(None),
+    beam_size: Optional[int] = Form(None, ge=1, le=MAX_BEAM_SIZE),
+    language: Optional[str] = Form(None),
+    task: Optional[Literal["transcribe", "translate"]] = Form(None),
+    temperature_fallback: Optional[bool] = Form(None),
+    max_tokens_per_second: Optional[float] = Form(None, ge=0),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    writer: Optional[GroupCommitWriter] = Depends(get_db_writer),
+):
     """
-    Search for transcriptions by filename using a case-insensitive partial match.
+    Transcribe an uploaded audio file, streaming partial transcripts as server-sent events.
 
-    This endpoint performs a fuzzy search on transcription filenames, returning all records
-    where the filename contains the search query string (case-insensitive).
+    A `partial` event is sent each time a 30s window finishes decoding, carrying the stitched
+    transcript so far. Once the transcription is stored, a `done` event carries the saved
+    record; if anything fails after the stream has started, an `error` event is sent instead.
+    The optional decoding fields are those of POST /transcribe.
 
     Args:
-        query (str): The search string to match against filenames
+        audio_file (UploadFile): The audio file to be transcribed. Must be an audio file format.
+        profile (str): "greedy", "beam" or "accurate" search settings
+        beam_size (int): Beams for beam search, 1 for greedy
+        language (str): Spoken language code or name, e.g. "en", which skips language detection
+        task (str): "transcribe", or "translate" into English
+        temperature_fallback (bool): Re-decode windows that look like repetition loops by
+            sampling at rising temperatures
+        max_tokens_per_second (float): Token budget per second of audio, 0 for no cap
         db (Session): SQLAlchemy database session dependency injection.
+        registry (ModelRegistry): Shared model registry dependency injection.
+        executor (InferenceExecutor): Bounded inference pool dependency injection.
+        cache (ResultCache): Content-hash result cache dependency injection.
+        writer (GroupCommitWriter): Group-commit writer when DB_GROUP_COMMIT is enabled.
 
     Returns:
-        List[Transcription]: A list of matching transcription objects
+        StreamingResponse: text/event-stream of partial, done and error events
 
-    Example:
-        A search query of "audio" will match filenames like "my_audio_1.mp3",
-        "AUDIO_file_2.mp3", etc.
+    Raises:
+        HTTPException:
+            - 400: If the uploaded file is not an audio file, its audio header is unreadable, or
+              the decoding options are invalid
+            - 413: If the upload is larger than UPLOAD_MAX_BYTES or longer than AUDIO_MAX_SECONDS
+            - 422: If the audio has more channels or a higher sample rate than allowed
+            - 503: If the inference queue is full, with a Retry-After header
     """  # noqa: E501
-    transcriptions = (
-        db.query(Transcription).filter(Transcription.filename.ilike(f"%{query}%")).all()  # noqa: E501
+    if not audio_file.content_type.startswith("audio/"):
+        raise HTTPException(status_code=400, detail="File must be an audio file")  # noqa: E501
+
+    decoding = _decoding_options(
+        registry,
+        profile=profile,
+        beam_size=beam_size,
+        language=language,
+        task=task,
+        temperature_fallback=temperature_fallback,
+        max_tokens_per_second=max_tokens_per_second,
     )
-    return transcriptions
 
+    original_filename = audio_file.filename
+    try:
+        upload = await spool_upload(audio_file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        info = admit_audio(upload.path)
+    except AudioRejectedError as e:
+        upload.remove()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    content_hash = upload.content_hash
+    cache_key = make_cache_key(
+        content_hash, registry.model_name, decoding.cache_params()
+    )
+    cached = cache.get(db, cache_key)
+    segments = (
+        cache.get_segments(db, cache_key) if cached is not None else []
+    )
+    # Reject before the 200 and the first event go out
+    if cached is None and executor.is_full:
+        upload.remove()
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription queue is full, please retry later",
+            headers={"Retry-After": str(executor.retry_after)},
+        )
 
-def _get_unique_filename(db: Session, filename: str) -> str:
+    async def events():
+        nonlocal segments
+        try:
+            text = cached
+            if text is not None:
+                yield _sse_event("partial", {"window": 0, "transcript": text})
+            else:
+                window = 0
+                async for text, decoded in executor.stream(
+                    iter_transcribe_file,
+                    registry,
+                    upload.path,
+                    decoding,
+                    content_hash,
+                    cost=info.cost,
+                ):
+                    if decoded is not None:
+                        segments = decoded
+                        continue
+                    yield _sse_event(
+                        "partial", {"window": window, "transcript": text}
+                    )
+                    window += 1
+
+            db_transcription = await _store_result(
+                db,
+                writer,
+                cache,
+                cache_key if cached is None else None,
+                content_hash,
+                registry.model_name,
+                original_filename,
+                text,
+                segments,
+            )
+            record = TranscriptionResponse(
+                id=db_transcription.id,
+                filename=db_transcription.filename,
+                transcription_content=db_transcription.transcription_content,
+                original_filename=original_filename,
+                created_at=db_transcription.created_at,
+            )
+            yield _sse_event("done", record.model_dump(mode="json"))
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+        finally:
+            upload.remove()
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _decoding_options(registry: ModelRegistry, **overrides) -> DecodingOptions:
     """
-    Helper function to generate a unique filename by appending _1, _2, etc. if the filename already exists
+    Helper function to apply a request's decoding fields over the registry's defaults,
+    answering 400 for invalid ones
     """  # noqa: E501
-    # Split the filename into base name and extension
-    # For example: "audio.mp3" -> ("audio", ".mp3")
-    name, ext = os.path.splitext(filename)
-
-    # Get all filenames that start with the base name
-    base_pattern = f"{name}_%{ext}"
-    existing_files = (
-        db.query(Transcription.filename)
-        .filter(Transcription.filename.like(base_pattern))
-        .all()
+    try:
+        return registry.decoding.override(**overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _add_result(
+    db: Session,
+    cache: ResultCache,
+    cache_key: Optional[str],
+    content_hash: str,
+    model_name: str,
+    original_filename: str,
+    text: str,
+    segments: Optional[list[dict]] = None,
+):
+    if cache_key is not None:
+        cache.put(db, cache_key, content_hash, model_name, text, segments)
+    return add_transcription(
+        db, original_filename, text, content_hash, segments
     )
 
-    if not existing_files:
-        return f"{name}_1{ext}"
 
-    # Extract numbers from filenames and find max
-    max_counter = 0
-    for (filename,) in existing_files:
+async def _store_result(
+    db: Session, writer: Optional[GroupCommitWriter], *args
+):
+    """
+    Helper function to store a new transcription, and its cache entry when cache_key is given,
+    in one transaction: the request's own, or a batch shared with concurrent requests when the
+    group-commit writer is enabled
+    """  # noqa: E501
+    with metrics.timed("db_commit"):
+        if writer is not None:
+            return await writer.write(_add_result, *args)
+        db_transcription = _add_result(db, *args)
+        db.commit()
+        db.refresh(db_transcription)
+    return db_transcription
+
+
+def _add_results(
+    db: Session,
+    cache: ResultCache,
+    model_name: str,
+    entries: list[tuple],
+):
+    """
+    Helper function to add many results, given as (cache_key, content_hash, original_filename,
+    text, segments) tuples, adding a cache entry for those with a cache_key
+    """  # noqa: E501
+    for cache_key, content_hash, _, text, segments in entries:
+        if cache_key is not None:
+            cache.put(db, cache_key, content_hash, model_name, text, segments)
+    return add_transcriptions(
+        db,
+        [
+            (original_filename, text, content_hash, segments)
+            for _, content_hash, original_filename, text, segments in entries
+        ],
+    )
+
+
+async def _store_results(
+    db: Session, writer: Optional[GroupCommitWriter], *args
+):
+    """
+    Helper function to store many transcriptions and their cache entries in one transaction,
+    as _store_result does one
+    """  # noqa: E501
+    with metrics.timed("db_commit"):
+        if writer is not None:
+            return await writer.write(_add_results, *args)
+        rows = _add_results(db, *args)
+        ids = [row.id for row in rows]
+        db.commit()
+        # Reload the committed rows with one query instead of a refresh each
+        db.scalars(
+            select(Transcription).where(Transcription.id.in_(ids))
+        ).all()
+    return rows
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/transcriptions", response_model=List[TranscriptionSummary])
+def get_transcriptions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    order: Literal["oldest", "newest"] = "oldest",
+    content: Literal["full", "truncate", "none"] = "full",
+    content_chars: int = Query(200, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve transcriptions, oldest first unless order is "newest".
+
+    Without cursor or limit every transcription is returned, as clients that predate
+    paging expect. With either, a page of at most limit rows (DEFAULT_PAGE_SIZE if only
+    a cursor is given) is returned; pages are keyed on (created_at, id), so fetching any
+    page costs the same however deep it is. When more rows follow, the X-Next-Cursor
+    header holds the cursor to pass back, with the same order, for the next page.
+
+    Args:
+        cursor (str): Cursor from a previous page's X-Next-Cursor header; omit for the first page
+        limit (int): Maximum number of transcriptions in the page
+        order (str): "oldest" or "newest" first
+        content (str): "full" transcripts, the first content_chars characters ("truncate"),
+            or no transcript at all ("none")
+        content_chars (int): Length of truncated transcripts
+        db (Session): SQLAlchemy database session dependency injection.
+
+    Returns:
+        List[TranscriptionSummary]: A list of transcription objects
+
+    Raises:
+        HTTPException:
+            - 400: If the cursor is malformed
+    """  # noqa: E501
+    if limit is None and cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+    try:
+        rows, next_cursor = list_transcriptions(
+            db, cursor, limit, content, content_chars, order == "newest"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@router.get("/transcriptions/export")
+def export_transcriptions(
+    content: Literal["full", "truncate", "none"] = "full",
+    content_chars: int = Query(200, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream every transcription as newline-delimited JSON, oldest first.
+
+    Rows are read from the database cursor in batches as the response is written, so a
+    full dump runs in constant memory.
+
+    Args:
+        content (str): "full", "truncate" or "none", as for GET /transcriptions
+        content_chars (int): Length of truncated transcripts
+        db (Session): SQLAlchemy database session dependency injection.
+
+    Returns:
+        StreamingResponse: application/x-ndjson, one transcription object per line
+    """  # noqa: E501
+
+    def lines():
         try:
-            # Extract number between last underscore and extension
-            number = int(filename.rsplit("_", 1)[1].replace(ext, ""))
-            max_counter = max(max_counter, number)
-        except (ValueError, IndexError):
-            continue
+            for row in iter_transcriptions(db, content, content_chars):
+                summary = TranscriptionSummary.model_validate(row)
+                yield summary.model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": 'attachment; filename="transcriptions.ndjson"'  # noqa: E501
+        },
+    )
+
+
+@router.get(
+    "/transcriptions/{transcription_id}/segments",
+    response_model=List[SegmentResponse],
+)
+def get_transcription_segments(
+    transcription_id: int,
+    start: float = Query(0.0, ge=0),
+    end: Optional[float] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the timestamped segments of a transcription overlapping a time range, in order.
+
+    Segments come from Whisper's timestamp tokens, in seconds from the start of the original
+    audio. The lookup uses the (transcription_id, start) index, so a short range of a long
+    recording reads only the segments around it.
+
+    Args:
+        transcription_id (int): The transcription's id
+        start (float): Start of the range in seconds
+        end (float): End of the range in seconds; omit for the end of the audio
+        db (Session): SQLAlchemy database session dependency injection.
+
+    Returns:
+        List[SegmentResponse]: Segments with start, end and text; empty when the
+        transcription was stored without timestamps
+
+    Raises:
+        HTTPException:
+            - 404: If the transcription does not exist
+    """  # noqa: E501
+    _get_transcription_or_404(db, transcription_id)
+    return get_segments(db, transcription_id, start, end)
+
+
+@router.get(
+    "/transcriptions/{transcription_id}/locate",
+    response_model=List[SegmentMatch],
+)
+def locate_in_transcription(
+    transcription_id: int,
+    query: str,
+    prefix: bool = True,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """
+    Find where words are spoken in a transcription, returning the segments that contain them.
+
+    Words are matched as GET /search matches them, with the same full-text tokenizer, as
+    prefixes unless prefix is false. Segments matching the most query words come first,
+    earlier segments first among equals.
+
+    Args:
+        transcription_id (int): The transcription's id
+        query (str): The words to look for
+        prefix (bool): Match words as prefixes
+        limit (int): Maximum number of segments, 1 to 100
+        db (Session): SQLAlchemy database session dependency injection.
+
+    Returns:
+        List[SegmentMatch]: Matching segments with the number of query words each matched
 
-    return f"{name}_{max_counter + 1}{ext}"
+    Raises:
+        HTTPException:
+            - 404: If the transcription does not exist
+    """  # noqa: E501
+    _get_transcription_or_404(db, transcription_id)
+    return [
+        SegmentMatch(
+            id=segment.id,
+            start=segment.start,
+            end=segment.end,
+            text=segment.text,
+            matched=matched,
+        )
+        for segment, matched in locate_segments(
+            db, transcription_id, query, prefix=prefix, limit=limit
+        )
+    ]
+
+
+def _get_transcription_or_404(
+    db: Session, transcription_id: int
+) -> Transcription:
+    db_transcription = db.get(Transcription, transcription_id)
+    if db_transcription is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return db_transcription
+
+
+@router.get("/search", response_model=List[SearchResult])
+def search_transcriptions(
+    response: Response,
+    query: str,
+    scope: Literal["all", "filename", "content"] = "all",
+    prefix: bool = True,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over transcription filenames and transcript text, best match first.
+
+    Every word of the query must match, case-insensitively. With prefix (the default) a
+    word also matches longer words starting with it. Results are ranked with BM25, a
+    filename match counting more than the same word in the transcript, and served from
+    the transcription_fts index instead of a full table scan. Every match is ranked unless
+    SEARCH_RANK_CANDIDATES is set, in which case only that many of the newest are, so words
+    found in most rows stay fast, and a response that left older matches out carries an
+    X-Search-Truncated: true header.
+
+    Args:
+        response (Response): The response, to mark truncated results on
+        query (str): The words to search for
+        scope (str): Search filenames, transcript text ("content"), or both ("all")
+        prefix (bool): Match words as prefixes
+        limit (int): Maximum number of results, 1 to 500
+        offset (int): Number of results to skip, for paging
+        db (Session): SQLAlchemy database session dependency injection.
+
+    Returns:
+        List[SearchResult]: Matching transcriptions with their BM25 rank, a snippet of the
+        transcript and the filename with matches wrapped in <mark> tags
+
+    Example:
+        A search query of "audio" will match filenames like "my_audio_1.mp3",
+        "AUDIO_file_2.mp3", "audiobook.mp3", and transcripts mentioning "audio".
+    """  # noqa: E501
+    candidates = settings.SEARCH_RANK_CANDIDATES
+    if candidates and fts.more_matches_than(
+        db, query, candidates, scope, prefix
+    ):
+        response.headers["X-Search-Truncated"] = "true"
+    return fts.search(
+        db,
+        query,
+        scope=scope,
+        prefix=prefix,
+        limit=limit,
+        offset=offset,
+        rank_candidates=candidates,
+    )
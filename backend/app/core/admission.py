@@ -0,0 +1,114 @@
+"""
+Admission of uploads by their audio header, and the order queued work
+runs in.
+
+An upload's duration, channels and sample rate are read from its header
+with sf.info, without decoding it, so audio over the AUDIO_MAX_* limits
+is refused before it takes a worker, and its duration can stand in for
+the cost of transcribing it. Queued work then runs shortest job first,
+with aging: a job is ordered by its arrival time pushed back by its cost
+divided by INFERENCE_SJF_AGING, so a short clip overtakes long files that
+arrived shortly before it, but not ones that have already waited for
+longer than their cost warrants, and nothing waits forever.
+"""
+
+from dataclasses import dataclass
+
+import soundfile as sf
+from app.core.config import settings
+
+
+class AudioRejectedError(Exception):
+    """The audio is unreadable or over the AUDIO_MAX_* limits"""
+
+    def __init__(self, detail: str, status_code: int = 413):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+@dataclass
+class AudioInfo:
+    """What the header of an audio file says about it"""
+
+    duration: float
+    channels: int
+    sampling_rate: int
+    format: str
+
+    @property
+    def cost(self) -> float:
+        """Estimated cost of transcribing the file, in seconds of audio"""
+        return self.duration
+
+
+def probe_audio(path: str) -> AudioInfo:
+    """
+    Read an audio file's header
+
+    Raises:
+        AudioRejectedError: If the header cannot be read, with status 400
+    """
+    try:
+        info = sf.info(path)
+    except Exception as e:
+        raise AudioRejectedError(
+            f"Could not read the audio: {e}", status_code=400
+        )
+    return AudioInfo(
+        duration=info.duration,
+        channels=info.channels,
+        sampling_rate=info.samplerate,
+        format=info.format,
+    )
+
+
+def admit_audio(path: str) -> AudioInfo:
+    """
+    Read an audio file's header and check it against the AUDIO_MAX_*
+    settings, 0 meaning no limit
+
+    Raises:
+        AudioRejectedError: If the header is unreadable (400) or the audio
+            is too long (413) or has too many channels or too high a
+            sample rate (422)
+    """
+    info = probe_audio(path)
+    max_seconds = settings.AUDIO_MAX_SECONDS
+    if max_seconds and info.duration > max_seconds:
+        raise AudioRejectedError(
+            f"Audio is {info.duration:.0f}s long, the limit is "
+            f"{max_seconds:.0f}s"
+        )
+    max_channels = settings.AUDIO_MAX_CHANNELS
+    if max_channels and info.channels > max_channels:
+        raise AudioRejectedError(
+            f"Audio has {info.channels} channels, the limit is {max_channels}",
+            status_code=422,
+        )
+    max_rate = settings.AUDIO_MAX_SAMPLE_RATE
+    if max_rate and info.sampling_rate > max_rate:
+        raise AudioRejectedError(
+            f"Audio is sampled at {info.sampling_rate}Hz, the limit is "
+            f"{max_rate}Hz",
+            status_code=422,
+        )
+    return info
+
+
+def scheduling_key(
+    arrived_at: float,
+    cost: float | None,
+    scheduler: str = "sjf",
+    aging: float = 5.0,
+) -> float:
+    """
+    Sort key of a job that arrived at arrived_at, in seconds on any clock
+    shared by the jobs compared, lowest first. Under "fifo" it is the
+    arrival time; under "sjf" the arrival time plus cost / aging, aging
+    being the seconds of audio a job's cost is forgiven per second it
+    waits. Jobs of unknown cost are treated as free.
+    """
+    if scheduler == "fifo" or not cost:
+        return arrived_at
+    return arrived_at + cost / aging
@@ -41,6 +41,148 @@ class Settings(BaseSettings):
         ]
 
     PROJECT_NAME: str
+    # Level of the application's logs; DEBUG adds per-file details such as
+    # audio format and VAD results
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+
+    # Whisper checkpoint shared by every request in this worker
+    WHISPER_MODEL_ID: str = "openai/whisper-tiny"
+    # Load the model during startup instead of on the first upload
+    MODEL_PRELOAD: bool = True
+    # Run a short silent clip through the model after loading
+    MODEL_WARMUP: bool = True
+
+    # API worker processes started by app.serve, each with its own
+    # executor and caches; fp32 weights are memory-mapped and shared
+    SERVER_WORKERS: int = 1
+
+    # Pool that runs inference off the event loop. "process" gives each
+    # worker its own model copy and sidesteps the GIL for decode/resample.
+    INFERENCE_EXECUTOR: Literal["thread", "process"] = "thread"
+    INFERENCE_WORKERS: int = 1
+    # Uploads allowed to wait for a worker before we answer 503
+    INFERENCE_QUEUE_SIZE: int = 8
+    # Minimum Retry-After, in seconds, sent with a 503
+    INFERENCE_RETRY_AFTER: int = 5
+    # Order in which queued uploads and jobs get a worker: "fifo", or
+    # "sjf", shortest audio first, see app.core.admission
+    INFERENCE_SCHEDULER: Literal["fifo", "sjf"] = "sjf"
+    # Seconds of audio a queued job's cost is forgiven per second it waits
+    # under "sjf"; lower favours short clips more, long files wait longer
+    INFERENCE_SJF_AGING: float = 5.0
+
+    # Cross-request batching of generate calls; 1 disables it. Only useful
+    # with INFERENCE_WORKERS >= BATCH_MAX_SIZE in thread mode, since each
+    # worker contributes at most one request to a batch.
+    BATCH_MAX_SIZE: int = 1
+    # How long the first request in a batch waits for company
+    BATCH_MAX_WAIT_MS: int = 10
+
+    # Reuse transcriptions of byte-identical uploads
+    RESULT_CACHE_ENABLED: bool = True
+    # Budget of the in-memory LRU in front of the transcription_cache table
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Uploads larger than this are rejected with 413, 0 for no limit
+    UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    # Where uploads are spooled while they are transcribed; unset for the
+    # system's temporary directory
+    UPLOAD_SPOOL_DIR: str | None = None
+    # Uploads whose audio header says they exceed these are rejected
+    # before transcription, 0 for no limit
+    AUDIO_MAX_SECONDS: float = 4 * 60 * 60
+    AUDIO_MAX_CHANNELS: int = 8
+    AUDIO_MAX_SAMPLE_RATE: int = 192000
+    # Files accepted by one POST /transcribe/batch, each within
+    # UPLOAD_MAX_BYTES
+    BATCH_UPLOAD_MAX_FILES: int = 32
+    # Files of a batch upload decoded at once
+    BATCH_UPLOAD_DECODE_WORKERS: int = 4
+
+    # Threads draining the asynchronous job queue
+    JOB_WORKERS: int = 1
+    # Where queued uploads wait on disk until their job runs
+    JOB_UPLOAD_DIR: str = "./job_uploads"
+    # Put jobs left running by a previous process back in the queue on
+    # start. app.serve does it once before starting several workers and
+    # turns it off for them, so they leave each other's jobs alone.
+    JOB_REQUEUE_RUNNING: bool = True
+    # Upper bound on a single long-poll wait, in seconds
+    JOB_MAX_WAIT_SECONDS: int = 60
+
+    # CPU inference profile, see audio_processor.cpu: "fp32" or "int8"
+    # (dynamic quantisation of the Linear layers)
+    CPU_PROFILE: Literal["fp32", "int8"] = "fp32"
+    # Compile the Whisper encoder with torch.compile on load
+    CPU_COMPILE_ENCODER: bool = False
+    # torch threads per worker process, 0 for torch's default (one per
+    # core); set so that workers x threads does not exceed the cores
+    TORCH_INTRA_OP_THREADS: int = 0
+    TORCH_INTER_OP_THREADS: int = 0
+
+    # Inference backend, see audio_processor.engines. "onnx" runs an ONNX
+    # export with ONNX Runtime and needs the onnxruntime package; "stub"
+    # loads no model and answers a fixed text, for benchmarking the rest
+    INFERENCE_ENGINE: Literal["transformers", "onnx", "stub"] = "transformers"
+    # Where ONNX exports live, one directory per model; a missing export
+    # is created on first load, which needs optimum[exporters]
+    ONNX_MODEL_DIR: str = "./onnx_models"
+
+    # STFT of the log-mel feature extractor, see audio_processor.features:
+    # "torch" (torch.stft) or "numpy"
+    FEATURE_STFT: Literal["torch", "numpy"] = "torch"
+    # Directory of the on-disk cache of each upload's log-mel features, by
+    # content hash; unset to disable. Transcribing the same audio again,
+    # e.g. with another model or decoding options, then skips decode,
+    # resample and feature extraction.
+    FEATURE_CACHE_DIR: str | None = None
+    # The least recently used features are removed past this size, 0 for
+    # no limit
+    FEATURE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Decoding profile, see audio_processor.decoding: "greedy", "beam" or
+    # "accurate" (beam search with temperature fallback)
+    DECODING_PROFILE: Literal["greedy", "beam", "accurate"] = "greedy"
+    # Spoken language forced on every window, e.g. "en", which skips
+    # language detection; unset to detect it per window
+    DECODING_LANGUAGE: str | None = None
+    DECODING_TASK: Literal["transcribe", "translate"] = "transcribe"
+    # Generated tokens allowed per second of audio, so a window stuck in a
+    # repetition loop stops early; 0 for the decoder's full 448 tokens
+    DECODING_MAX_TOKENS_PER_SECOND: float = 8.0
+    # Decode with Whisper's timestamp tokens and store each transcription's
+    # segments, for GET /transcriptions/{id}/segments and /locate
+    DECODING_TIMESTAMPS: bool = True
+
+    # Skip silence and noise before Whisper with the energy/spectral VAD.
+    # Off until benchmark.vad shows it drops no speech on real recordings
+    VAD_ENABLED: bool = False
+
+    # Rank only this many of the newest matches of a search, 0 to rank
+    # them all; results cut short this way are answered with an
+    # X-Search-Truncated: true header
+    SEARCH_RANK_CANDIDATES: int = 0
+
+    DATABASE_URL: str = "sqlite:///./transcription.db"
+    # WAL lets readers run while an upload commits
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    # NORMAL only syncs at WAL checkpoints; a power loss can drop the
+    # last commits but never corrupts the database
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # Bytes of the database file read through mmap, 0 to disable
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # Page cache per connection, in KiB
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    # How long a writer waits for the write lock before failing, in ms
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Connections kept open, and extra ones allowed under load
+    DB_POOL_SIZE: int = 8
+    DB_MAX_OVERFLOW: int = 16
+    # Coalesce transcription inserts from concurrent requests into one
+    # transaction (one fsync) instead of committing each on its own
+    DB_GROUP_COMMIT: bool = False
+    DB_GROUP_COMMIT_MAX_BATCH: int = 64
+    DB_GROUP_COMMIT_MAX_WAIT_MS: int = 5
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
@@ -0,0 +1,344 @@
+import asyncio
+import heapq
+import itertools
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Literal
+
+from app.core.admission import scheduling_key
+from app.core.config import settings
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue has no free slot for a new job."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class StageStats:
+    """Running count, total and max of a timed stage, in seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_seconds": self.mean,
+            "max_seconds": self.max,
+        }
+
+
+_EXHAUSTED = object()
+
+
+def _timed_call(submitted_at: float, fn, *args):
+    # Runs inside the worker; perf_counter is process-local, so queue wait
+    # is measured with the wall clock, which is shared across processes.
+    started_at = time.time()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.perf_counter() - start
+
+
+def _stream_into(queue, fn, *args):
+    # Runs inside a process pool worker: iterate the generator there and
+    # hand each item to the parent through a managed queue, as (done,
+    # item) pairs
+    try:
+        for item in fn(*args):
+            queue.put((False, item))
+    finally:
+        queue.put((True, None))
+
+
+class _Timings(tuple):
+    """(queue wait, run) seconds of a stream, after its last item"""
+
+
+class InferenceExecutor:
+    """
+    Run blocking inference off the event loop on a bounded worker pool.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more
+    wait for a worker; anything beyond that is rejected immediately with
+    `QueueFullError` so the caller can shed load. Waiting jobs are handed
+    a free worker in `scheduler` order, see app.core.admission: under
+    "sjf" the job with the least audio goes first, aged by `aging`.
+    """
+
+    def __init__(
+        self,
+        kind: Literal["thread", "process"] = "thread",
+        max_workers: int = 1,
+        max_queue: int = 8,
+        retry_after: int = 5,
+        scheduler: Literal["fifo", "sjf"] = "fifo",
+        aging: float = 5.0,
+    ):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.scheduler = scheduler
+        self.aging = aging
+        self._pool: Executor | None = None
+        # Serves the queues streams pass items through in process mode
+        self._manager = None
+        self._pending = 0
+        # Jobs holding a worker, and (key, seq, future) of those waiting
+        self._active = 0
+        self._waiting = []
+        self._seq = itertools.count()
+        self.rejected = 0
+        self.queue_wait = StageStats()
+        self.run_time = StageStats()
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently queued or running"""
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        return min(self._pending, self.max_workers)
+
+    @property
+    def queued(self) -> int:
+        return max(self._pending - self.max_workers, 0)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # Never fork a process that already holds torch threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference",
+                )
+        return self._pool
+
+    @property
+    def is_full(self) -> bool:
+        return self._pending >= self.max_workers + self.max_queue
+
+    def _reserve(self) -> None:
+        """
+        Claim a queue slot for a job; `run` and `stream` release it
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        if self.is_full:
+            self.rejected += 1
+            raise QueueFullError(self._estimate_retry_after())
+        self._pending += 1
+
+    async def _acquire(self, cost: float | None) -> None:
+        """Wait for a free worker, behind waiting jobs with a lower key"""
+        if self._active < self.max_workers and not self._waiting:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        key = scheduling_key(time.monotonic(), cost, self.scheduler, self.aging)
+        heapq.heappush(self._waiting, (key, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Handed the worker just as the caller gave up: pass it on
+            if not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        """Hand the worker to the first waiting job, or free it"""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _estimate_retry_after(self) -> int:
+        # Time for the current backlog to drain, floored at the configured
+        # value so clients do not hammer an overloaded worker
+        backlog = self.run_time.mean * self._pending / self.max_workers
+        return max(self.retry_after, math.ceil(backlog))
+
+    async def run(self, fn, *args, cost: float | None = None):
+        """
+        Execute `fn(*args)` on the pool and return its result.
+
+        In process mode `fn` and its arguments must be picklable. `cost`,
+        the job's seconds of audio, orders it among waiting jobs.
+
+        Returns:
+            tuple: (result, queue_wait_seconds, run_seconds)
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        self._reserve()
+        try:
+            submitted_at = time.time()
+            await self._acquire(cost)
+            try:
+                loop = asyncio.get_running_loop()
+                result, waited, ran = await loop.run_in_executor(
+                    self._get_pool(), _timed_call, submitted_at, fn, *args
+                )
+            finally:
+                self._release()
+        finally:
+            self._pending -= 1
+
+        waited = max(waited, 0.0)
+        self.queue_wait.observe(waited)
+        self.run_time.observe(ran)
+        return result, waited, ran
+
+    async def stream(self, fn, *args, cost: float | None = None):
+        """
+        Iterate the generator returned by `fn(*args)` on the pool, so the
+        event loop stays free in between items. In thread mode a worker
+        thread advances it one item at a time; in process mode, where
+        generators cannot cross process boundaries, a worker process runs
+        it to the end and passes each item back through a managed queue,
+        so `fn`, its arguments and its items must be picklable. The job
+        keeps its worker until the generator is exhausted.
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        self._reserve()
+        try:
+            submitted_at = time.time()
+            await self._acquire(cost)
+            try:
+                if self.kind == "process":
+                    items = self._stream_process(submitted_at, fn, *args)
+                else:
+                    items = self._stream_thread(submitted_at, fn, *args)
+                async for item in items:
+                    if isinstance(item, _Timings):
+                        waited, ran = item
+                        break
+                    yield item
+            finally:
+                await items.aclose()
+                self._release()
+        finally:
+            self._pending -= 1
+
+        self.queue_wait.observe(waited)
+        self.run_time.observe(ran)
+
+    async def _stream_thread(self, submitted_at, fn, *args):
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        iterator = fn(*args)
+        waited, ran = None, 0.0
+        while True:
+            item, item_waited, item_ran = await loop.run_in_executor(
+                pool,
+                _timed_call,
+                submitted_at if waited is None else time.time(),
+                next,
+                iterator,
+                _EXHAUSTED,
+            )
+            if waited is None:
+                waited = max(item_waited, 0.0)
+            ran += item_ran
+            if item is _EXHAUSTED:
+                break
+            yield item
+        yield _Timings((waited, ran))
+
+    async def _stream_process(self, submitted_at, fn, *args):
+        loop = asyncio.get_running_loop()
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        queue = self._manager.Queue()
+        future = loop.run_in_executor(
+            self._get_pool(),
+            _timed_call,
+            submitted_at,
+            _stream_into,
+            queue,
+            fn,
+            *args,
+        )
+        try:
+            while True:
+                # Items arrive through the manager, read off the event loop
+                done, item = await loop.run_in_executor(None, queue.get)
+                if done:
+                    break
+                yield item
+        finally:
+            # Raises the generator's error, and keeps the worker counted
+            # as busy until it is done even if the caller went away
+            _, waited, ran = await future
+        yield _Timings((max(waited, 0.0), ran))
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "scheduler": self.scheduler,
+            "running": self.running,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.snapshot(),
+            "run": self.run_time.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+inference_executor = InferenceExecutor(
+    kind=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_QUEUE_SIZE,
+    retry_after=settings.INFERENCE_RETRY_AFTER,
+    scheduler=settings.INFERENCE_SCHEDULER,
+    aging=settings.INFERENCE_SJF_AGING,
+)
+
+
+def get_inference_executor() -> InferenceExecutor:
+    return inference_executor
@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.core.admission import (
+    AudioRejectedError,
+    probe_audio,
+    scheduling_key,
+)
+from app.core.config import settings
+from app.core.executor import (
+    InferenceExecutor,
+    QueueFullError,
+    inference_executor,
+)
+from app.core.metrics import metrics
+from app.core.model_registry import (
+    ModelRegistry,
+    model_registry,
+    transcribe_file,
+)
+from app.core.result_cache import ResultCache, make_cache_key, result_cache
+from app.crud import requeue_interrupted_jobs, save_transcription
+from app.db.database import session
+from app.models.transcription import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+def _utcnow() -> datetime:
+    # SQLite keeps no timezone, so job timestamps are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobRunner:
+    """
+    Local worker pool for asynchronous transcription jobs.
+
+    Job state lives in the transcription_job table and the uploads on disk,
+    so the in-memory queue is only a cache of queued ids: on start, jobs
+    left queued or running by a previous process are queued again. Queued
+    jobs run in `scheduler` order by creation time and audio duration,
+    see app.core.admission. The transcription itself goes through
+    `executor`, the pool /transcribe uses, so jobs and uploads share its
+    worker limit, queue and ordering; job workers only wait for it and
+    write the results. A job is claimed with a conditional update
+    before it runs, so when several server processes queue the same job
+    only one of them runs it.
+    """
+
+    def __init__(
+        self,
+        session_factory=session,
+        registry: ModelRegistry = model_registry,
+        cache: ResultCache = result_cache,
+        executor: InferenceExecutor = inference_executor,
+        upload_dir: str = settings.JOB_UPLOAD_DIR,
+        workers: int = settings.JOB_WORKERS,
+        scheduler: str = settings.INFERENCE_SCHEDULER,
+        aging: float = settings.INFERENCE_SJF_AGING,
+        requeue_running: bool = settings.JOB_REQUEUE_RUNNING,
+    ):
+        self.session_factory = session_factory
+        self.registry = registry
+        self.cache = cache
+        self.executor = executor
+        # Event loop the executor is driven from, the one start() ran on;
+        # without one, e.g. when started from a script, jobs transcribe on
+        # the job worker's own thread
+        self._loop = None
+        self.upload_dir = upload_dir
+        self.workers = workers
+        self.scheduler = scheduler
+        self.aging = aging
+        # Whether start() puts jobs left running back in the queue; off
+        # when sibling processes may be running them, see app.serve
+        self.requeue_running = requeue_running
+        # (scheduling key, seq, job id, cost), None ids telling workers to
+        # stop
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads = []
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def new_upload_path(self, job_id: str) -> str:
+        os.makedirs(self.upload_dir, exist_ok=True)
+        return os.path.join(self.upload_dir, f"{job_id}.upload")
+
+    def create_job(
+        self,
+        db,
+        job_id: str,
+        original_filename: str,
+        audio_path: str,
+        content_hash: str,
+        cost: float | None = None,
+    ) -> TranscriptionJob:
+        """
+        Persist a queued job for an upload already written to disk, cost
+        being its seconds of audio if known
+        """
+        job = TranscriptionJob(
+            id=job_id,
+            status="queued",
+            original_filename=original_filename,
+            audio_path=audio_path,
+            content_hash=content_hash,
+            created_at=_utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._enqueue(job.id, job.created_at, cost)
+        return job
+
+    def _enqueue(self, job_id: str, created_at: datetime, cost) -> None:
+        key = scheduling_key(
+            created_at.timestamp(), cost, self.scheduler, self.aging
+        )
+        self._queue.put((key, next(self._seq), job_id, cost))
+
+    def start(self) -> None:
+        """
+        Re-queue unfinished jobs and start the job workers. Called from
+        the event loop, jobs are transcribed through the executor on it,
+        so stop() must then be called off the loop, e.g. in a thread.
+        """
+        if self._threads:
+            return
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._recover()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        # Jobs still queued stay queued in the table for the next start
+        for _ in self._threads:
+            # Behind every queued job, so the workers drain the queue
+            self._queue.put((math.inf, next(self._seq), None, None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._queue = queue.PriorityQueue()
+
+    def _recover(self) -> None:
+        db = self.session_factory()
+        try:
+            if self.requeue_running:
+                requeue_interrupted_jobs(db)
+            pending = (
+                db.query(
+                    TranscriptionJob.id,
+                    TranscriptionJob.created_at,
+                    TranscriptionJob.audio_path,
+                )
+                .filter(TranscriptionJob.status == "queued")
+                .order_by(TranscriptionJob.created_at)
+                .all()
+            )
+        finally:
+            db.close()
+        for job_id, created_at, audio_path in pending:
+            try:
+                cost = probe_audio(audio_path).cost
+            except AudioRejectedError:
+                # Fails when it runs, with the decode error
+                cost = None
+            self._enqueue(job_id, created_at, cost)
+        if pending:
+            logger.info("Re-queued %d unfinished jobs", len(pending))
+
+    def _work(self) -> None:
+        while True:
+            _, _, job_id, cost = self._queue.get()
+            if job_id is None:
+                return
+            try:
+                self.run_job(job_id, cost)
+            except Exception:
+                logger.exception("Job %s crashed", job_id)
+
+    def run_job(self, job_id: str, cost: float | None = None) -> None:
+        db = self.session_factory()
+        try:
+            claimed = (
+                db.query(TranscriptionJob)
+                .filter(
+                    TranscriptionJob.id == job_id,
+                    TranscriptionJob.status == "queued",
+                )
+                .update(
+                    {"status": "running", "started_at": _utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return
+            job = db.get(TranscriptionJob, job_id)
+            job.queue_seconds = (
+                job.started_at - job.created_at
+            ).total_seconds()
+            db.commit()
+
+            start = time.perf_counter()
+            try:
+                text, segments = self._transcribe(db, job, cost)
+                if text is None:
+                    raise ValueError("Failed to transcribe audio")
+                with metrics.timed("db_commit"):
+                    db_transcription = save_transcription(
+                        db,
+                        job.original_filename,
+                        text,
+                        job.content_hash,
+                        segments,
+                    )
+                job.transcription_id = db_transcription.id
+                job.status = "done"
+            except Exception as e:
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = _utcnow()
+            job.run_seconds = time.perf_counter() - start
+            db.commit()
+
+            if job.audio_path and os.path.exists(job.audio_path):
+                os.remove(job.audio_path)
+        finally:
+            db.close()
+
+    def _transcribe(self, db, job: TranscriptionJob, cost=None):
+        cache_key = make_cache_key(
+            job.content_hash,
+            self.registry.model_name,
+            self.registry.decoding.cache_params(),
+        )
+        text = self.cache.get(db, cache_key)
+        if text is not None:
+            return text, self.cache.get_segments(db, cache_key)
+        text, segments = self._run(
+            transcribe_file,
+            self.registry,
+            job.audio_path,
+            None,
+            job.content_hash,
+            cost=cost,
+        )
+        if text is not None:
+            self.cache.put(
+                db,
+                cache_key,
+                job.content_hash,
+                self.registry.model_name,
+                text,
+                segments,
+            )
+        return text, segments
+
+    def _run(self, fn, *args, cost=None):
+        """
+        fn(*args) on the executor, from this job worker's thread, waiting
+        for a queue slot rather than failing while the executor is full
+        """
+        if self._loop is None:
+            return fn(*args)
+        while True:
+            future = asyncio.run_coroutine_threadsafe(
+                self.executor.run(fn, *args, cost=cost), self._loop
+            )
+            try:
+                result, _, _ = future.result()
+                return result
+            except QueueFullError as e:
+                time.sleep(e.retry_after)
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+job_runner = JobRunner()
+
+
+def get_job_runner() -> JobRunner:
+    return job_runner
@@ -0,0 +1,283 @@
+"""
+Prometheus text-format metrics for GET /metrics.
+
+Histograms are kept in process and rendered in the text exposition format
+on each scrape, so no client library is needed. Gauges for the executor,
+model and result cache are read from their stats when rendering.
+
+With INFERENCE_EXECUTOR=process the stage histograms of the decode,
+resample, features, generate and detokenize stages are recorded inside the
+pool's worker processes and do not reach this one; upload_read and
+db_commit, and everything else, are still reported.
+"""
+
+import bisect
+import threading
+from contextlib import contextmanager
+
+from audio_processor.metrics import StageObserver
+
+PREFIX = "transcriber"
+
+# Seconds, from a feature extraction of one window to a long file's decode
+STAGE_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+AUDIO_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+# Processing seconds per second of audio; below 1 is faster than real time
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+
+def _format(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally split by one label. Observing
+    is a bisect and three additions under a lock.
+    """
+
+    def __init__(self, name: str, help: str, buckets, label: str = None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        # Label value -> (per-bucket counts with +Inf last, sum, count)
+        self._series = {}
+
+    def observe(self, value: float, label_value: str = None) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, label_value: str = None) -> dict:
+        """Sum and count of one series, zeros if nothing was observed"""
+        with self._lock:
+            _, total, count = self._series.get(label_value, (None, 0.0, 0))
+        return {"sum": total, "count": count}
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(
+                (k, (list(c), s, n)) for k, (c, s, n) in self._series.items()
+            )
+        for label_value, (counts, total, count) in series:
+            base = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_labels(**base, le=_format(bound))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(**base)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(**base)} {count}")
+        return lines
+
+
+def _sample(name, help, kind, value, **labels) -> list[str]:
+    return [
+        f"# HELP {name} {help}",
+        f"# TYPE {name} {kind}",
+        f"{name}{_labels(**labels)} {_format(value)}",
+    ]
+
+
+class Metrics(StageObserver):
+    """
+    The service's metrics: per-stage latency, audio duration and real-time
+    factor histograms and the number of HTTP requests in flight. Plugged
+    into the transcriber as its StageObserver by the model registry.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            f"{PREFIX}_stage_seconds",
+            "Time spent per stage: upload_read, decode, resample, "
+            "features, generate, detokenize and db_commit",
+            STAGE_BUCKETS,
+            label="stage",
+        )
+        self.audio_seconds = Histogram(
+            f"{PREFIX}_audio_duration_seconds",
+            "Duration of the transcribed audio",
+            AUDIO_BUCKETS,
+        )
+        self.real_time_factor = Histogram(
+            f"{PREFIX}_real_time_factor",
+            "Processing time per second of transcribed audio",
+            RTF_BUCKETS,
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self.stage_seconds.observe(seconds, stage)
+
+    def observe_audio(self, audio_seconds: float, seconds: float) -> None:
+        self.audio_seconds.observe(audio_seconds)
+        if audio_seconds > 0:
+            self.real_time_factor.observe(seconds / audio_seconds)
+
+    @contextmanager
+    def track_request(self):
+        """Count an HTTP request as in flight while the block runs"""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def render(self, executor=None, registry=None, cache=None) -> str:
+        """
+        All metrics in the Prometheus text format, with gauges read from
+        the inference executor, model registry and result cache if given
+        """
+        lines = []
+        for histogram in (
+            self.stage_seconds,
+            self.audio_seconds,
+            self.real_time_factor,
+        ):
+            lines.extend(histogram.render())
+        lines.extend(
+            _sample(
+                f"{PREFIX}_http_requests_in_flight",
+                "HTTP requests being served",
+                "gauge",
+                self.in_flight,
+            )
+        )
+        if executor is not None:
+            lines.extend(_executor_lines(executor.stats()))
+        if registry is not None:
+            lines.extend(_registry_lines(registry.stats()))
+        if cache is not None:
+            lines.extend(_cache_lines(cache.stats()))
+        return "\n".join(lines) + "\n"
+
+
+def _executor_lines(stats: dict) -> list[str]:
+    lines = []
+    lines += _sample(
+        f"{PREFIX}_inference_running",
+        "Transcriptions running on the inference pool",
+        "gauge",
+        stats["running"],
+    )
+    lines += _sample(
+        f"{PREFIX}_inference_queue_depth",
+        "Transcriptions waiting for an inference worker",
+        "gauge",
+        stats["queued"],
+    )
+    lines += _sample(
+        f"{PREFIX}_inference_rejected_total",
+        "Transcriptions rejected with 503 because the queue was full",
+        "counter",
+        stats["rejected"],
+    )
+    for key, help in (
+        ("queue_wait", "Time waiting for an inference worker"),
+        ("run", "Time running on an inference worker"),
+    ):
+        name = f"{PREFIX}_inference_{key}_seconds"
+        snapshot = stats[key]
+        lines += [
+            f"# HELP {name} {help}",
+            f"# TYPE {name} summary",
+            f"{name}_sum "
+            f"{_format(snapshot['mean_seconds'] * snapshot['count'])}",
+            f"{name}_count {snapshot['count']}",
+        ]
+    return lines
+
+
+def _registry_lines(stats: dict) -> list[str]:
+    model = {"model": stats["model_name"]}
+    lines = _sample(
+        f"{PREFIX}_model_loaded",
+        "Whether the Whisper model is loaded",
+        "gauge",
+        int(stats["loaded"]),
+        **model,
+    )
+    if stats["load_seconds"] is not None:
+        lines += _sample(
+            f"{PREFIX}_model_load_seconds",
+            "Time taken to load the Whisper model",
+            "gauge",
+            stats["load_seconds"],
+            **model,
+        )
+    return lines
+
+
+def _cache_lines(stats: dict) -> list[str]:
+    name = f"{PREFIX}_cache_hits_total"
+    lines = [
+        f"# HELP {name} Result cache hits, by the tier that served them",
+        f"# TYPE {name} counter",
+        f'{name}{{tier="memory"}} {stats["memory_hits"]}',
+        f'{name}{{tier="db"}} {stats["db_hits"]}',
+    ]
+    lines += _sample(
+        f"{PREFIX}_cache_misses_total",
+        "Result cache misses",
+        "counter",
+        stats["misses"],
+    )
+    lines += _sample(
+        f"{PREFIX}_cache_hit_ratio",
+        "Fraction of result cache lookups that hit",
+        "gauge",
+        stats["hit_rate"],
+    )
+    return lines
+
+
+metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return metrics
@@ -0,0 +1,295 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+from app.core.config import settings
+from app.core.metrics import metrics
+from audio_processor.cpu import configure_threads, file_backed_bytes
+from audio_processor.decoding import DecodingOptions
+from audio_processor.features import FeatureCache
+from audio_processor.transcriber import AudioTranscriber
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the Whisper transcriber.
+
+    The model is loaded at most once per worker, either eagerly from the
+    application lifespan or lazily on the first call to `get()`.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        factory=AudioTranscriber,
+        max_batch_size: int = 1,
+        max_wait_ms: int = 10,
+        vad: bool = False,
+        transcriber_options: dict | None = None,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        decoding: DecodingOptions | None = None,
+        observer=None,
+        feature_cache: FeatureCache | None = None,
+    ):
+        self.model_name = model_name
+        self._factory = factory
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.vad = vad
+        # Extra keyword arguments for the factory, e.g. the CPU profile
+        self.transcriber_options = transcriber_options or {}
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        # Deployment default, requests may override it
+        self.decoding = decoding or DecodingOptions()
+        # Receives the transcriber's stage timings, e.g. the /metrics ones
+        self.observer = observer
+        # Shared by the transcribers of every model, see FEATURE_CACHE_DIR
+        self.feature_cache = feature_cache
+        self._lock = threading.Lock()
+        self._transcriber = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.resident_bytes = None
+        self.shared_bytes = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._transcriber is not None
+
+    def get(self) -> AudioTranscriber:
+        """Return the shared transcriber, loading it on first use."""
+        transcriber = self._transcriber
+        if transcriber is None:
+            transcriber = self.load()
+        return transcriber
+
+    def load(self) -> AudioTranscriber:
+        """Load the model if it is not loaded yet and return it."""
+        with self._lock:
+            if self._transcriber is None:
+                start = time.perf_counter()
+                configure_threads(
+                    self.intra_op_threads, self.inter_op_threads
+                )
+                transcriber = self._factory(
+                    self.model_name, **self.transcriber_options
+                )
+                if self.max_batch_size > 1:
+                    transcriber.enable_batching(
+                        self.max_batch_size, self.max_wait_ms
+                    )
+                if self.vad:
+                    transcriber.enable_vad()
+                transcriber.decoding = self.decoding
+                if self.observer is not None:
+                    transcriber.enable_metrics(self.observer)
+                if self.feature_cache is not None:
+                    transcriber.enable_feature_cache(self.feature_cache)
+                self.load_seconds = time.perf_counter() - start
+                self.resident_bytes = _model_size_bytes(transcriber)
+                self.shared_bytes = _shared_bytes(transcriber)
+                self._transcriber = transcriber
+                logger.info(
+                    "Loaded %s in %.2fs (%d bytes, %s memory-mapped)",
+                    self.model_name,
+                    self.load_seconds,
+                    self.resident_bytes,
+                    self.shared_bytes,
+                )
+            return self._transcriber
+
+    def warm_up(self) -> None:
+        """
+        Run one second of silence through the model so the first real
+        request does not pay for lazy kernel and allocator initialisation.
+        Goes straight to the model, since VAD would drop the silence.
+        """
+        transcriber = self.get()
+        silence = np.zeros(transcriber.target_sampling_rate, dtype=np.float32)
+        start = time.perf_counter()
+        transcriber.generate_batch(transcriber.extract_features([silence]))
+        self.warmup_seconds = time.perf_counter() - start
+
+    def unload(self) -> None:
+        with self._lock:
+            if self._transcriber is not None:
+                self._transcriber.disable_batching()
+            self._transcriber = None
+            self.load_seconds = None
+            self.warmup_seconds = None
+            self.resident_bytes = None
+            self.shared_bytes = None
+
+    def stats(self) -> dict:
+        batcher = getattr(self._transcriber, "batcher", None)
+        return {
+            "model_name": self.model_name,
+            # Which worker answered, when app.serve runs several
+            "pid": os.getpid(),
+            "loaded": self.is_loaded,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "resident_bytes": self.resident_bytes,
+            "shared_bytes": self.shared_bytes,
+            "engine": getattr(
+                getattr(self._transcriber, "engine", None), "name", None
+            ),
+            "cpu_profile": getattr(self._transcriber, "cpu_profile", None),
+            "torch_threads": torch.get_num_threads(),
+            "decoding": self.decoding.cache_params(),
+            "batching": batcher.stats() if batcher is not None else None,
+            "vad": (
+                self._transcriber.vad_stats()
+                if self.vad and self.is_loaded
+                else None
+            ),
+            "feature_cache": (
+                self.feature_cache.stats()
+                if self.feature_cache is not None
+                else None
+            ),
+        }
+
+    def __reduce__(self):
+        # When sent to a process pool worker, resolve to that process's own
+        # registry instead of copying the model across the pipe
+        return (_registry_for, (self.model_name,))
+
+
+def _model_size_bytes(transcriber) -> int:
+    """Size of the model's parameters and buffers in bytes"""
+    model = getattr(transcriber, "model", None)
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _shared_bytes(transcriber) -> int | None:
+    """
+    Bytes of the model memory-mapped from its checkpoint, whose pages
+    every worker process loading the same file shares
+    """
+    model = getattr(transcriber, "model", None)
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    return file_backed_bytes(model)
+
+
+def _registry_from_settings(model_name: str) -> ModelRegistry:
+    return ModelRegistry(
+        model_name,
+        max_batch_size=settings.BATCH_MAX_SIZE,
+        max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+        vad=settings.VAD_ENABLED,
+        transcriber_options={
+            "cpu_profile": settings.CPU_PROFILE,
+            "compile_encoder": settings.CPU_COMPILE_ENCODER,
+            "engine": settings.INFERENCE_ENGINE,
+            "onnx_model_dir": os.path.join(
+                settings.ONNX_MODEL_DIR, model_name.replace("/", "--")
+            ),
+            "feature_stft": settings.FEATURE_STFT,
+        },
+        intra_op_threads=settings.TORCH_INTRA_OP_THREADS,
+        inter_op_threads=settings.TORCH_INTER_OP_THREADS,
+        decoding=DecodingOptions().override(
+            profile=settings.DECODING_PROFILE,
+            language=settings.DECODING_LANGUAGE,
+            task=settings.DECODING_TASK,
+            max_tokens_per_second=settings.DECODING_MAX_TOKENS_PER_SECOND,
+            timestamps=settings.DECODING_TIMESTAMPS,
+        ),
+        observer=metrics,
+        feature_cache=feature_cache,
+    )
+
+
+feature_cache = (
+    FeatureCache(settings.FEATURE_CACHE_DIR, settings.FEATURE_CACHE_MAX_BYTES)
+    if settings.FEATURE_CACHE_DIR
+    else None
+)
+model_registry = _registry_from_settings(settings.WHISPER_MODEL_ID)
+_registries = {model_registry.model_name: model_registry}
+
+
+def _registry_for(model_name: str) -> ModelRegistry:
+    if model_name not in _registries:
+        _registries[model_name] = _registry_from_settings(model_name)
+    return _registries[model_name]
+
+
+def get_model_registry() -> ModelRegistry:
+    return model_registry
+
+
+def transcribe_file(
+    registry: ModelRegistry,
+    path: str,
+    decoding: DecodingOptions | None = None,
+    content_hash: str | None = None,
+):
+    """
+    Transcribe an audio file on disk with the registry's model, decoding
+    with the registry's options unless others are given. Returns the text
+    and its timestamped segments, both None on failure. With the file's
+    content_hash its features go through the feature cache, if enabled.
+
+    Module level so it can be submitted to a process pool.
+    """
+    transcriber = registry.get()
+    return transcriber.process_audio_segments(path, decoding, content_hash)
+
+
+def transcribe_files(
+    registry: ModelRegistry,
+    paths: list[str],
+    decoding: DecodingOptions | None = None,
+    content_hashes: list[str] | None = None,
+    decode_workers: int = 4,
+):
+    """
+    Transcribe several audio files on disk together, decoding them on
+    decode_workers threads and batching their windows across files.
+    Returns each file's text and segments, or the exception that stopped
+    it from being decoded, see AudioTranscriber.transcribe_files.
+    """
+    transcriber = registry.get()
+    return transcriber.transcribe_files(
+        paths, decoding, content_hashes, decode_workers
+    )
+
+
+def iter_transcribe_file(
+    registry: ModelRegistry,
+    path: str,
+    decoding: DecodingOptions | None = None,
+    content_hash: str | None = None,
+):
+    """
+    Yield (transcript so far, None) for an audio file on disk after each
+    30s window, decoding one window per generate call, then (transcript,
+    timestamped segments) once all are decoded. Segments come back as an
+    item rather than through an argument, so this can run in a process
+    pool worker, see InferenceExecutor.stream.
+    """
+    transcriber = registry.get()
+    segments = []
+    text = None
+    for text in transcriber.iter_transcribe(
+        path,
+        batch_size=1,
+        decoding=decoding,
+        segments=segments,
+        content_hash=content_hash,
+    ):
+        yield text, None
+    yield text, segments
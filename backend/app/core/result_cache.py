@@ -0,0 +1,161 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.models.transcription import TranscriptionCacheEntry
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+
+def make_cache_key(content_hash: str, model_name: str, params=None) -> str:
+    """
+    Key a transcription by the audio bytes, the model and the decoding
+    parameters, so changing any of them never returns a stale result
+    """
+    params = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+    key = f"{content_hash}\0{model_name}\0{params}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU of strings, evicting by total UTF-8 size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                old = self._items.pop(key)
+                self.size_bytes -= len(old.encode("utf-8"))
+            self._items[key] = value
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size_bytes -= len(evicted.encode("utf-8"))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.size_bytes = 0
+
+
+class ResultCache:
+    """
+    Content-addressed transcription cache: an in-memory LRU in front of
+    the transcription_cache table
+    """
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.enabled = enabled
+        self.memory = LRUCache(max_bytes)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, cache_key: str):
+        """Return the cached text for cache_key, or None on a miss"""
+        if not self.enabled:
+            return None
+        text = self.memory.get(cache_key)
+        if text is not None:
+            self.memory_hits += 1
+            return text
+
+        entry = (
+            db.query(TranscriptionCacheEntry.transcription_content)
+            .filter(TranscriptionCacheEntry.cache_key == cache_key)
+            .first()
+        )
+        if entry is None:
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        self.memory.put(cache_key, entry.transcription_content)
+        return entry.transcription_content
+
+    def get_segments(self, db: Session, cache_key: str):
+        """
+        Segments stored with the result for cache_key, or None. Only read
+        on a hit, so they are not kept in memory.
+        """
+        if not self.enabled:
+            return None
+        segments = db.execute(
+            select(TranscriptionCacheEntry.segments).where(
+                TranscriptionCacheEntry.cache_key == cache_key
+            )
+        ).scalar()
+        return json.loads(segments) if segments else None
+
+    def put(
+        self,
+        db: Session,
+        cache_key: str,
+        content_hash: str,
+        model_name: str,
+        text: str,
+        segments: list[dict] | None = None,
+    ) -> None:
+        """
+        Add a result to the session's transaction; the caller commits.
+        A concurrent upload of the same audio may have stored it first,
+        in which case the existing row is kept.
+        """
+        if not self.enabled:
+            return
+        db.execute(
+            insert(TranscriptionCacheEntry)
+            .values(
+                cache_key=cache_key,
+                content_hash=content_hash,
+                model_name=model_name,
+                transcription_content=text,
+                segments=json.dumps(segments) if segments else None,
+            )
+            .on_conflict_do_nothing(index_elements=["cache_key"])
+        )
+        self.memory.put(cache_key, text)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        hits = self.memory_hits + self.db_hits
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size_bytes,
+            "memory_max_bytes": self.memory.max_bytes,
+        }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
+
+
+def get_result_cache() -> ResultCache:
+    return result_cache
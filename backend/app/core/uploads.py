@@ -0,0 +1,91 @@
+"""
+Uploads spooled to disk chunk by chunk.
+
+The audio is hashed and its size checked as it is copied, so a request
+holds one chunk of the file in memory instead of all of it, and the
+decoder reads the file from disk block by block. A path, unlike the bytes
+of the file, is cheap to hand to a process pool worker. The copy runs in
+a worker thread, so its blocking reads and writes never hold up the
+event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from fastapi import UploadFile
+
+# Bytes read from the upload per read call
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """The upload is larger than UPLOAD_MAX_BYTES"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Upload exceeds the limit of {max_bytes} bytes")
+
+
+@dataclass
+class SpooledUpload:
+    """An upload written to disk, with its SHA-256 hex digest and size"""
+
+    path: str
+    content_hash: str
+    size: int
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def spool_upload(
+    audio_file: UploadFile,
+    path: str | None = None,
+    max_bytes: int | None = None,
+) -> SpooledUpload:
+    """
+    Copy an upload to path, or to a new file in UPLOAD_SPOOL_DIR, hashing
+    it on the way. The partial file is removed if the upload fails or
+    exceeds max_bytes (UPLOAD_MAX_BYTES if None, 0 for no limit).
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_BYTES
+    with metrics.timed("upload_read"):
+        return await asyncio.to_thread(
+            _spool, audio_file.file, path, max_bytes
+        )
+
+
+def _spool(source, path: str | None, max_bytes: int) -> SpooledUpload:
+    if path is None:
+        directory = settings.UPLOAD_SPOOL_DIR
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".upload", dir=directory)
+        f = os.fdopen(fd, "wb")
+    else:
+        f = open(path, "wb")
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with f:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(path, hasher.hexdigest(), size)
@@ -0,0 +1,373 @@
+import base64
+import json
+import os
+from collections import Counter
+
+from app.db import fts
+from app.models.transcription import (
+    FilenameCounter,
+    Transcription,
+    TranscriptionJob,
+    TranscriptionSegment,
+)
+from sqlalchemy import String, func, select, tuple_, type_coerce
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+CONTENT_MODES = ("full", "truncate", "none")
+
+# Names tried by save_transcription before giving up
+MAX_FILENAME_ATTEMPTS = 100
+
+# created_at as SQLite stores it. Keyset comparisons must use the stored
+# text: rows written by the server default and by the ORM format the same
+# instant differently, so a re-serialised datetime would not compare equal.
+_created_at_text = type_coerce(Transcription.created_at, String)
+
+
+def save_transcription(
+    db: Session,
+    original_filename: str,
+    text: str,
+    content_hash: str | None = None,
+    segments: list[dict] | None = None,
+) -> Transcription:
+    """
+    Store a transcription under a unique filename and commit it, together
+    with anything else already added to the session
+    """
+    db_transcription = add_transcription(
+        db, original_filename, text, content_hash, segments
+    )
+    db.commit()
+    db.refresh(db_transcription)
+    return db_transcription
+
+
+def add_transcription(
+    db: Session,
+    original_filename: str,
+    text: str,
+    content_hash: str | None = None,
+    segments: list[dict] | None = None,
+) -> Transcription:
+    """
+    Insert a transcription under a unique filename, with its segments
+    (dicts of start, end and text) if any, without committing, so the
+    caller can commit it together with other writes
+    """
+    for _ in range(MAX_FILENAME_ATTEMPTS):
+        db_transcription = Transcription(
+            filename=get_unique_filename(db, original_filename),
+            transcription_content=text,
+            content_hash=content_hash,
+        )
+        try:
+            with db.begin_nested():
+                db.add(db_transcription)
+        except IntegrityError:
+            # An upload literally named e.g. "audio_1.mp3" already holds
+            # the name; the counter has moved past it, so try the next
+            continue
+        _add_segments(db, [(db_transcription, segments)])
+        return db_transcription
+    raise ValueError(f"Could not allocate a unique filename for {original_filename}")  # noqa: E501
+
+
+def add_transcriptions(
+    db: Session,
+    items: list[tuple[str, str, str | None, list[dict] | None]],
+) -> list[Transcription]:
+    """
+    Insert many transcriptions, given as (original_filename, text,
+    content_hash, segments) tuples, without committing. Filenames are
+    reserved with one upsert for the whole list and the rows and segments
+    are inserted in two statements, instead of a round of each per row.
+    """
+    names = get_unique_filenames(db, [item[0] for item in items])
+    rows = [
+        Transcription(
+            filename=name,
+            transcription_content=text,
+            content_hash=content_hash,
+        )
+        for name, (_, text, content_hash, _) in zip(names, items)
+    ]
+    try:
+        with db.begin_nested():
+            db.add_all(rows)
+    except IntegrityError:
+        # Some upload was literally named like a numbered copy, e.g.
+        # "audio_1.mp3"; insert one at a time to find the clashing rows
+        return [
+            _add_reserved(db, name, *item) for name, item in zip(names, items)
+        ]
+    _add_segments(db, [(row, item[3]) for row, item in zip(rows, items)])
+    return rows
+
+
+def _add_reserved(
+    db: Session,
+    filename: str,
+    original_filename: str,
+    text: str,
+    content_hash: str | None,
+    segments: list[dict] | None,
+) -> Transcription:
+    """
+    Insert a transcription under a filename reserved for it, or under a
+    new one from add_transcription if that name is taken after all
+    """
+    db_transcription = Transcription(
+        filename=filename,
+        transcription_content=text,
+        content_hash=content_hash,
+    )
+    try:
+        with db.begin_nested():
+            db.add(db_transcription)
+    except IntegrityError:
+        return add_transcription(
+            db, original_filename, text, content_hash, segments
+        )
+    _add_segments(db, [(db_transcription, segments)])
+    return db_transcription
+
+
+def _add_segments(db: Session, rows: list[tuple[Transcription, list]]):
+    """Insert the segments of flushed transcriptions in one statement"""
+    values = [
+        {"transcription_id": row.id, **segment}
+        for row, segments in rows
+        for segment in segments or ()
+    ]
+    if values:
+        db.execute(insert(TranscriptionSegment), values)
+
+
+def get_unique_filenames(db: Session, filenames: list[str]) -> list[str]:
+    """
+    Reserve a unique filename for each of filenames, as get_unique_filename would one at a
+    time, with a single upsert that bumps each distinct name's counter by its number of
+    copies in the list.
+    """  # noqa: E501
+    copies = Counter(filenames)
+    if not copies:
+        return []
+    # A new name's counter starts at copies - 1, an existing one moves up
+    # by copies; either way it ends at the last number handed out
+    stmt = insert(FilenameCounter).values(
+        [{"filename": name, "counter": n - 1} for name, n in copies.items()]
+    )
+    counters = dict(
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["filename"],
+                set_={
+                    "counter": FilenameCounter.counter
+                    + stmt.excluded.counter
+                    + 1
+                },
+            ).returning(FilenameCounter.filename, FilenameCounter.counter)
+        ).all()
+    )
+    names = []
+    for filename in filenames:
+        counter = counters[filename] - copies[filename] + 1
+        copies[filename] -= 1
+        if counter == 0:
+            names.append(filename)
+        else:
+            name, ext = os.path.splitext(filename)
+            names.append(f"{name}_{counter}{ext}")
+    return names
+
+
+def get_unique_filename(db: Session, filename: str) -> str:
+    """
+    Helper function to reserve a unique filename: the name itself the first time, then _1, _2, etc.
+
+    The per-name counter is bumped with a single upsert in the session's transaction, so the
+    cost does not depend on how many copies exist, and concurrent writers, which SQLite
+    serialises on that write, never get the same number.
+    """  # noqa: E501
+    counter = db.execute(
+        insert(FilenameCounter)
+        .values(filename=filename, counter=0)
+        .on_conflict_do_update(
+            index_elements=["filename"],
+            set_={"counter": FilenameCounter.counter + 1},
+        )
+        .returning(FilenameCounter.counter)
+    ).scalar_one()
+    if counter == 0:
+        return filename
+    # For example: "audio.mp3" -> "audio_2.mp3"
+    name, ext = os.path.splitext(filename)
+    return f"{name}_{counter}{ext}"
+
+
+def requeue_interrupted_jobs(db: Session) -> int:
+    """
+    Mark jobs left running as queued again, commit and return how many: a
+    job that was running when its process died never finished
+    """
+    count = (
+        db.query(TranscriptionJob)
+        .filter(TranscriptionJob.status == "running")
+        .update({"status": "queued", "started_at": None})
+    )
+    db.commit()
+    return count
+
+
+def encode_cursor(created_at: str, transcription_id: int) -> str:
+    """Opaque page cursor for the row after (created_at, id)"""
+    raw = json.dumps([created_at, transcription_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, transcription_id = json.loads(
+            base64.urlsafe_b64decode(padded)
+        )
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(created_at, str) or not isinstance(transcription_id, int):  # noqa: E501
+        raise ValueError("Invalid cursor")
+    return created_at, transcription_id
+
+
+def _listing_query(
+    content: str, content_chars: int, newest_first: bool = False
+):
+    if content not in CONTENT_MODES:
+        raise ValueError(f"content must be one of {', '.join(CONTENT_MODES)}")  # noqa: E501
+    columns = [
+        Transcription.id,
+        Transcription.filename,
+        Transcription.created_at,
+        _created_at_text.label("cursor_created_at"),
+    ]
+    if content == "full":
+        columns.append(Transcription.transcription_content)
+    elif content == "truncate":
+        # Cut in SQL so long transcripts are never loaded
+        columns.append(
+            func.substr(
+                Transcription.transcription_content, 1, content_chars
+            ).label("transcription_content")
+        )
+    if newest_first:
+        return select(*columns).order_by(
+            _created_at_text.desc(), Transcription.id.desc()
+        )
+    return select(*columns).order_by(_created_at_text, Transcription.id)
+
+
+def list_transcriptions(
+    db: Session,
+    cursor: str | None = None,
+    limit: int | None = 100,
+    content: str = "full",
+    content_chars: int = 200,
+    newest_first: bool = False,
+):
+    """
+    One page of transcriptions in (created_at, id) order, or the reverse
+    with newest_first, starting after cursor. Returns the rows and the
+    cursor of the next page, or None on the last page. A limit of None
+    returns every remaining row.
+    """
+    query = _listing_query(content, content_chars, newest_first)
+    if cursor is not None:
+        created_at, transcription_id = decode_cursor(cursor)
+        # A row-value comparison, which SQLite answers from the
+        # (created_at, id) index
+        position = tuple_(_created_at_text, Transcription.id)
+        after = tuple_(created_at, transcription_id)
+        query = query.where(
+            position < after if newest_first else position > after
+        )
+    if limit is None:
+        return db.execute(query).all(), None
+    # One extra row tells whether there is a next page
+    rows = db.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.cursor_created_at, last.id)
+    return rows, next_cursor
+
+
+def iter_transcriptions(
+    db: Session,
+    content: str = "full",
+    content_chars: int = 200,
+    batch_size: int = 1000,
+):
+    """
+    Yield every transcription in (created_at, id) order, fetching
+    batch_size rows at a time so memory stays flat however large the table
+    """
+    query = _listing_query(content, content_chars)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def get_segments(
+    db: Session,
+    transcription_id: int,
+    start: float = 0.0,
+    end: float | None = None,
+):
+    """
+    Segments of a transcription overlapping the [start, end) time range in
+    seconds, in time order; end None runs to the end of the audio
+    """
+    # Segments do not overlap, so the last one starting at or before the
+    # range is the earliest that can reach into it: both lookups are seeks
+    # on the (transcription_id, start) index, however long the audio
+    first = (
+        select(func.max(TranscriptionSegment.start))
+        .where(
+            TranscriptionSegment.transcription_id == transcription_id,
+            TranscriptionSegment.start <= start,
+        )
+        .scalar_subquery()
+    )
+    query = select(TranscriptionSegment).where(
+        TranscriptionSegment.transcription_id == transcription_id,
+        TranscriptionSegment.start >= func.coalesce(first, start),
+        TranscriptionSegment.end > start,
+    )
+    if end is not None:
+        query = query.where(TranscriptionSegment.start < end)
+    return db.scalars(query.order_by(TranscriptionSegment.start)).all()
+
+
+def locate_segments(
+    db: Session,
+    transcription_id: int,
+    query: str,
+    prefix: bool = True,
+    limit: int = 10,
+):
+    """
+    Segments of a transcription containing the words of query, matched
+    with the same tokenizer as /search, as (segment row, number of
+    distinct query words matched) pairs: segments holding more of the
+    words first, earlier ones first among equals
+    """
+    return [
+        (row, row.matched)
+        for row in fts.locate(db, transcription_id, query, prefix, limit)
+    ]
\ No newline at end of file
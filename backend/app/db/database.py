@@ -1,15 +1,77 @@
-from sqlalchemy import create_engine
+from app.core.config import settings
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-# Use SQLite database
-SQLALCHEMY_DATABASE_URL = (
-    "sqlite:///./transcription.db"  # Using relative path to current directory
-)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-# Note: check_same_thread is needed for SQLite to work with FastAPI
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def sqlite_pragmas(
+    journal_mode: str = settings.SQLITE_JOURNAL_MODE,
+    synchronous: str = settings.SQLITE_SYNCHRONOUS,
+    mmap_size: int = settings.SQLITE_MMAP_SIZE,
+    cache_size_kib: int = settings.SQLITE_CACHE_SIZE_KIB,
+    busy_timeout_ms: int = settings.SQLITE_BUSY_TIMEOUT_MS,
+) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA mmap_size={mmap_size}",
+        # A negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{cache_size_kib}",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+    ]
+
+
+def create_db_engine(
+    url: str = SQLALCHEMY_DATABASE_URL,
+    pragmas: list[str] | None = None,
+    pool_size: int = settings.DB_POOL_SIZE,
+    max_overflow: int = settings.DB_MAX_OVERFLOW,
+) -> Engine:
+    """
+    Engine with the connection pragmas applied to every new SQLite
+    connection. An in-memory database keeps a single shared connection,
+    since each new connection would open an empty database, and needs no
+    pragmas.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(
+            url, pool_size=pool_size, max_overflow=max_overflow
+        )
+
+    # Note: check_same_thread is needed for SQLite to work with FastAPI
+    connect_args = {"check_same_thread": False}
+    if parsed.database in (None, "", ":memory:"):
+        return create_engine(
+            url, connect_args=connect_args, poolclass=StaticPool
+        )
+
+    engine = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+    if pragmas is None:
+        pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+engine = create_db_engine()
 session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -0,0 +1,319 @@
+"""
+SQLite FTS5 indexes over transcription filenames and text, and over the
+text of transcription segments.
+
+transcription_fts and transcription_segment_fts are external-content
+tables: they store only the index and read the columns back from
+transcription and transcription_segment by rowid, and triggers keep them
+in step with every insert, update and delete. Both use the same
+tokenizer, so a word /search finds is found in the segments too.
+"""
+
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "transcription_fts"
+
+# Column order matters: bm25() weights, snippet() and highlight() take
+# column positions
+FTS_COLUMNS = ("filename", "transcription_content")
+
+CREATE_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    filename,
+    transcription_content,
+    content='transcription',
+    content_rowid='id',
+    tokenize='unicode61',
+    prefix='2 3'
+)
+"""
+
+CREATE_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_fts_insert
+    AFTER INSERT ON transcription BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, filename, transcription_content)
+        VALUES (new.id, new.filename, new.transcription_content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_fts_delete
+    AFTER DELETE ON transcription BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, filename, transcription_content)
+        VALUES ('delete', old.id, old.filename, old.transcription_content);
+    END
+    """,  # noqa: E501
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_fts_update
+    AFTER UPDATE OF filename, transcription_content ON transcription BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, filename, transcription_content)
+        VALUES ('delete', old.id, old.filename, old.transcription_content);
+        INSERT INTO {FTS_TABLE}(rowid, filename, transcription_content)
+        VALUES (new.id, new.filename, new.transcription_content);
+    END
+    """,  # noqa: E501
+]
+
+DROP_FTS_TABLE = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+REBUILD_FTS = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+SEGMENT_FTS_TABLE = "transcription_segment_fts"
+
+CREATE_SEGMENT_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEGMENT_FTS_TABLE} USING fts5(
+    text,
+    content='transcription_segment',
+    content_rowid='id',
+    tokenize='unicode61',
+    prefix='2 3'
+)
+"""
+
+CREATE_SEGMENT_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_segment_fts_insert
+    AFTER INSERT ON transcription_segment BEGIN
+        INSERT INTO {SEGMENT_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_segment_fts_delete
+    AFTER DELETE ON transcription_segment BEGIN
+        INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transcription_segment_fts_update
+    AFTER UPDATE OF text ON transcription_segment BEGIN
+        INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {SEGMENT_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+DROP_SEGMENT_FTS_TABLE = f"DROP TABLE IF EXISTS {SEGMENT_FTS_TABLE}"
+
+REBUILD_SEGMENT_FTS = (
+    f"INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}) VALUES ('rebuild')"
+)
+
+# Filename matches rank above the same term in the transcript
+BM25_WEIGHTS = {"filename": 10.0, "transcription_content": 1.0}
+
+SEARCH_SCOPES = ("all", "filename", "content")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def create_fts(conn: Connection, rebuild: bool = False) -> None:
+    """
+    Create the index and its triggers if missing. With rebuild, re-read
+    every existing transcription row into the index.
+    """
+    conn.execute(text(CREATE_FTS_TABLE))
+    for trigger in CREATE_FTS_TRIGGERS:
+        conn.execute(text(trigger))
+    if rebuild:
+        conn.execute(text(REBUILD_FTS))
+
+
+def create_segment_fts(conn: Connection, rebuild: bool = False) -> None:
+    """
+    Create the segment index and its triggers if missing. With rebuild,
+    re-read every existing segment into the index.
+    """
+    conn.execute(text(CREATE_SEGMENT_FTS_TABLE))
+    for trigger in CREATE_SEGMENT_FTS_TRIGGERS:
+        conn.execute(text(trigger))
+    if rebuild:
+        conn.execute(text(REBUILD_SEGMENT_FTS))
+
+
+def build_match_query(query: str, scope: str = "all", prefix: bool = True):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match,
+    as a prefix unless prefix is False. Words are quoted so FTS5 operators
+    typed by the user are searched for literally.
+
+    Returns None when the query has no searchable words.
+    """
+    if scope not in SEARCH_SCOPES:
+        raise ValueError(f"scope must be one of {', '.join(SEARCH_SCOPES)}")
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    column = {
+        "all": "",
+        "filename": "filename : ",
+        "content": "transcription_content : ",
+    }[scope]
+    star = "*" if prefix else ""
+    return " AND ".join(f'{column}"{token}"{star}' for token in tokens)
+
+
+def search(
+    db: Session,
+    query: str,
+    scope: str = "all",
+    prefix: bool = True,
+    limit: int = 50,
+    offset: int = 0,
+    mark: tuple = ("<mark>", "</mark>"),
+    snippet_tokens: int = 16,
+    rank_candidates: int = 0,
+):
+    """
+    Ranked full-text search over transcriptions, best match first.
+
+    Each row has the transcription columns plus rank (BM25, lower is
+    better), snippet (a fragment of the transcript around the matches) and
+    filename_highlight (the filename with matches marked). Every match is
+    ranked unless rank_candidates is set, in which case only that many of
+    the most recent matches are, which bounds latency for words found in a
+    large part of the table; see more_matches_than to tell when it cut the
+    results short.
+    """
+    match = build_match_query(query, scope, prefix)
+    if match is None:
+        return []
+    weights = ", ".join(str(BM25_WEIGHTS[c]) for c in FTS_COLUMNS)
+    # BM25 needs per-row statistics, so scoring every match of a common
+    # word grows with the table. When capped, only matches from the rowid
+    # of the oldest of the newest rank_candidates matches onwards are
+    # scored: walking matches in rowid order is cheap, and FTS5 applies
+    # the rowid bound inside the index.
+    candidates = (
+        f"""
+                AND {FTS_TABLE}.rowid >= (
+                    SELECT min(rowid) FROM (
+                        SELECT rowid FROM {FTS_TABLE}
+                        WHERE {FTS_TABLE} MATCH :match
+                        ORDER BY rowid DESC
+                        LIMIT :candidates
+                    )
+                )"""
+        if rank_candidates
+        else ""
+    )
+    rows = db.execute(
+        text(
+            f"""
+            SELECT t.id, t.filename, t.transcription_content, t.created_at,
+                   bm25({FTS_TABLE}, {weights}) AS rank,
+                   snippet({FTS_TABLE}, 1, :open, :close, '…', :tokens)
+                       AS snippet,
+                   highlight({FTS_TABLE}, 0, :open, :close)
+                       AS filename_highlight
+            FROM {FTS_TABLE}
+            JOIN transcription AS t ON t.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match{candidates}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+            """
+        ),
+        {
+            "match": match,
+            "open": mark[0],
+            "close": mark[1],
+            "tokens": snippet_tokens,
+            "candidates": rank_candidates,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+    return rows.mappings().all()
+
+
+def more_matches_than(
+    db: Session,
+    query: str,
+    count: int,
+    scope: str = "all",
+    prefix: bool = True,
+) -> bool:
+    """
+    Whether query matches more than count transcriptions, i.e. whether a
+    search with rank_candidates=count left some out. Stops counting after
+    count + 1 matches.
+    """
+    match = build_match_query(query, scope, prefix)
+    if match is None:
+        return False
+    matches = db.execute(
+        text(
+            f"""
+            SELECT count(*) FROM (
+                SELECT rowid FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH :match
+                LIMIT :count
+            )
+            """
+        ),
+        {"match": match, "count": count + 1},
+    ).scalar()
+    return matches > count
+
+
+def locate(
+    db: Session,
+    transcription_id: int,
+    query: str,
+    prefix: bool = True,
+    limit: int = 10,
+):
+    """
+    Segments of a transcription matching the words of query as /search
+    matches them, with matched, the number of distinct query words each
+    holds: most words first, earlier segments first among equals.
+
+    Each word is looked up in the segment index on its own and the hits
+    counted per segment, so only matching segments are read. A
+    transcription's segments are inserted together, so the lookups are
+    bounded to the rowids of its first and last segment, which FTS5
+    applies inside the index. Returns rows of id, start, end, text and
+    matched.
+    """
+    words = list(dict.fromkeys(t.lower() for t in _TOKEN.findall(query)))
+    if not words:
+        return []
+    star = "*" if prefix else ""
+    hits = " UNION ALL ".join(
+        f"""
+                SELECT rowid FROM {SEGMENT_FTS_TABLE}
+                WHERE {SEGMENT_FTS_TABLE} MATCH :word{i}
+                    AND rowid BETWEEN (SELECT first FROM bounds)
+                        AND (SELECT last FROM bounds)"""
+        for i in range(len(words))
+    )
+    rows = db.execute(
+        text(
+            f"""
+            WITH bounds AS (
+                SELECT min(id) AS first, max(id) AS last
+                FROM transcription_segment
+                WHERE transcription_id = :transcription_id
+            )
+            SELECT s.id, s.start, s."end", s.text, count(*) AS matched
+            FROM ({hits}
+            ) AS hit
+            JOIN transcription_segment AS s ON s.id = hit.rowid
+            WHERE s.transcription_id = :transcription_id
+            GROUP BY s.id
+            ORDER BY matched DESC, s.start
+            LIMIT :limit
+            """
+        ),
+        {
+            **{f"word{i}": f'"{word}"{star}' for i, word in enumerate(words)},
+            "transcription_id": transcription_id,
+            "limit": limit,
+        },
+    )
+    return rows.all()
@@ -0,0 +1,132 @@
+import logging
+import os
+
+from app.db.fts import (
+    FTS_TABLE,
+    SEGMENT_FTS_TABLE,
+    create_fts,
+    create_segment_fts,
+)
+from app.models.transcription import FilenameCounter
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# Columns added to existing tables after their first release, as
+# (table, column, DDL type). create_all() only creates missing tables,
+# so databases created by an older version need these added in place.
+_ADDED_COLUMNS = [
+    ("transcription", "content_hash", "VARCHAR(64)"),
+    ("transcription_cache", "segments", "TEXT"),
+]
+
+_ADDED_INDEXES = [
+    (
+        "ix_transcription_content_hash",
+        "transcription",
+        "content_hash",
+    ),
+    (
+        "ix_transcription_created_at_id",
+        "transcription",
+        "created_at, id",
+    ),
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Bring an existing database up to the current schema. Every step is
+    idempotent, so this is safe to run on each startup.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, ddl_type in _ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(
+                    text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")  # noqa: E501
+                )
+        for name, table, columns in _ADDED_INDEXES:
+            conn.execute(
+                text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")  # noqa: E501
+            )
+        # Databases from before the full-text index: create it and index
+        # the rows they already hold
+        if (
+            engine.dialect.name == "sqlite"
+            and "transcription" in tables
+            and FTS_TABLE not in tables
+        ):
+            create_fts(conn, rebuild=True)
+        if (
+            engine.dialect.name == "sqlite"
+            and "transcription_segment" in tables
+            and SEGMENT_FTS_TABLE not in tables
+        ):
+            create_segment_fts(conn, rebuild=True)
+        if "transcription" in tables:
+            _add_unique_filename_index(conn, inspector)
+            FilenameCounter.__table__.create(conn, checkfirst=True)
+            _seed_filename_counters(conn)
+
+
+def _add_unique_filename_index(conn: Connection, inspector) -> None:
+    if any(
+        index["unique"] and index["column_names"] == ["filename"]
+        for index in inspector.get_indexes("transcription")
+    ):
+        return
+    duplicate = conn.execute(
+        text(
+            "SELECT filename FROM transcription "
+            "GROUP BY filename HAVING count(*) > 1 LIMIT 1"
+        )
+    ).first()
+    if duplicate is not None:
+        logger.warning(
+            "Not enforcing unique filenames: %r is stored more than once",
+            duplicate[0],
+        )
+        return
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX uq_transcription_filename "
+            "ON transcription (filename)"
+        )
+    )
+
+
+def _seed_filename_counters(conn: Connection) -> None:
+    """
+    Start the filename counters of a database that predates them from the
+    names already stored, so new uploads of a stored name continue after
+    its highest suffix
+    """
+    if conn.execute(text("SELECT 1 FROM filename_counter LIMIT 1")).first():
+        return
+    filenames = {
+        filename
+        for (filename,) in conn.execute(
+            text("SELECT filename FROM transcription")
+        )
+        if filename is not None
+    }
+    counters = dict.fromkeys(filenames, 0)
+    for filename in filenames:
+        # "audio_3.mp3" is the third copy of "audio.mp3", but only if
+        # "audio.mp3" is stored too; "take_2023.mp3" alone is its own name
+        name, ext = os.path.splitext(filename)
+        base, _, suffix = name.rpartition("_")
+        original = f"{base}{ext}"
+        if base and suffix.isdigit() and original in filenames:
+            counters[original] = max(counters[original], int(suffix))
+    if counters:
+        conn.execute(
+            FilenameCounter.__table__.insert(),
+            [{"filename": f, "counter": c} for f, c in counters.items()],
+        )
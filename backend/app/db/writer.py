@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.db.database import session
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """
+    Coalesce writes from concurrent requests into one transaction.
+
+    Callers submit `fn(db, *args)`, which adds rows to the session without
+    committing. A background thread waits for the first pending write,
+    keeps collecting more until either `max_batch_size` are queued or
+    `max_wait_ms` has passed, runs each inside its own savepoint and
+    commits them all at once, so a burst of uploads pays for one fsync.
+    A write that raises only rolls back its own savepoint.
+    """
+
+    def __init__(
+        self,
+        session_factory=session,
+        max_batch_size: int = settings.DB_GROUP_COMMIT_MAX_BATCH,
+        max_wait_ms: int = settings.DB_GROUP_COMMIT_MAX_WAIT_MS,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.writes = 0
+        self._thread = threading.Thread(
+            target=self._run, name="group-commit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, fn, *args) -> Future:
+        """
+        Queue a write for the next transaction
+
+        Returns:
+            Future: resolves to fn's return value once committed. Returned
+            ORM objects stay loaded after the writer's session closes.
+        """
+        if self._closed:
+            raise RuntimeError("GroupCommitWriter is closed")
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    async def write(self, fn, *args):
+        """Submit and await the committed result from the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        pending = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Flush what we have, then let _run see the sentinel
+                self._queue.put(None)
+                break
+            pending.append(item)
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                return
+            pending = [
+                item for item in pending if item[2].set_running_or_notify_cancel()
+            ]
+            if not pending:
+                continue
+            try:
+                self._commit_batch(pending)
+            except Exception:
+                # The commit itself failed: retry one write per transaction
+                # so a single bad write cannot fail its neighbours
+                logger.exception("Group commit failed, retrying writes alone")
+                for item in pending:
+                    self._commit_batch([item])
+
+    def _commit_batch(self, pending):
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            results = []
+            for fn, args, future in pending:
+                try:
+                    with db.begin_nested():
+                        results.append((future, fn(db, *args), None))
+                except Exception as e:
+                    results.append((future, None, e))
+            try:
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(pending) > 1:
+                    raise
+                results = [(future, None, e) for future, _, _ in results]
+            db.expunge_all()
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.writes += len(pending)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    @property
+    def mean_batch_size(self):
+        return self.writes / self.batches if self.batches else 0.0
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "mean_batch_size": self.mean_batch_size,
+        }
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+db_writer = GroupCommitWriter() if settings.DB_GROUP_COMMIT else None
+
+
+def get_db_writer():
+    return db_writer
@@ -0,0 +1,467 @@
+"""
+Bulk ingest: transcribe every audio file under a directory into the
+database, the same rows as uploads through the API.
+
+Run from the `backend` directory:
+
+    python -m app.ingest path/to/audio --workers 8 --batch-size 8
+
+Files are hashed, decoded, resampled and turned into the log-mel features
+of 30s windows in a pool of worker processes, while this process runs
+batched inference on the windows of several files at once. With
+FEATURE_CACHE_DIR set, workers take the features of files seen before
+from the feature cache, so re-ingesting the same audio into a new
+database, e.g. with another model, skips all of that work.
+Transcriptions, their segments and result cache entries are written
+--commit-every files per transaction.
+
+Ingest is resumable: a file whose content hash is already stored is
+skipped before it is decoded, so an interrupted run can be started again
+on the same directory. Progress and throughput are logged every
+--progress-seconds.
+"""
+
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import soundfile as sf
+from app.core.config import settings
+from app.core.model_registry import (
+    ModelRegistry,
+    feature_cache,
+    model_registry,
+)
+from app.core.result_cache import ResultCache, make_cache_key, result_cache
+from app.crud import add_transcriptions
+from app.db.database import engine, session
+from app.db.migrations import run_migrations
+from app.models.transcription import Base, Transcription
+from audio_processor.cpu import configure_threads
+from audio_processor.features import (
+    FeatureCache,
+    FileFeatures,
+    collect_file_features,
+    feature_batches,
+    feature_cache_key,
+)
+from audio_processor.metrics import DecodeTimings
+from audio_processor.stream import iter_file_windows
+from audio_processor.transcriber import (
+    SegmentCollector,
+    TranscriptMerger,
+    window_text,
+)
+from audio_processor.vad import SpeechGate, VoiceActivityDetector
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
+# Bytes read per update when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+SAMPLING_RATE = 16000
+
+# Hashes to skip, feature extractor and cache of a pool worker, set by
+# _init_worker
+_worker = {}
+
+
+def find_audio_files(root, extensions=AUDIO_EXTENSIONS):
+    """Paths of the audio files under root, in a stable order"""
+    extensions = tuple(e.lower() for e in extensions)
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(directory, filename)
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, the content_hash of an upload"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@dataclass
+class PreparedFile:
+    """A file's window features, ready for inference, or why there are none"""
+
+    path: str
+    content_hash: str = None
+    features: FileFeatures = None
+    skipped: bool = False
+    error: str = None
+
+
+def prepare_file(
+    path,
+    extractor,
+    window_s=30,
+    overlap_s=5,
+    vad=False,
+    feature_cache=None,
+    skip_hashes=(),
+):
+    """
+    Hash a file and, unless the hash is in skip_hashes, turn it into the
+    log-mel features of window_s windows overlapping by overlap_s, keeping
+    only the speech if vad. The features are taken from feature_cache when
+    it has them, and added to it otherwise.
+    """
+    prepared = PreparedFile(path)
+    try:
+        prepared.content_hash = hash_file(path)
+        if prepared.content_hash in skip_hashes:
+            prepared.skipped = True
+            return prepared
+        # The default SpeechGate options, as AudioTranscriber.enable_vad()
+        vad_options = {} if vad else None
+        key = None
+        if feature_cache is not None:
+            key = feature_cache_key(
+                prepared.content_hash,
+                extractor,
+                window_s,
+                overlap_s,
+                vad_options,
+            )
+            prepared.features = feature_cache.get(key)
+            if prepared.features is not None:
+                return prepared
+
+        timings = DecodeTimings()
+        timeline = speech = None
+        if vad_options is not None:
+            gate = SpeechGate(
+                VoiceActivityDetector(SAMPLING_RATE), **vad_options
+            )
+            timeline, speech = gate.timeline, gate.filter
+        windows = iter_file_windows(
+            path,
+            SAMPLING_RATE,
+            window_s,
+            overlap_s,
+            timings=timings,
+            speech=speech,
+        )
+        # One window at a time, so only features are held, not audio
+        prepared.features = collect_file_features(
+            feature_batches(windows, extractor, 1),
+            extractor.window_shape,
+            timeline,
+            timings,
+            feature_cache,
+            key,
+        )
+    except (OSError, sf.LibsndfileError, ValueError) as e:
+        prepared.error = str(e)
+    return prepared
+
+
+def _init_worker(skip_hashes, extractor, feature_cache_options):
+    # Workers share the cores, one torch thread each for the STFT
+    configure_threads(intra_op_threads=1)
+    _worker["skip_hashes"] = frozenset(skip_hashes)
+    _worker["extractor"] = extractor
+    _worker["feature_cache"] = (
+        FeatureCache(*feature_cache_options) if feature_cache_options else None
+    )
+
+
+def _prepare_in_worker(path, window_s, overlap_s, vad):
+    return prepare_file(
+        path,
+        _worker["extractor"],
+        window_s,
+        overlap_s,
+        vad,
+        _worker["feature_cache"],
+        _worker["skip_hashes"],
+    )
+
+
+class _PendingFile:
+    def __init__(self, prepared, collector):
+        self.prepared = prepared
+        self.collector = collector
+        self.merger = TranscriptMerger()
+        self.remaining = len(prepared.features.lengths)
+        self.audio_seconds = prepared.features.audio_seconds
+
+
+class Ingester:
+    """
+    Batched inference over the windows of prepared files, in file order,
+    with the results written in bulk transactions
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        registry: ModelRegistry,
+        cache: ResultCache,
+        batch_size: int = 8,
+        commit_every: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.registry = registry
+        self.cache = cache
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.transcriber = registry.get()
+        # Hashes stored or queued in this run, to skip duplicate files
+        self.seen = set()
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self._files = deque()
+        self._windows = deque()
+        self._rows = []
+
+    @property
+    def step_s(self):
+        return (
+            self.transcriber.chunk_length_s - self.transcriber.chunk_overlap_s
+        )
+
+    def add(self, prepared: PreparedFile) -> None:
+        """Queue a prepared file, running inference once a batch is full"""
+        if prepared.error is not None:
+            logger.warning("Skipping %s: %s", prepared.path, prepared.error)
+            self.failed += 1
+            return
+        if prepared.skipped or prepared.content_hash in self.seen:
+            self.skipped += 1
+            return
+        self.seen.add(prepared.content_hash)
+        collector = None
+        if self.registry.decoding.timestamps:
+            collector = SegmentCollector(
+                self.step_s,
+                self.transcriber.chunk_overlap_s,
+                SAMPLING_RATE,
+                prepared.features.timeline,
+            )
+        pending = _PendingFile(prepared, collector)
+        self._files.append(pending)
+        features = prepared.features
+        self._windows.extend(
+            (pending, row, length)
+            for row, length in zip(features.features, features.lengths)
+        )
+        # The features now live in the queue
+        prepared.features = None
+        while len(self._windows) >= self.batch_size:
+            self._run_batch()
+        self._finish_files()
+
+    def flush(self) -> None:
+        """Transcribe and write everything still queued"""
+        while self._windows:
+            self._run_batch()
+        self._finish_files()
+        self._commit()
+
+    def _run_batch(self):
+        batch = [
+            self._windows.popleft()
+            for _ in range(min(self.batch_size, len(self._windows)))
+        ]
+        lengths = [length for _, _, length in batch]
+        results = self.transcriber.transcribe_features(
+            np.stack([row for _, row, _ in batch]),
+            lengths,
+            self.registry.decoding,
+        )
+        for (pending, _, length), result in zip(batch, results):
+            pending.merger.add(
+                window_text(result, length / SAMPLING_RATE, pending.collector)
+            )
+            pending.remaining -= 1
+
+    def _finish_files(self):
+        while self._files and self._files[0].remaining == 0:
+            pending = self._files.popleft()
+            segments = (
+                pending.collector.segments if pending.collector else None
+            )
+            self._rows.append(
+                (pending.prepared, pending.merger.text, segments)
+            )
+            self.done += 1
+            self.audio_seconds += pending.audio_seconds
+        if len(self._rows) >= self.commit_every:
+            self._commit()
+
+    def _commit(self):
+        if not self._rows:
+            return
+        params = self.registry.decoding.cache_params()
+        with self.session_factory() as db:
+            for prepared, text, segments in self._rows:
+                self.cache.put(
+                    db,
+                    make_cache_key(
+                        prepared.content_hash, self.registry.model_name, params
+                    ),
+                    prepared.content_hash,
+                    self.registry.model_name,
+                    text,
+                    segments,
+                )
+            add_transcriptions(
+                db,
+                [
+                    (
+                        os.path.basename(prepared.path),
+                        text,
+                        prepared.content_hash,
+                        segments,
+                    )
+                    for prepared, text, segments in self._rows
+                ],
+            )
+            db.commit()
+        self._rows = []
+
+
+def ingested_hashes(session_factory) -> set:
+    """Content hashes of the transcriptions already stored"""
+    with session_factory() as db:
+        return set(
+            db.execute(
+                select(Transcription.content_hash)
+                .where(Transcription.content_hash.is_not(None))
+                .distinct()
+            ).scalars()
+        )
+
+
+def ingest(
+    paths,
+    ingester,
+    workers,
+    vad=False,
+    skip_hashes=(),
+    feature_cache=None,
+    progress_seconds=10.0,
+):
+    """
+    Prepare paths in a pool of worker processes and feed them to ingester
+    in order, with at most two files per worker decoded ahead
+    """
+    transcriber = ingester.transcriber
+    window_s = transcriber.chunk_length_s
+    overlap_s = transcriber.chunk_overlap_s
+    cache_options = (
+        (feature_cache.directory, feature_cache.max_bytes)
+        if feature_cache is not None
+        else None
+    )
+    start = last_report = time.perf_counter()
+    futures = deque()
+    paths = iter(paths)
+    # Spawn, as for the inference pool, so workers do not inherit the model
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(skip_hashes, transcriber.engine.extractor, cache_options),
+    ) as pool:
+        while True:
+            while len(futures) < 2 * workers:
+                path = next(paths, None)
+                if path is None:
+                    break
+                futures.append(
+                    pool.submit(
+                        _prepare_in_worker, path, window_s, overlap_s, vad
+                    )
+                )
+            if not futures:
+                break
+            ingester.add(futures.popleft().result())
+            if time.perf_counter() - last_report >= progress_seconds:
+                _log_progress(ingester, time.perf_counter() - start)
+                last_report = time.perf_counter()
+    ingester.flush()
+    _log_progress(ingester, time.perf_counter() - start)
+
+
+def _log_progress(ingester, elapsed):
+    logger.info(
+        "done=%d skipped=%d failed=%d files_per_second=%.2f "
+        "audio_seconds_per_second=%.1f",
+        ingester.done,
+        ingester.skipped,
+        ingester.failed,
+        ingester.done / elapsed if elapsed else 0.0,
+        ingester.audio_seconds / elapsed if elapsed else 0.0,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("root", help="Directory to ingest, recursively")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--commit-every", type=int, default=100)
+    parser.add_argument(
+        "--extensions", nargs="+", default=list(AUDIO_EXTENSIONS)
+    )
+    parser.add_argument(
+        "--vad",
+        action=argparse.BooleanOptionalAction,
+        default=settings.VAD_ENABLED,
+    )
+    parser.add_argument("--progress-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    skip_hashes = ingested_hashes(session)
+    paths = list(find_audio_files(args.root, args.extensions))
+    logger.info(
+        "Found %d files, %d hashes already ingested",
+        len(paths),
+        len(skip_hashes),
+    )
+    ingester = Ingester(
+        session,
+        model_registry,
+        result_cache,
+        batch_size=args.batch_size,
+        commit_every=args.commit_every,
+    )
+    ingest(
+        paths,
+        ingester,
+        args.workers,
+        vad=args.vad,
+        skip_hashes=skip_hashes,
+        feature_cache=feature_cache,
+        progress_seconds=args.progress_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,58 @@
-from app.api.routes import transcription
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from app.api.routes import jobs, transcription
 from app.core.config import settings
+from app.core.executor import inference_executor
+from app.core.jobs import job_runner
+from app.core.metrics import metrics
+from app.core.model_registry import model_registry
 from app.db.database import engine
+from app.db.migrations import run_migrations
+from app.db.writer import db_writer
 from app.models.transcription import Base
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.routing import APIRoute
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Room for the multipart boundary and form fields around an upload's audio
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create missing tables and bring older databases up to date before
+    # anything touches them, rather than whenever the app is imported
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    # Load the shared Whisper model once per worker before serving traffic.
+    # A failure here is not fatal, the registry retries on the first upload.
+    # Process pool workers load their own copy, so skip it in the parent.
+    if settings.MODEL_PRELOAD and inference_executor.kind == "thread":
+        try:
+            model_registry.load()
+            if settings.MODEL_WARMUP:
+                model_registry.warm_up()
+        except Exception:
+            logger.exception("Model preload failed, deferring to first use")
+    # Resume jobs left queued or running by the previous process
+    job_runner.start()
+    yield
+    # Job workers drain the queue through the executor on this loop, so
+    # wait for them without blocking it
+    await asyncio.to_thread(job_runner.stop)
+    if db_writer is not None:
+        db_writer.close()
+    inference_executor.shutdown()
+    model_registry.unload()
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -18,6 +63,7 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -28,8 +74,34 @@ if settings.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Response headers the frontend may read, see the routes
+        expose_headers=["X-Next-Cursor", "X-Search-Truncated"],
     )
 
+
+@app.middleware("http")
+async def track_in_flight(request: Request, call_next):
+    with metrics.track_request():
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # A body declared larger than any allowed upload is refused before it
+    # is read; bodies without a Content-Length are checked while spooling
+    length = request.headers.get("content-length", "")
+    limit = settings.UPLOAD_MAX_BYTES
+    if request.url.path.endswith("/transcribe/batch"):
+        limit *= settings.BATCH_UPLOAD_MAX_FILES
+    if limit and length.isdigit() and int(length) > limit + UPLOAD_FORM_OVERHEAD:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds the limit of {limit} bytes"},
+        )
+    return await call_next(request)
+
+
 app.include_router(
     transcription.router, prefix=settings.API_V1_STR, tags=["transcription"]
 )
+app.include_router(jobs.router, prefix=settings.API_V1_STR, tags=["jobs"])
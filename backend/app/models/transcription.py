@@ -1,4 +1,20 @@
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.db.fts import (
+    DROP_FTS_TABLE,
+    DROP_SEGMENT_FTS_TABLE,
+    create_fts,
+    create_segment_fts,
+)
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -9,6 +25,118 @@ class Transcription(Base):
     __tablename__ = "transcription"
 
     id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String(255), index=True)
+    filename = Column(String(255), unique=True, index=True)
     transcription_content = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # SHA-256 of the uploaded bytes
+    content_hash = Column(String(64), index=True)
+
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_transcription_created_at_id", "created_at", "id"),
+    )
+    # Read created_at back with the INSERT, so a row is complete without a
+    # refresh after commit
+    __mapper_args__ = {"eager_defaults": True}
+
+
+@event.listens_for(Transcription.__table__, "after_create")
+def _create_transcription_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_fts(connection)
+
+
+@event.listens_for(Transcription.__table__, "before_drop")
+def _drop_transcription_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(DROP_FTS_TABLE)
+
+
+class TranscriptionSegment(Base):
+    """
+    A timestamped stretch of a transcription, times in seconds from the
+    start of the uploaded audio
+    """
+
+    __tablename__ = "transcription_segment"
+
+    id = Column(Integer, primary_key=True)
+    transcription_id = Column(
+        Integer, ForeignKey("transcription.id"), nullable=False
+    )
+    start = Column(Float, nullable=False)
+    end = Column(Float, nullable=False)
+    text = Column(Text, nullable=False)
+
+    __table_args__ = (
+        # Segments of one transcription in time order, for range queries
+        Index(
+            "ix_transcription_segment_transcription_id_start",
+            "transcription_id",
+            "start",
+        ),
+    )
+
+
+@event.listens_for(TranscriptionSegment.__table__, "after_create")
+def _create_segment_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_segment_fts(connection)
+
+
+@event.listens_for(TranscriptionSegment.__table__, "before_drop")
+def _drop_segment_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(DROP_SEGMENT_FTS_TABLE)
+
+
+class FilenameCounter(Base):
+    """
+    Highest suffix handed out per uploaded filename: 0 once the name itself
+    is taken, n once name_n.ext is
+    """
+
+    __tablename__ = "filename_counter"
+
+    filename = Column(String(255), primary_key=True)
+    counter = Column(Integer, nullable=False)
+
+
+class TranscriptionCacheEntry(Base):
+    """
+    Transcription text keyed by content hash, model and decoding parameters
+    """
+
+    __tablename__ = "transcription_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    content_hash = Column(String(64), index=True, nullable=False)
+    model_name = Column(String(255), nullable=False)
+    transcription_content = Column(Text, nullable=False)
+    # JSON list of the transcription's segments, null without timestamps
+    segments = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TranscriptionJob(Base):
+    """
+    Queued asynchronous transcription. The upload is kept on disk at
+    audio_path until the job finishes, so queued jobs survive a restart.
+    """
+
+    __tablename__ = "transcription_job"
+
+    id = Column(String(32), primary_key=True)
+    # queued, running, done or failed
+    status = Column(String(16), index=True, nullable=False)
+    original_filename = Column(String(255), nullable=False)
+    content_hash = Column(String(64))
+    audio_path = Column(String(1024))
+    transcription_id = Column(Integer, ForeignKey("transcription.id"))
+    error = Column(Text)
+    created_at = Column(DateTime, index=True, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    queue_seconds = Column(Float)
+    run_seconds = Column(Float)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -19,3 +20,70 @@ class TranscriptionResponse(TranscriptionBase):
 
     class Config:
         from_attributes = True
+
+
+class BatchFileResult(BaseModel):
+    original_filename: str
+    # The stored transcription, None when the file failed
+    transcription: Optional[TranscriptionResponse] = None
+    # Served from the result cache without running Whisper
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class BatchTranscriptionResponse(BaseModel):
+    # One per uploaded file, in upload order
+    results: List[BatchFileResult]
+    succeeded: int
+    failed: int
+
+
+class TranscriptionSummary(BaseModel):
+    id: int
+    filename: str
+    # None when the listing omits content
+    transcription_content: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SearchResult(TranscriptionResponse):
+    # BM25 score, lower is a better match
+    rank: float
+    snippet: Optional[str] = None
+    filename_highlight: Optional[str] = None
+
+
+class SegmentResponse(BaseModel):
+    id: int
+    # Seconds from the start of the audio
+    start: float
+    end: float
+    text: str
+
+    class Config:
+        from_attributes = True
+
+
+class SegmentMatch(SegmentResponse):
+    # Number of query words found in the segment
+    matched: int
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    original_filename: str
+    transcription_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    transcription: Optional[TranscriptionResponse] = None
+
+    class Config:
+        from_attributes = True
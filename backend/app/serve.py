@@ -0,0 +1,128 @@
+"""
+Serve the API from several worker processes sharing one copy of the model
+weights.
+
+Run from the `backend` directory:
+
+    python -m app.serve
+    python -m app.serve --workers 4 --port 8000
+
+uvicorn starts each worker as a fresh process, so a model loaded here
+would not be inherited; this process imports neither torch nor the app
+and stays small. It downloads the checkpoint once, creates the tables
+and re-queues interrupted jobs, and then every worker loads the model
+itself: from_pretrained memory-maps the fp32 safetensors weights, so they
+sit once in the page cache whatever the number of workers, and only
+activations and the rest of the process are per worker (see GET /model,
+shared_bytes). The "int8" CPU profile and the ONNX engine build their own
+weights in every worker and are not shared.
+
+Each worker runs the whole app with its own executor, batcher and
+in-memory caches, and gets cores // workers torch threads unless
+TORCH_INTRA_OP_THREADS is set.
+"""
+
+import argparse
+import logging
+import os
+
+import uvicorn
+from app.core.config import settings
+from app.crud import requeue_interrupted_jobs
+from app.db.database import engine, session
+from app.db.migrations import run_migrations
+from app.models.transcription import Base
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint files a worker loads, so the .bin and framework duplicates on
+# the hub are not downloaded
+CHECKPOINT_PATTERNS = ["*.json", "*.txt", "*.safetensors"]
+
+
+def threads_per_worker(workers: int, cpus: int | None = None) -> int:
+    """
+    Intra-op threads for each of `workers` processes splitting `cpus`
+    cores, by default those this process may run on, at least one
+    """
+    if cpus is None:
+        try:
+            cpus = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cpus = os.cpu_count() or 1
+    return max(1, cpus // max(1, workers))
+
+
+def worker_environment(workers: int, cpus: int | None = None) -> dict:
+    """
+    Environment variables to start `workers` worker processes with on
+    `cpus` cores, leaving settings already made alone
+    """
+    environment = {}
+    if not settings.TORCH_INTRA_OP_THREADS:
+        threads = str(threads_per_worker(workers, cpus))
+        environment["TORCH_INTRA_OP_THREADS"] = threads
+        # numpy's BLAS and OpenMP pools, used outside of torch
+        if "OMP_NUM_THREADS" not in os.environ:
+            environment["OMP_NUM_THREADS"] = threads
+    if workers > 1:
+        # Jobs left running were re-queued here, siblings' are not
+        environment["JOB_REQUEUE_RUNNING"] = "false"
+    return environment
+
+
+def prefetch_model(model_id: str) -> None:
+    """
+    Download the checkpoint to the Hugging Face cache, so the workers
+    find it there rather than all downloading it at once
+    """
+    if settings.INFERENCE_ENGINE == "stub" or os.path.isdir(model_id):
+        return
+    from huggingface_hub import snapshot_download
+
+    try:
+        snapshot_download(model_id, allow_patterns=CHECKPOINT_PATTERNS)
+    except Exception:
+        logger.exception("Could not prefetch %s", model_id)
+
+
+def prepare_database() -> None:
+    """Create tables, migrate and re-queue jobs before any worker starts"""
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with session() as db:
+        requeued = requeue_interrupted_jobs(db)
+    if requeued:
+        logger.info("Re-queued %d interrupted jobs", requeued)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split("\n\n")[0]
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+
+    environment = worker_environment(args.workers)
+    os.environ.update(environment)
+    logger.info("Starting %d workers with %s", args.workers, environment)
+    prefetch_model(settings.WHISPER_MODEL_ID)
+    if args.workers > 1:
+        prepare_database()
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=settings.LOG_LEVEL.lower(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent `generate` calls into one batched model call.
+
+    Callers submit log-mel features of shape (n, n_mels, frames) from any
+    thread. A background thread waits for the first pending request, keeps
+    collecting more until either `max_batch_size` windows are queued or
+    `max_wait_ms` has passed, runs `generate_fn` once on the concatenated
+    features and hands each caller back its own slice of the decoded texts.
+    Requests with different generate keyword arguments (decoding options)
+    are run as separate batches, except for max_new_tokens: that budget
+    follows each window's length, so it would split almost every batch.
+    A group takes the largest budget among its requests instead.
+    """
+
+    def __init__(self, generate_fn, max_batch_size=8, max_wait_ms=10):
+        self.generate_fn = generate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.windows = 0
+        self._thread = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, input_features, **generate_kwargs):
+        """
+        Queue features for the next batch
+
+        Returns:
+            Future: resolves to the list of decoded texts, one per window
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((input_features, generate_kwargs, future))
+        return future
+
+    def generate(self, input_features, **generate_kwargs):
+        """Blocking helper: submit and wait for the decoded texts"""
+        return self.submit(input_features, **generate_kwargs).result()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        pending = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Flush what we have, then let _run see the sentinel
+                self._queue.put(None)
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                return
+            groups = {}
+            budgets = {}
+            for features, kwargs, future in pending:
+                if future.set_running_or_notify_cancel():
+                    kwargs = dict(kwargs)
+                    budget = kwargs.pop("max_new_tokens", None)
+                    # Capped and uncapped requests still run apart
+                    key = (tuple(sorted(kwargs.items())), budget is None)
+                    groups.setdefault(key, []).append((features, future))
+                    if budget is not None:
+                        budgets[key] = max(budgets.get(key, 0), budget)
+            for key, group in groups.items():
+                generate_kwargs = dict(key[0])
+                if key in budgets:
+                    generate_kwargs["max_new_tokens"] = budgets[key]
+                self._generate(group, generate_kwargs)
+
+    def _generate(self, pending, generate_kwargs):
+        try:
+            features = _concat([features for features, _ in pending])
+            texts = self.generate_fn(features, **generate_kwargs)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.windows += len(texts)
+        offset = 0
+        for features, future in pending:
+            future.set_result(texts[offset : offset + len(features)])
+            offset += len(features)
+
+    @property
+    def mean_batch_size(self):
+        return self.windows / self.batches if self.batches else 0.0
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "mean_batch_size": self.mean_batch_size,
+        }
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+def _concat(batches):
+    # NumPy features from the engines, torch ones from callers that made
+    # their own
+    if isinstance(batches[0], torch.Tensor):
+        return torch.cat(batches)
+    return np.concatenate(batches)
@@ -0,0 +1,89 @@
+import bisect
+import itertools
+import logging
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# fp32: the model as loaded. int8: Linear layers dynamically quantised to
+# int8 weights, activations quantised on the fly per batch
+CPU_PROFILES = ("fp32", "int8")
+
+
+def configure_threads(intra_op_threads=0, inter_op_threads=0):
+    """
+    Pin torch's thread pools for this process; 0 keeps torch's default.
+    Each worker process should get its share of the cores, otherwise
+    several workers each start one thread per core and contend.
+    """
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Only settable before the first inter-op parallel work
+            logger.warning(
+                "Inter-op threads already started, keeping %d",
+                torch.get_num_interop_threads(),
+            )
+
+
+def file_backed_bytes(model):
+    """
+    Bytes of the model's parameters and buffers held in file-backed
+    memory maps rather than in the process's own memory, or None where
+    /proc/self/maps is unavailable. from_pretrained leaves safetensors
+    weights it does not need to convert mapped this way, and their pages
+    are then shared by every process that maps the same file.
+    """
+    try:
+        with open("/proc/self/maps") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    regions = []
+    for line in lines:
+        # address perms offset dev inode [path], inode 0 being anonymous
+        fields = line.split()
+        if len(fields) >= 6 and fields[4] != "0":
+            start, end = fields[0].split("-")
+            regions.append((int(start, 16), int(end, 16)))
+    regions.sort()
+    starts = [start for start, _ in regions]
+
+    total = 0
+    seen = set()
+    for tensor in itertools.chain(model.parameters(), model.buffers()):
+        address = tensor.data_ptr()
+        if address in seen or not tensor.numel():
+            continue
+        seen.add(address)
+        i = bisect.bisect_right(starts, address) - 1
+        size = tensor.numel() * tensor.element_size()
+        if i >= 0 and address + size <= regions[i][1]:
+            total += size
+    return total
+
+
+def optimise_for_cpu(model, profile="fp32", compile_encoder=False):
+    """
+    Prepare a Whisper model for CPU inference with one of CPU_PROFILES,
+    optionally compiling the encoder with torch.compile. Only the encoder
+    is compiled: its input is always one 30s window, so it compiles once,
+    while the decoder's growing sequence length would keep recompiling.
+    """
+    if profile not in CPU_PROFILES:
+        raise ValueError(
+            f"Unknown CPU profile {profile!r}, expected one of {CPU_PROFILES}"
+        )
+    model.eval()
+    if profile == "int8":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if compile_encoder:
+        encoder = model.get_encoder()
+        encoder.forward = torch.compile(encoder.forward)
+    return model
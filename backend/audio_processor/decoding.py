@@ -0,0 +1,121 @@
+import math
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+from transformers.models.whisper.tokenization_whisper import (
+    LANGUAGES,
+    TO_LANGUAGE_CODE,
+)
+
+TASKS = ("transcribe", "translate")
+
+# Named starting points for DecodingOptions
+DECODING_PROFILES = {
+    "greedy": {"beam_size": 1, "temperature_fallback": False},
+    "beam": {"beam_size": 5, "temperature_fallback": False},
+    # Beam search, re-decoding by sampling at rising temperatures when the
+    # output looks like a repetition loop or has a low log-probability
+    "accurate": {"beam_size": 5, "temperature_fallback": True},
+}
+
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+# Thresholds from the Whisper paper, with the compression ratio measured
+# on token ids as transformers does
+COMPRESSION_RATIO_THRESHOLD = 1.35
+LOGPROB_THRESHOLD = -1.0
+
+# Headroom over the per-second budget, for short windows and punctuation
+MIN_NEW_TOKENS = 16
+# Whisper's decoder holds 448 positions, less the start-of-transcript,
+# language, task and no-timestamps prompt
+MAX_NEW_TOKENS = 444
+MAX_BEAM_SIZE = 10
+
+
+@dataclass(frozen=True)
+class DecodingOptions:
+    """
+    How generate decodes each window.
+
+    The defaults leave the checkpoint's generation config alone: greedy
+    search, the language detected per window and up to the decoder's full
+    length. Forcing the language skips detection, and a max_tokens_per_second
+    budget stops a window that has fallen into a repetition loop long
+    before it fills the decoder.
+    """
+
+    beam_size: int = 1
+    # Whisper language code or name, None to detect it
+    language: Optional[str] = None
+    task: str = "transcribe"
+    temperature_fallback: bool = False
+    # Cap on generated tokens per second of window audio, 0 for no cap
+    max_tokens_per_second: float = 0.0
+    # Decode with timestamp tokens, returning (start, end, text) segments
+    timestamps: bool = False
+
+    def __post_init__(self):
+        if not 1 <= self.beam_size <= MAX_BEAM_SIZE:
+            raise ValueError(
+                f"beam_size must be between 1 and {MAX_BEAM_SIZE}"
+            )
+        if self.task not in TASKS:
+            raise ValueError(f"Unknown task {self.task!r}, expected {TASKS}")
+        if self.max_tokens_per_second < 0:
+            raise ValueError("max_tokens_per_second must not be negative")
+        if self.language is not None:
+            language = self.language.strip().lower()
+            language = TO_LANGUAGE_CODE.get(language, language)
+            if language not in LANGUAGES:
+                raise ValueError(f"Unsupported language {self.language!r}")
+            object.__setattr__(self, "language", language)
+
+    def override(self, profile=None, **fields):
+        """
+        Copy with a profile's search settings and then any fields that are
+        not None applied on top, as a request overrides the deployment's
+        defaults
+        """
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if profile is not None:
+            if profile not in DECODING_PROFILES:
+                raise ValueError(
+                    f"Unknown decoding profile {profile!r}, expected one of "
+                    f"{tuple(DECODING_PROFILES)}"
+                )
+            fields = {**DECODING_PROFILES[profile], **fields}
+        return replace(self, **fields)
+
+    def max_new_tokens(self, duration_s):
+        """Token budget for a window of duration_s seconds, None if uncapped"""
+        if not self.max_tokens_per_second:
+            return None
+        budget = math.ceil(duration_s * self.max_tokens_per_second)
+        return min(budget + MIN_NEW_TOKENS, MAX_NEW_TOKENS)
+
+    def generate_kwargs(self, duration_s):
+        """
+        Keyword arguments for Whisper's generate on windows of up to
+        duration_s seconds; settings at their defaults are left out
+        """
+        kwargs = {}
+        if self.beam_size > 1:
+            kwargs["num_beams"] = self.beam_size
+        if self.language is not None:
+            kwargs["language"] = self.language
+        if self.task != "transcribe":
+            kwargs["task"] = self.task
+        if self.timestamps:
+            kwargs["return_timestamps"] = True
+        if self.temperature_fallback:
+            kwargs["temperature"] = FALLBACK_TEMPERATURES
+            kwargs["compression_ratio_threshold"] = COMPRESSION_RATIO_THRESHOLD
+            kwargs["logprob_threshold"] = LOGPROB_THRESHOLD
+        max_new_tokens = self.max_new_tokens(duration_s)
+        if max_new_tokens is not None:
+            kwargs["max_new_tokens"] = max_new_tokens
+        return kwargs
+
+    def cache_params(self):
+        """The options as a dict, for result cache keys"""
+        return asdict(self)
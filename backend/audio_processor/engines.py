@@ -0,0 +1,561 @@
+import logging
+import os
+
+import numpy as np
+import torch
+from transformers import (
+    GenerationConfig,
+    WhisperFeatureExtractor,
+    WhisperForConditionalGeneration,
+    WhisperProcessor,
+)
+
+from audio_processor.cpu import optimise_for_cpu
+from audio_processor.features import LogMelExtractor
+from audio_processor.metrics import StageObserver
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("transformers", "onnx", "stub")
+
+# Files written by `optimum-cli export onnx --task
+# automatic-speech-recognition-with-past`
+ONNX_ENCODER = "encoder_model.onnx"
+ONNX_DECODER = "decoder_model.onnx"
+ONNX_DECODER_WITH_PAST = "decoder_with_past_model.onnx"
+
+# Seconds per timestamp token step
+TIME_PRECISION = 0.02
+# Latest timestamp a window's first segment may start at, in token steps
+MAX_INITIAL_TIMESTAMP_INDEX = 50
+
+
+class InferenceEngine:
+    """
+    A Whisper implementation as AudioTranscriber uses it.
+
+    Subclasses load the model and processor, run the encoder once per
+    window and the decoder one step at a time with a key/value cache;
+    log-mel features come from a LogMelExtractor built with the
+    processor's settings. generate_ids is a greedy decoder built on
+    encode and decode that follows Whisper's prompt format, so any engine
+    that implements those two gets batched generation for free.
+    """
+
+    name = None
+
+    def __init__(self, model_name, processor=None):
+        self.model_name = model_name
+        self.processor = processor
+        self.generation_config = None
+        # STFT backend of the feature extractor, "torch" or "numpy"
+        self.feature_stft = "torch"
+        self._extractor = None
+        # Times generate and detokenize, see AudioTranscriber.enable_metrics
+        self.observer = StageObserver()
+
+    def load(self):
+        raise NotImplementedError
+
+    @property
+    def extractor(self):
+        """The LogMelExtractor for the loaded processor"""
+        if self._extractor is None:
+            self._extractor = LogMelExtractor.from_processor(
+                self.processor, self.feature_stft
+            )
+        return self._extractor
+
+    def features(self, audio):
+        """
+        Log-mel input features of a 16kHz array, or a list of arrays for a
+        batch of windows, as float32 of shape (n, n_mels, frames)
+        """
+        return self.extractor(audio)
+
+    def encode(self, features):
+        """Encoder hidden states of a batch of features"""
+        raise NotImplementedError
+
+    def decode(self, encoder_states, input_ids, cache=None):
+        """
+        Run the decoder on int64 input_ids of shape (n, tokens), continuing
+        from cache when given
+        Returns: float32 logits of the last position, shape (n, vocab),
+            and the cache for the next step
+        """
+        raise NotImplementedError
+
+    def generate_batch(
+        self, features, return_timestamps=False, **generate_kwargs
+    ):
+        """
+        Decoded text of every row of a batch of features, see
+        audio_processor.decoding for the keyword arguments. With
+        return_timestamps, each row is instead a list of (start, end, text)
+        segments, see split_segments.
+        """
+        with self.observer.timed("generate"):
+            ids = self.generate_ids(
+                features, timestamps=return_timestamps, **generate_kwargs
+            )
+        return self.detokenize(ids, return_timestamps)
+
+    def detokenize(self, ids, timestamps=False):
+        """Text of each row of generated ids, or segments with timestamps"""
+        with self.observer.timed("detokenize"):
+            if timestamps:
+                return self.split_segments(ids)
+            return self.processor.batch_decode(ids, skip_special_tokens=True)
+
+    @property
+    def timestamp_begin(self):
+        """Id of the first timestamp token, <|0.00|>"""
+        return self.generation_config.no_timestamps_token_id + 1
+
+    def split_segments(self, ids):
+        """
+        Cut each row of generated ids into segments at its timestamp
+        tokens. Times are seconds from the start of the window; a segment
+        the model did not close ends at None.
+        """
+        timestamp_begin = self.timestamp_begin
+        eos = self.generation_config.eos_token_id
+        rows = []
+        for row in np.asarray(ids).tolist():
+            segments = []
+            start, time, piece = None, 0.0, []
+            for token in row:
+                if token == eos:
+                    break
+                if token < timestamp_begin:
+                    piece.append(token)
+                    continue
+                time = (token - timestamp_begin) * TIME_PRECISION
+                if start is not None and piece:
+                    segments.append((start, time, piece))
+                    start = None
+                else:
+                    # Opening timestamp; anything before it is the prompt
+                    start = time
+                piece = []
+            if piece:
+                # Unclosed: from its opening timestamp, else the last one
+                segments.append(
+                    (time if start is None else start, None, piece)
+                )
+            rows.append(
+                [
+                    (start, end, text)
+                    for start, end, piece in segments
+                    if (
+                        text := self.processor.decode(
+                            piece, skip_special_tokens=True
+                        )
+                    ).strip()
+                ]
+            )
+        return rows
+
+    def prompt_ids(
+        self,
+        encoder_states,
+        batch_size,
+        language=None,
+        task=None,
+        timestamps=False,
+    ):
+        """
+        Whisper's start-of-transcript prompt for each row: the start token,
+        the language and task on multilingual models, and no-timestamps
+        unless timestamps are wanted. The language is detected per row
+        unless one is given.
+        """
+        config = self.generation_config
+        prompt = np.full((batch_size, 1), config.decoder_start_token_id)
+        lang_to_id = getattr(config, "lang_to_id", None)
+        if lang_to_id:
+            if language is not None:
+                detected = np.full(batch_size, lang_to_id[f"<|{language}|>"])
+            else:
+                # Language detection: the most likely language token after
+                # the start token
+                logits, _ = self.decode(encoder_states, prompt)
+                languages = np.array(sorted(lang_to_id.values()))
+                detected = languages[logits[:, languages].argmax(axis=1)]
+            task = config.task_to_id[task or "transcribe"]
+            prompt = np.column_stack(
+                [prompt, detected, np.full(batch_size, task)]
+            )
+        no_timestamps = getattr(config, "no_timestamps_token_id", None)
+        if no_timestamps is not None and not timestamps:
+            prompt = np.column_stack(
+                [prompt, np.full(batch_size, no_timestamps)]
+            )
+        return prompt.astype(np.int64)
+
+    def generate_ids(
+        self,
+        features,
+        language=None,
+        task=None,
+        max_new_tokens=None,
+        timestamps=False,
+        **unsupported,
+    ):
+        """
+        Greedy decoding of a batch of features, reusing the decoder's
+        key/value cache between steps. With timestamps, segments are
+        delimited by timestamp tokens under Whisper's timestamp rules.
+        Returns: int64 array of prompt and generated token ids per row,
+            padded with the end-of-text token
+        """
+        if unsupported:
+            raise ValueError(
+                f"The {self.name} engine only decodes greedily, without "
+                f"{', '.join(sorted(unsupported))}"
+            )
+        config = self.generation_config
+        eos = config.eos_token_id
+        encoder_states = self.encode(features)
+        batch_size = len(features)
+        prompt = self.prompt_ids(
+            encoder_states, batch_size, language, task, timestamps
+        )
+        steps = (config.max_length or 448) - prompt.shape[1]
+        if max_new_tokens is not None:
+            steps = min(steps, max_new_tokens)
+
+        logits, cache = self.decode(encoder_states, prompt)
+        tokens = [prompt]
+        finished = np.zeros(batch_size, dtype=bool)
+        for step in range(steps):
+            if config.suppress_tokens:
+                logits[:, config.suppress_tokens] = -np.inf
+            if step == 0 and config.begin_suppress_tokens:
+                logits[:, config.begin_suppress_tokens] = -np.inf
+            if timestamps:
+                self._apply_timestamp_rules(
+                    logits, np.concatenate(tokens[1:] or [prompt[:, :0]], 1)
+                )
+            next_ids = logits.argmax(axis=1)
+            next_ids[finished] = eos
+            tokens.append(next_ids[:, None])
+            finished |= next_ids == eos
+            if finished.all():
+                break
+            logits, cache = self.decode(
+                encoder_states, next_ids[:, None].astype(np.int64), cache
+            )
+        return np.concatenate(tokens, axis=1)
+
+    def _apply_timestamp_rules(self, logits, generated):
+        """
+        Mask logits in place so timestamps come in increasing pairs around
+        text, as Whisper was trained to produce them
+        """
+        timestamp_begin = self.timestamp_begin
+        eos = self.generation_config.eos_token_id
+        logits[:, timestamp_begin - 1] = -np.inf  # no-timestamps
+        if generated.shape[1] == 0:
+            # Start with a timestamp near the beginning of the window
+            logits[:, :timestamp_begin] = -np.inf
+            logits[:, timestamp_begin + MAX_INITIAL_TIMESTAMP_INDEX + 1 :] = (
+                -np.inf
+            )
+            return
+        for row, seq in zip(logits, generated):
+            last = seq[-1] >= timestamp_begin
+            penultimate = len(seq) < 2 or seq[-2] >= timestamp_begin
+            if last and penultimate:
+                # A segment was just opened: text must follow
+                row[timestamp_begin:] = -np.inf
+            elif last:
+                # A segment was just closed: another timestamp or the end
+                eos_logit = row[eos]
+                row[:timestamp_begin] = -np.inf
+                row[eos] = eos_logit
+            stamps = seq[seq >= timestamp_begin]
+            if len(stamps):
+                # Never go back in time, and only repeat a timestamp to
+                # open the segment after the one it closed
+                floor = stamps[-1] + (0 if last and not penultimate else 1)
+                row[timestamp_begin:floor] = -np.inf
+            # Prefer a timestamp when they are together likelier than any
+            # single text token
+            total = np.logaddexp.reduce(row)
+            if not np.isfinite(total):
+                continue
+            logprobs = row - total
+            timestamp_logprob = np.logaddexp.reduce(logprobs[timestamp_begin:])
+            if timestamp_logprob > logprobs[:timestamp_begin].max():
+                row[:timestamp_begin] = -np.inf
+
+
+class TransformersEngine(InferenceEngine):
+    """
+    WhisperForConditionalGeneration on torch, on CUDA when available and
+    otherwise prepared with one of the audio_processor.cpu profiles.
+    generate_batch goes through the model's own generate.
+    """
+
+    name = "transformers"
+
+    def __init__(
+        self,
+        model_name,
+        cpu_profile="fp32",
+        compile_encoder=False,
+        processor=None,
+    ):
+        super().__init__(model_name, processor)
+        self.cpu_profile = cpu_profile
+        self.compile_encoder = compile_encoder
+        self.model = None
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def load(self):
+        if self.processor is None:
+            self.processor = WhisperProcessor.from_pretrained(self.model_name)
+        self.model = WhisperForConditionalGeneration.from_pretrained(
+            self.model_name
+        )
+        self.generation_config = self.model.generation_config
+        if self.device == "cuda":
+            self.model = self.model.to("cuda")
+            self.cpu_profile = None
+        else:
+            self.model = optimise_for_cpu(
+                self.model, self.cpu_profile, self.compile_encoder
+            )
+        return self
+
+    def encode(self, features):
+        with torch.inference_mode():
+            return self.model.get_encoder()(
+                torch.as_tensor(features).to(self.device)
+            ).last_hidden_state
+
+    def decode(self, encoder_states, input_ids, cache=None):
+        with torch.inference_mode():
+            output = self.model(
+                encoder_outputs=(encoder_states,),
+                decoder_input_ids=torch.from_numpy(input_ids).to(self.device),
+                past_key_values=cache,
+                use_cache=True,
+            )
+        logits = output.logits[:, -1].float().cpu().numpy()
+        return logits, output.past_key_values
+
+    def generate_batch(
+        self, features, return_timestamps=False, **generate_kwargs
+    ):
+        features = torch.as_tensor(features).to(self.device)
+        if return_timestamps:
+            generate_kwargs["return_timestamps"] = True
+        # Generate token ids, without autograd bookkeeping
+        with self.observer.timed("generate"), torch.inference_mode():
+            predicted_ids = self.model.generate(features, **generate_kwargs)
+            if return_timestamps:
+                predicted_ids = predicted_ids.cpu()
+        return self.detokenize(predicted_ids, return_timestamps)
+
+
+class OnnxEngine(InferenceEngine):
+    """
+    Whisper exported to ONNX, run with ONNX Runtime on the CPU.
+
+    Uses the encoder, decoder and decoder-with-past graphs written by
+    optimum's exporter. The model is exported into model_dir on first use
+    when the files are missing; that needs `optimum[exporters]`, running
+    needs only `onnxruntime`. The "int8" CPU profile quantises the graphs'
+    weights with ONNX Runtime's dynamic quantisation. Sessions use as many
+    threads as torch was given, see audio_processor.cpu.configure_threads.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_name,
+        model_dir=None,
+        cpu_profile="fp32",
+        processor=None,
+    ):
+        super().__init__(model_name, processor)
+        self.model_dir = model_dir or os.path.join(
+            "onnx_models", model_name.replace("/", "--")
+        )
+        self.cpu_profile = cpu_profile
+        self.encoder = None
+        self.decoder = None
+        self.decoder_with_past = None
+
+    def load(self):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "The onnx engine needs onnxruntime: pip install onnxruntime"
+            ) from e
+
+        if not os.path.exists(os.path.join(self.model_dir, ONNX_ENCODER)):
+            export_onnx(self.model_name, self.model_dir)
+        graph_dir = self.model_dir
+        if self.cpu_profile == "int8":
+            graph_dir = quantise_onnx(self.model_dir)
+        elif self.cpu_profile != "fp32":
+            raise ValueError(f"Unknown CPU profile {self.cpu_profile!r}")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+
+        def session(filename):
+            return onnxruntime.InferenceSession(
+                os.path.join(graph_dir, filename),
+                options,
+                providers=["CPUExecutionProvider"],
+            )
+
+        self.encoder = session(ONNX_ENCODER)
+        self.decoder = session(ONNX_DECODER)
+        self.decoder_with_past = session(ONNX_DECODER_WITH_PAST)
+        self._past_inputs = [
+            i.name
+            for i in self.decoder_with_past.get_inputs()
+            if i.name.startswith("past_key_values")
+        ]
+        if self.processor is None:
+            self.processor = WhisperProcessor.from_pretrained(self.model_name)
+        self.generation_config = GenerationConfig.from_pretrained(
+            self.model_dir
+        )
+        return self
+
+    def encode(self, features):
+        (states,) = self.encoder.run(
+            None, {"input_features": np.asarray(features, dtype=np.float32)}
+        )
+        return states
+
+    def decode(self, encoder_states, input_ids, cache=None):
+        if cache is None:
+            session = self.decoder
+            inputs = {
+                "input_ids": input_ids,
+                "encoder_hidden_states": encoder_states,
+            }
+            cache = {}
+        else:
+            # The with-past graph takes one token and the whole cache, and
+            # only returns the decoder's keys and values; the cross
+            # attention ones stay as the first step computed them
+            session = self.decoder_with_past
+            inputs = {"input_ids": input_ids}
+            inputs.update((name, cache[name]) for name in self._past_inputs)
+            cache = dict(cache)
+        names = [o.name for o in session.get_outputs()]
+        outputs = session.run(names, inputs)
+        for name, value in zip(names[1:], outputs[1:]):
+            cache[name.replace("present", "past_key_values", 1)] = value
+        return outputs[0][:, -1], cache
+
+
+class StubEngine(InferenceEngine):
+    """
+    Stands in for Whisper without loading any weights, for measuring the
+    audio frontend, database and API overhead around the model. Features
+    are computed for real, then every window transcribes to STUB_TEXT.
+    """
+
+    name = "stub"
+    STUB_TEXT = "stub transcription"
+
+    def __init__(self, model_name, processor=None):
+        super().__init__(model_name, processor)
+        self.cpu_profile = None
+
+    def load(self):
+        if self.processor is None:
+            # Whisper's default log-mel settings, which need no download
+            self.processor = WhisperFeatureExtractor()
+        return self
+
+    def generate_batch(
+        self, features, return_timestamps=False, **generate_kwargs
+    ):
+        with self.observer.timed("generate"):
+            texts = [self.STUB_TEXT] * len(features)
+        if return_timestamps:
+            return [[(0.0, None, text)] for text in texts]
+        return texts
+
+
+def export_onnx(model_name, output_dir):
+    """Export a Whisper checkpoint to ONNX graphs with a decoder KV cache"""
+    try:
+        from optimum.exporters.onnx import main_export
+    except ImportError as e:
+        raise ImportError(
+            f"No ONNX export of {model_name} in {output_dir}, and exporting "
+            "one needs optimum: pip install optimum[exporters]"
+        ) from e
+
+    logger.info("Exporting %s to ONNX in %s", model_name, output_dir)
+    main_export(
+        model_name,
+        output=output_dir,
+        task="automatic-speech-recognition-with-past",
+    )
+    return output_dir
+
+
+def quantise_onnx(model_dir):
+    """
+    Dynamically quantised int8 copies of the exported graphs, written to
+    an int8 subdirectory once and reused
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_dir = os.path.join(model_dir, "int8")
+    os.makedirs(int8_dir, exist_ok=True)
+    for filename in (ONNX_ENCODER, ONNX_DECODER, ONNX_DECODER_WITH_PAST):
+        target = os.path.join(int8_dir, filename)
+        if not os.path.exists(target):
+            quantize_dynamic(
+                os.path.join(model_dir, filename),
+                target,
+                weight_type=QuantType.QInt8,
+            )
+    return int8_dir
+
+
+def create_engine(
+    engine,
+    model_name,
+    cpu_profile="fp32",
+    compile_encoder=False,
+    onnx_model_dir=None,
+    processor=None,
+    feature_stft="torch",
+):
+    """
+    Build and load the engine called engine, one of ENGINES, computing
+    features with the feature_stft backend, see audio_processor.features
+    """
+    if engine == "transformers":
+        instance = TransformersEngine(
+            model_name, cpu_profile, compile_encoder, processor
+        )
+    elif engine == "onnx":
+        instance = OnnxEngine(
+            model_name, onnx_model_dir, cpu_profile, processor
+        )
+    elif engine == "stub":
+        instance = StubEngine(model_name, processor)
+    else:
+        raise ValueError(
+            f"Unknown inference engine {engine!r}, expected one of {ENGINES}"
+        )
+    instance.feature_stft = feature_stft
+    return instance.load()
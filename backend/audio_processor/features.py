@@ -0,0 +1,431 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import torch
+
+from audio_processor.vad import SpeechTimeline
+
+logger = logging.getLogger(__name__)
+
+STFT_BACKENDS = ("torch", "numpy")
+# Floor of the mel power before the log, as in Whisper
+MEL_FLOOR = 1e-10
+
+
+class LogMelExtractor:
+    """
+    Whisper's log-mel spectrogram for a batch of 16kHz windows in one pass.
+
+    Windows are zero-padded (or cut) to 30s into one float32 array and
+    transformed together, either with torch.stft or with a strided NumPy
+    real FFT, staying in float32 throughout. The mel filters, FFT size and
+    hop come from the model's WhisperFeatureExtractor, and the output
+    matches it to float32 rounding, without its per-call padding and
+    conversions.
+    """
+
+    def __init__(
+        self,
+        mel_filters,
+        n_fft=400,
+        hop_length=160,
+        n_samples=480000,
+        stft="torch",
+    ):
+        if stft not in STFT_BACKENDS:
+            raise ValueError(
+                f"Unknown STFT backend {stft!r}, expected one of "
+                f"{STFT_BACKENDS}"
+            )
+        # (n_fft // 2 + 1, n_mels), as in WhisperFeatureExtractor
+        self.mel_filters = np.asarray(mel_filters, dtype=np.float32)
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_samples = n_samples
+        self.stft = stft
+        # Periodic Hann window, as torch.hann_window
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self._torch_window = torch.from_numpy(self.window)
+        self._torch_filters = torch.from_numpy(
+            np.ascontiguousarray(self.mel_filters.T)
+        )
+
+    @classmethod
+    def from_processor(cls, processor, stft="torch"):
+        """Extractor for a WhisperProcessor or WhisperFeatureExtractor"""
+        extractor = getattr(processor, "feature_extractor", processor)
+        return cls(
+            extractor.mel_filters,
+            extractor.n_fft,
+            extractor.hop_length,
+            extractor.n_samples,
+            stft,
+        )
+
+    @property
+    def n_mels(self):
+        return self.mel_filters.shape[1]
+
+    @property
+    def frames(self):
+        return self.n_samples // self.hop_length
+
+    @property
+    def window_shape(self):
+        """Shape of one window's features, (n_mels, frames)"""
+        return (self.n_mels, self.frames)
+
+    def params(self):
+        """Everything the features depend on, for cache keys"""
+        return {
+            "n_mels": self.n_mels,
+            "n_fft": self.n_fft,
+            "hop_length": self.hop_length,
+            "n_samples": self.n_samples,
+        }
+
+    def empty(self):
+        """Features of no windows"""
+        return np.zeros((0, *self.window_shape), dtype=np.float32)
+
+    def pad(self, windows):
+        """Windows zero-padded or cut to n_samples, as one float32 array"""
+        batch = np.zeros((len(windows), self.n_samples), dtype=np.float32)
+        for row, window in zip(batch, windows):
+            n = min(len(window), self.n_samples)
+            row[:n] = window[:n]
+        return batch
+
+    def __call__(self, windows):
+        """
+        Log-mel features of a 16kHz array, or a list of arrays for a batch
+        of windows
+        Returns: float32 array of shape (n, n_mels, frames)
+        """
+        if isinstance(windows, np.ndarray) and windows.ndim == 1:
+            windows = [windows]
+        if not len(windows):
+            return self.empty()
+        batch = self.pad(windows)
+        if self.stft == "torch":
+            return self._torch_features(batch)
+        return self._numpy_features(batch)
+
+    def _torch_features(self, batch):
+        with torch.inference_mode():
+            spectrum = torch.stft(
+                torch.from_numpy(batch),
+                self.n_fft,
+                self.hop_length,
+                window=self._torch_window,
+                return_complex=True,
+            )
+            # Squares of the parts, a sqrt and a square cheaper than abs()
+            power = spectrum.real**2 + spectrum.imag**2
+            # The last frame only covers the reflected padding
+            mel = self._torch_filters @ power[..., :-1]
+            log_spec = mel.clamp(min=MEL_FLOOR)
+            log_spec = log_spec.log10()
+            peak = log_spec.amax(dim=(1, 2), keepdim=True)
+            log_spec = torch.maximum(log_spec, peak - 8.0)
+            return ((log_spec + 4.0) / 4.0).numpy()
+
+    def _numpy_features(self, batch):
+        half = self.n_fft // 2
+        padded = np.pad(batch, ((0, 0), (half, half)), mode="reflect")
+        frames = np.lib.stride_tricks.sliding_window_view(
+            padded, self.n_fft, axis=1
+        )[:, :: self.hop_length][:, :-1]
+        spectrum = np.fft.rfft(frames * self.window, axis=-1)
+        power = spectrum.real**2 + spectrum.imag**2
+        log_spec = np.log10(np.maximum(power @ self.mel_filters, MEL_FLOOR))
+        log_spec = log_spec.transpose(0, 2, 1)
+        peak = log_spec.max(axis=(1, 2), keepdims=True)
+        log_spec = np.maximum(log_spec, peak - 8.0)
+        return ((log_spec + 4.0) / 4.0).astype(np.float32, copy=False)
+
+
+@dataclass
+class FileFeatures:
+    """Log-mel features of every window of one file"""
+
+    features: np.ndarray
+    # Samples of audio in each window, the last one is usually short
+    lengths: list
+    # Where the windowed speech came from when VAD was on, else None
+    timeline: SpeechTimeline = None
+    audio_seconds: float = 0.0
+
+    def batches(self, batch_size):
+        """(features, lengths) of batch_size windows at a time"""
+        for start in range(0, len(self.lengths), batch_size):
+            yield (
+                self.features[start : start + batch_size],
+                self.lengths[start : start + batch_size],
+            )
+
+
+def feature_batches(windows, extract, batch_size):
+    """
+    (features, lengths in samples) of batch_size windows at a time, with
+    extract turning a list of windows into their features
+    """
+    batch = []
+    for window in windows:
+        batch.append(window)
+        if len(batch) == batch_size:
+            yield extract(batch), [len(w) for w in batch]
+            batch = []
+    if batch:
+        yield extract(batch), [len(w) for w in batch]
+
+
+def collect_file_features(
+    batches, window_shape, timeline, timings, cache=None, key=None
+):
+    """
+    FileFeatures of a file's (features, lengths) batches, whose duration
+    is in timings, a DecodeTimings, once the batches are exhausted. With a
+    FeatureCache the batches are written to it under key one at a time and
+    come back memory-mapped, otherwise they are concatenated in memory.
+    """
+    if cache is None:
+        batches = list(batches)
+        return FileFeatures(
+            np.concatenate([f for f, _ in batches])
+            if batches
+            else np.zeros((0, *window_shape), dtype=np.float32),
+            [n for _, lengths in batches for n in lengths],
+            timeline,
+            timings.audio_seconds,
+        )
+    writer = cache.writer(key, window_shape)
+    try:
+        for features, lengths in batches:
+            writer.add(features, lengths)
+        return writer.commit(timeline, timings.audio_seconds)
+    finally:
+        writer.discard()
+
+
+def feature_cache_key(content_hash, extractor, window_s, overlap_s, vad):
+    """
+    Key of a file's features: its content hash and everything else the
+    features depend on. vad is None when VAD is off, else the SpeechGate
+    options.
+    """
+    params = {
+        "content_hash": content_hash,
+        **extractor.params(),
+        "window_s": window_s,
+        "overlap_s": overlap_s,
+        "vad": vad,
+    }
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class FeatureCache:
+    """
+    Log-mel features of whole files in a directory, so a file transcribed
+    again, e.g. with another model or other decoding options, skips
+    decode, resample and feature extraction.
+
+    Each entry is a file of raw float32 features, written a batch of
+    windows at a time as they are extracted (see writer), and a small
+    .json of their shape, window lengths, VAD regions and duration. A hit
+    memory-maps the features, so they are read from disk as their windows
+    are transcribed rather than loaded all at once.
+
+    Entries are written atomically, the .json last, so an entry without
+    one is incomplete. Past max_bytes (0 for no limit) the least recently
+    used entries are removed.
+    """
+
+    suffix = ".json"
+    features_suffix = ".f32"
+
+    def __init__(self, directory, max_bytes=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix=None):
+        return os.path.join(self.directory, key + (suffix or self.suffix))
+
+    def get(self, key):
+        """The FileFeatures stored under key, or None"""
+        path = self._path(key)
+        try:
+            file_features = self._load(key)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, KeyError, TypeError, ValueError):
+            logger.warning("Ignoring unreadable feature cache entry %s", path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return file_features
+
+    def _load(self, key):
+        with open(self._path(key), encoding="utf-8") as f:
+            entry = json.load(f)
+        shape = tuple(entry["shape"])
+        if shape[0]:
+            features = np.memmap(
+                self._path(key, self.features_suffix),
+                dtype=np.float32,
+                mode="r",
+                shape=shape,
+            )
+        else:
+            features = np.zeros(shape, dtype=np.float32)
+        # Regions are (start, end) pairs with VAD, None without
+        timeline = None
+        if entry["regions"] is not None:
+            timeline = SpeechTimeline()
+            for start, end in entry["regions"]:
+                timeline.add(start, end - start)
+        return FileFeatures(
+            features, entry["lengths"], timeline, entry["audio_seconds"]
+        )
+
+    def writer(self, key, window_shape):
+        """
+        A FeatureWriter adding the features of a file to the cache under
+        key a batch at a time; window_shape is (n_mels, frames), the shape
+        of one window's features
+        """
+        return FeatureWriter(self, key, window_shape)
+
+    def put(self, key, file_features):
+        features = file_features.features
+        writer = self.writer(key, features.shape[1:])
+        try:
+            writer.add(features, file_features.lengths)
+            writer.commit(file_features.timeline, file_features.audio_seconds)
+        finally:
+            writer.discard()
+
+    def _store(self, key, features_tmp, entry):
+        """
+        Move a written features file into place under key with its entry,
+        and return the FileFeatures stored
+        """
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(features_tmp, self._path(key, self.features_suffix))
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        # Mapped before eviction, which may remove an entry over max_bytes
+        file_features = self._load(key)
+        if self.max_bytes:
+            self._evict()
+        return file_features
+
+    def _evict(self):
+        with self._lock:
+            # Every file of an entry, including those of older formats,
+            # by key, with the entry's last use and total size
+            entries = {}
+            for entry in os.scandir(self.directory):
+                key, suffix = os.path.splitext(entry.name)
+                if suffix == ".tmp":
+                    continue
+                stat = entry.stat()
+                used, size, paths = entries.get(key, (0.0, 0, []))
+                entries[key] = (
+                    max(used, stat.st_mtime),
+                    size + stat.st_size,
+                    paths + [entry.path],
+                )
+            total = sum(size for _, size, _ in entries.values())
+            for _, size, paths in sorted(entries.values()):
+                if total <= self.max_bytes:
+                    break
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class FeatureWriter:
+    """
+    The features of one file on their way into a FeatureCache, appended to
+    a temporary file batch by batch so only one batch is held in memory.
+    commit() stores them, discard() drops them unless committed.
+    """
+
+    def __init__(self, cache, key, window_shape):
+        self.cache = cache
+        self.key = key
+        self.window_shape = tuple(window_shape)
+        self.lengths = []
+        fd, self._tmp = tempfile.mkstemp(suffix=".tmp", dir=cache.directory)
+        self._file = os.fdopen(fd, "wb")
+
+    def add(self, features, lengths):
+        """Append the (n, n_mels, frames) features of n windows"""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.shape[1:] != self.window_shape:
+            raise ValueError(
+                f"Features of shape {features.shape[1:]} added to a cache "
+                f"entry of {self.window_shape}"
+            )
+        features.tofile(self._file)
+        self.lengths.extend(int(n) for n in lengths)
+
+    def commit(self, timeline, audio_seconds):
+        """
+        Store the features added with the file's timeline (None without
+        VAD) and duration, and return them as memory-mapped FileFeatures
+        """
+        self._file.close()
+        entry = {
+            "shape": [len(self.lengths), *self.window_shape],
+            "lengths": self.lengths,
+            "regions": (
+                [[int(start), int(end)] for start, end in timeline.regions()]
+                if timeline is not None
+                else None
+            ),
+            "audio_seconds": float(audio_seconds),
+        }
+        file_features = self.cache._store(self.key, self._tmp, entry)
+        self._tmp = None
+        return file_features
+
+    def discard(self):
+        if self._tmp is None:
+            return
+        self._file.close()
+        os.remove(self._tmp)
+        self._tmp = None
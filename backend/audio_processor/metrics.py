@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+
+class StageObserver:
+    """
+    Receives how long each stage of a transcription takes. This one drops
+    them; AudioTranscriber.enable_metrics plugs in one that records them,
+    such as the app's /metrics histograms.
+
+    Stages timed per generate batch are "features", "generate" and
+    "detokenize"; "decode" and "resample" are timed per file.
+    """
+
+    def observe_stage(self, stage, seconds):
+        pass
+
+    def observe_audio(self, audio_seconds, seconds):
+        """A file of audio_seconds transcribed in seconds of wall time"""
+        pass
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+
+class DecodeTimings:
+    """Decode and resample time, and audio produced, for one file"""
+
+    def __init__(self):
+        self.decode_seconds = 0.0
+        self.resample_seconds = 0.0
+        self.audio_seconds = 0.0
+
+    def report(self, observer, seconds):
+        """Pass the file's timings to observer, seconds being its total"""
+        observer.observe_stage("decode", self.decode_seconds)
+        observer.observe_stage("resample", self.resample_seconds)
+        observer.observe_audio(self.audio_seconds, seconds)
@@ -0,0 +1,183 @@
+import time
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+from scipy import signal
+
+
+class StreamingResampler:
+    """
+    Polyphase rational resampler that keeps its filter state between blocks
+
+    Feeding a signal through `process()` block by block and finishing with
+    `flush()` gives the same samples as `scipy.signal.resample_poly` on the
+    whole signal (same Kaiser FIR design and zero-phase alignment), while
+    only holding one filter length of input history in memory.
+    """
+
+    def __init__(
+        self, orig_sampling_rate, target_sampling_rate, dtype=np.float32
+    ):
+        divisor = gcd(int(orig_sampling_rate), int(target_sampling_rate))
+        self.up = int(target_sampling_rate) // divisor
+        self.down = int(orig_sampling_rate) // divisor
+        self.dtype = dtype
+        if self.is_identity:
+            return
+
+        max_rate = max(self.up, self.down)
+        self.half_len = 10 * max_rate
+        taps = signal.firwin(
+            2 * self.half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)
+        )
+        self.taps = (taps * self.up).astype(dtype)
+
+        # Input samples kept from earlier blocks, starting at input index
+        # self._start; output sample index of the next value to emit
+        self._history = np.zeros(0, dtype=dtype)
+        self._start = 0
+        self._consumed = 0
+        self._next = 0
+
+    @property
+    def is_identity(self):
+        return self.up == self.down
+
+    def _emit(self, buffer, stop):
+        # Output n of the whole signal is sum_j x[j] * taps[m - j * up] with
+        # m = n * down + half_len. upfirdn over the buffer, which starts at
+        # input index s, gives r -> sum_j x[s + j] * h[r * down - j * up].
+        # Prefixing the taps with d zeros, chosen so that m - s * up + d is
+        # a multiple of down, makes output n its output (m - s * up + d) / down
+        count = stop - self._next
+        if count <= 0:
+            return np.zeros(0, dtype=self.dtype)
+        offset = self.half_len - self._start * self.up
+        delay = -offset % self.down
+        taps = np.concatenate([np.zeros(delay, dtype=self.dtype), self.taps])
+        first = (self._next * self.down + offset + delay) // self.down
+        out = signal.upfirdn(taps, buffer, self.up, self.down)
+        out = out[first : first + count]
+        if len(out) < count:
+            # Past the end of the buffer the input is zero
+            out = np.pad(out, (0, count - len(out)))
+        self._next = stop
+        return out.astype(self.dtype, copy=False)
+
+    def _trim(self, buffer):
+        # Keep only the input the next output still needs
+        # (oldest input with m - j * up inside the taps)
+        m = self._next * self.down + self.half_len
+        oldest = -(-(m - len(self.taps) + 1) // self.up)
+        keep_from = max(oldest, self._start)
+        self._history = buffer[keep_from - self._start :]
+        self._start = keep_from
+
+    def process(self, block):
+        """Resample one block of mono samples, returns what is complete"""
+        block = np.asarray(block, dtype=self.dtype)
+        if self.is_identity:
+            return block
+        buffer = np.concatenate([self._history, block])
+        self._consumed += len(block)
+        # Output n is complete once input index m // up has arrived
+        limit = self._consumed * self.up - 1 - self.half_len
+        stop = max(limit // self.down + 1, self._next)
+        out = self._emit(buffer, stop)
+        self._trim(buffer)
+        return out
+
+    def flush(self):
+        """Emit the remaining outputs, treating input past the end as 0"""
+        if self.is_identity:
+            return np.zeros(0, dtype=self.dtype)
+        total = -(-self._consumed * self.up // self.down)
+        out = self._emit(self._history, max(total, self._next))
+        self._history = np.zeros(0, dtype=self.dtype)
+        return out
+
+
+def iter_audio_blocks(
+    audio_file, target_sampling_rate, block_frames=65536, timings=None
+):
+    """
+    Decode an audio file or file object block by block as float32, downmix
+    each block to mono and resample it to target_sampling_rate on the fly.
+    Decode and resample (with downmix) time and the audio produced are
+    added to timings, an audio_processor.metrics.DecodeTimings, if given.
+    """
+    with sf.SoundFile(audio_file) as f:
+        resampler = StreamingResampler(f.samplerate, target_sampling_rate)
+        blocks = f.blocks(
+            blocksize=block_frames, dtype="float32", always_2d=True
+        )
+        while True:
+            start = time.perf_counter()
+            block = next(blocks, None)
+            decoded = time.perf_counter()
+            out = (
+                resampler.flush()
+                if block is None
+                else resampler.process(block.mean(axis=1))
+            )
+            if timings is not None:
+                timings.decode_seconds += decoded - start
+                timings.resample_seconds += time.perf_counter() - decoded
+                timings.audio_seconds += len(out) / target_sampling_rate
+            if len(out):
+                yield out
+            if block is None:
+                return
+
+
+def iter_stream_windows(blocks, window, step):
+    """
+    Regroup a stream of sample blocks into windows of `window` samples that
+    start every `step` samples, holding at most one window plus one block
+
+    Matches AudioTranscriber.iter_windows on the concatenated signal.
+    """
+    buffer = np.zeros(0, dtype=np.float32)
+    emitted = False
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) > window:
+            yield buffer[:window].copy()
+            emitted = True
+            buffer = buffer[step:]
+    if len(buffer) or not emitted:
+        yield buffer
+
+
+def iter_file_windows(
+    audio_file,
+    sampling_rate,
+    window_s,
+    overlap_s,
+    block_frames=65536,
+    timings=None,
+    speech=None,
+):
+    """
+    Stream the windows of window_s seconds, overlapping by overlap_s, of an
+    audio file or file object decoded and resampled to sampling_rate block
+    by block, so peak memory does not depend on the file's duration.
+
+    speech, if given, filters the stream of blocks down to the speech, e.g.
+    SpeechGate.filter; the windows then cover only the speech,
+    concatenated. Windows without samples are never yielded. Decode and
+    resample time add up in timings, a DecodeTimings.
+    """
+    blocks = iter_audio_blocks(
+        audio_file, sampling_rate, block_frames, timings
+    )
+    if speech is not None:
+        blocks = speech(blocks)
+    windows = iter_stream_windows(
+        blocks,
+        window_s * sampling_rate,
+        (window_s - overlap_s) * sampling_rate,
+    )
+    # Nothing to transcribe in an empty file, or when no speech was found
+    return (w for w in windows if len(w))
@@ -1,19 +1,329 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import partial
+from math import gcd
+
+import numpy as np
+
 import soundfile as sf
-import torch
 from scipy import signal
-from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+from audio_processor.batching import MicroBatcher
+from audio_processor.decoding import DecodingOptions
+from audio_processor.engines import create_engine
+from audio_processor.features import (
+    FileFeatures,
+    collect_file_features,
+    feature_batches,
+    feature_cache_key,
+)
+from audio_processor.metrics import DecodeTimings, StageObserver
+from audio_processor.stream import iter_file_windows
+from audio_processor.vad import SpeechGate, SpeechTimeline, VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[^\w']+")
+
+
+def _normalise_word(word):
+    return _WORD_RE.sub("", word.lower())
+
+
+class TranscriptMerger:
+    """
+    Incrementally join the transcripts of consecutive overlapping windows,
+    dropping the words that were transcribed twice because they fell in
+    the overlap
+
+    The longest run of words at the end of the transcript so far that
+    matches the start of the next text (ignoring case and punctuation) is
+    treated as duplicated. A single word at either edge may be skipped,
+    since the window cut can land mid-word and Whisper then transcribes a
+    fragment or nothing.
+    """
+
+    def __init__(self, max_overlap_words=30, min_match_words=2):
+        self.max_overlap_words = max_overlap_words
+        self.min_match_words = min_match_words
+        self.words = []
+
+    @property
+    def text(self):
+        return " ".join(self.words)
+
+    def add(self, text):
+        words = text.split()
+        if not self.words:
+            self.words.extend(words)
+            return
+
+        n = self.max_overlap_words
+        prev = [_normalise_word(w) for w in self.words[-n:]]
+        nxt = [_normalise_word(w) for w in words[:n]]
+        best, cut, drop = 0, 0, 0
+        for prev_skip in (0, 1):
+            for next_skip in (0, 1):
+                tail = prev[: len(prev) - prev_skip]
+                head = nxt[next_skip:]
+                for k in range(min(len(tail), len(head)), best, -1):
+                    if k >= self.min_match_words and tail[-k:] == head[:k]:
+                        best, cut, drop = k, prev_skip, next_skip + k
+                        break
+        if cut:
+            del self.words[-cut:]
+        self.words.extend(words[drop:])
+
+
+def merge_overlapping_texts(texts, max_overlap_words=30, min_match_words=2):
+    """
+    Join the transcripts of consecutive overlapping windows, see
+    TranscriptMerger
+    """
+    merger = TranscriptMerger(max_overlap_words, min_match_words)
+    for text in texts:
+        merger.add(text)
+    return merger.text
+
+
+class SegmentCollector:
+    """
+    Place the timestamped segments of consecutive overlapping windows on
+    one timeline.
+
+    Window k starts k * step_s seconds into the windowed signal. Each
+    overlap is split at its middle and a segment is kept from the window
+    in which it starts on that window's side of the split, so a segment
+    transcribed twice is kept once, and a kept segment running past the
+    next one's start is cut short there, so segments never overlap. With
+    a SpeechTimeline, as when VAD cut
+    the silence out, times are mapped back to the original audio.
+    """
+
+    def __init__(self, step_s, overlap_s, sampling_rate, timeline=None):
+        self.step_s = step_s
+        self.overlap_s = overlap_s
+        self.sampling_rate = sampling_rate
+        self.timeline = timeline
+        self.windows = 0
+        self._segments = []
+
+    def add(self, segments, duration_s):
+        """
+        Add the next window's (start, end, text) segments, in seconds from
+        the start of that window; end is None for an unclosed segment
+        """
+        offset = self.windows * self.step_s
+        cut = offset + self.overlap_s / 2 if self.windows else 0.0
+        self._segments = [s for s in self._segments if s[0] < cut]
+        for start, end, text in segments:
+            if offset + start >= cut:
+                end = duration_s if end is None else min(end, duration_s)
+                if self._segments and self._segments[-1][1] > offset + start:
+                    last_start, _, last_text = self._segments[-1]
+                    self._segments[-1] = (
+                        last_start,
+                        max(offset + start, last_start),
+                        last_text,
+                    )
+                self._segments.append(
+                    (offset + start, offset + max(end, start), text.strip())
+                )
+        self.windows += 1
+
+    def _original(self, seconds, end=False):
+        if self.timeline is None:
+            return seconds
+        sample = round(seconds * self.sampling_rate)
+        if end and sample:
+            # The last sample of the segment, so an end that coincides
+            # with a cut-out gap stays before it
+            sample = self.timeline.to_original(sample - 1) + 1
+        else:
+            sample = self.timeline.to_original(sample)
+        return sample / self.sampling_rate
+
+    @property
+    def segments(self):
+        """Segments as dicts of start and end seconds and text"""
+        return [
+            {
+                "start": round(self._original(start), 2),
+                "end": round(self._original(end, end=True), 2),
+                "text": text,
+            }
+            for start, end, text in self._segments
+        ]
+
+
+def window_text(result, duration_s, collector=None):
+    """
+    Text of a window's generate result. Timestamped decoding gives
+    (start, end, text) segments instead, which are added to collector, a
+    SegmentCollector, if given.
+    """
+    if isinstance(result, str):
+        return result
+    if collector is not None:
+        collector.add(result, duration_s)
+    return "".join(text for _, _, text in result)
+
+
+def _written(batches, writer):
+    """Pass batches through, adding each one to writer, a FeatureWriter"""
+    for batch in batches:
+        writer.add(*batch)
+        yield batch
 
 
 class AudioTranscriber:
-    def __init__(self):
-        self.processor = WhisperProcessor.from_pretrained("openai/whisper-tiny")  # noqa: E501
-        self.model = WhisperForConditionalGeneration.from_pretrained(
-            "openai/whisper-tiny"
+    def __init__(
+        self,
+        model_name="openai/whisper-tiny",
+        cpu_profile="fp32",
+        compile_encoder=False,
+        engine="transformers",
+        onnx_model_dir=None,
+        feature_stft="torch",
+    ):
+        self.model_name = model_name
+        # Inference backend, see audio_processor.engines
+        self.engine = create_engine(
+            engine,
+            model_name,
+            cpu_profile=cpu_profile,
+            compile_encoder=compile_encoder,
+            onnx_model_dir=onnx_model_dir,
+            feature_stft=feature_stft,
         )
+        self.processor = self.engine.processor
+        self.model = getattr(self.engine, "model", None)
+        self.cpu_profile = self.engine.cpu_profile
         self.target_sampling_rate = 16000  # Whisper expects 16kHz audio
+        # Whisper sees at most 30s at a time, longer audio is split into
+        # overlapping windows and the texts are stitched back together
+        self.chunk_length_s = 30
+        self.chunk_overlap_s = 5
+        # Windows per generate call, which bounds feature and decoder memory
+        self.chunk_batch_size = 4
+        # Frames decoded per block when streaming a file
+        self.block_frames = 65536
+        # Decoding used when a call does not pass its own options
+        self.decoding = DecodingOptions()
+        self.batcher = None
+        # Speech detection before windowing, off until enable_vad
+        self.vad = None
+        self.vad_options = {}
+        self._vad_lock = threading.Lock()
+        self.vad_audio_seconds = 0.0
+        self.vad_speech_seconds = 0.0
+        # Receives stage timings, off until enable_metrics
+        self.observer = StageObserver()
+        # Features of whole files by content hash, off until
+        # enable_feature_cache
+        self.feature_cache = None
+
+    def enable_metrics(self, observer):
+        """
+        Report the time of every stage, from decoding the file to turning
+        token ids into text, and each file's duration and processing time
+        to observer, an audio_processor.metrics.StageObserver
+        """
+        self.observer = observer
+        self.engine.observer = observer
+
+    def enable_feature_cache(self, cache):
+        """
+        Keep each file's log-mel features in cache, an
+        audio_processor.features.FeatureCache, when it is transcribed with
+        its content hash, and transcribe it again from there
+        """
+        self.feature_cache = cache
+
+    def feature_cache_key(self, content_hash):
+        """Feature cache key of a file with these windows, VAD and features"""
+        return feature_cache_key(
+            content_hash,
+            self.engine.extractor,
+            self.chunk_length_s,
+            self.chunk_overlap_s,
+            None if self.vad is None else self.vad_options,
+        )
+
+    def _cached_features(self, content_hash):
+        """
+        The feature cache key of a file and its cached FileFeatures, None
+        for either when there is no cache, no hash or no entry
+        """
+        if self.feature_cache is None or content_hash is None:
+            return None, None
+        cache_key = self.feature_cache_key(content_hash)
+        return cache_key, self.feature_cache.get(cache_key)
+
+    def enable_batching(self, max_batch_size=8, max_wait_ms=10):
+        """
+        Route generate calls through a MicroBatcher so that concurrent
+        transcriptions share one batched forward pass
+        """
+        self.disable_batching()
+        self.batcher = MicroBatcher(
+            self.generate_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+        )
+
+    def disable_batching(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
+    def enable_vad(self, **gate_options):
+        """
+        Drop silence and noise before Whisper: only the speech regions found
+        by a VoiceActivityDetector, merged and padded by a SpeechGate built
+        with gate_options, are windowed and transcribed
+        """
+        self.vad = VoiceActivityDetector(self.target_sampling_rate)
+        self.vad_options = gate_options
 
-        if torch.cuda.is_available():
-            self.model = self.model.to("cuda")
+    def disable_vad(self):
+        self.vad = None
+
+    def vad_stats(self):
+        """Audio seen and speech kept by the VAD since it was enabled"""
+        with self._vad_lock:
+            audio, speech = self.vad_audio_seconds, self.vad_speech_seconds
+        return {
+            "enabled": self.vad is not None,
+            "audio_seconds": audio,
+            "speech_seconds": speech,
+            "skipped_fraction": 1 - speech / audio if audio else 0.0,
+        }
+
+    def _speech_blocks(self, blocks, timeline=None):
+        """
+        Pass only the speech of a stream of 16kHz blocks. When a
+        SpeechTimeline is given it records where the kept audio came from.
+        """
+        gate = SpeechGate(self.vad, **self.vad_options)
+        if timeline is not None:
+            gate.timeline = timeline
+        yield from gate.filter(blocks)
+
+        stats = gate.stats()
+        with self._vad_lock:
+            self.vad_audio_seconds += stats["audio_seconds"]
+            self.vad_speech_seconds += stats["speech_seconds"]
+        logger.debug(
+            "VAD kept speech_seconds=%.1f of audio_seconds=%.1f",
+            stats["speech_seconds"],
+            stats["audio_seconds"],
+        )
 
     def get_audio_info(self, file_path):
         """
@@ -34,12 +344,15 @@ class AudioTranscriber:
         Resample audio to 16kHz if necessary
         """
         if orig_sampling_rate != self.target_sampling_rate:
-            # Calculate number of samples needed
-            num_samples = int(
-                len(audio_array) * float(self.target_sampling_rate) / orig_sampling_rate  # noqa: E501
+            # Polyphase FIR resampling, linear in the signal length unlike
+            # the FFT based signal.resample
+            divisor = gcd(int(orig_sampling_rate), self.target_sampling_rate)
+            audio_array = signal.resample_poly(
+                audio_array,
+                self.target_sampling_rate // divisor,
+                int(orig_sampling_rate) // divisor,
+                axis=0,
             )
-            # Resample audio
-            audio_array = signal.resample(audio_array, num_samples)
         return audio_array
 
     def load_audio_from_file(self, file_path):
@@ -50,137 +363,436 @@ class AudioTranscriber:
         try:
             # First get the audio info
             audio_info = self.get_audio_info(file_path)
-            print("Audio file info:")
-            print(f"- Sampling rate: {audio_info['sampling_rate']} Hz")
-            print(f"- Channels: {audio_info['channels']}")
-            print(f"- Duration: {audio_info['duration']:.2f} seconds")
-            print(f"- Format: {audio_info['format']}")
+            logger.debug(
+                "Loading audio path=%s format=%s sampling_rate=%d "
+                "channels=%d duration=%.2f",
+                file_path,
+                audio_info["format"],
+                audio_info["sampling_rate"],
+                audio_info["channels"],
+                audio_info["duration"],
+            )
 
             # Now load the audio data
-            print(f"\nLoading audio from file: {file_path}")
-            audio_array, sampling_rate = sf.read(file_path)
+            with self.observer.timed("decode"):
+                audio_array, sampling_rate = sf.read(file_path)
 
             # Resample only if necessary
             if sampling_rate != self.target_sampling_rate:
-                print(
-                    f"Resampling from {sampling_rate}Hz to {self.target_sampling_rate}Hz..."  # noqa: E501
-                )
-                audio_array = self.resample_audio(audio_array, sampling_rate)
-                print("Resampling complete")
-            else:
-                print("Audio already at target sampling rate, no resampling needed")  # noqa: E501
+                with self.observer.timed("resample"):
+                    audio_array = self.resample_audio(
+                        audio_array, sampling_rate
+                    )
 
             return audio_array
         except Exception as e:
             raise ValueError(f"Error loading audio file: {str(e)}")
 
-    def transcribe(self, audio_array):
+    def extract_features(self, audio_array):
         """
-        Transcribe audio using Whisper model
+        Compute Whisper log-mel input features for a 16kHz audio array, or a
+        list of arrays for a batch of windows
+        Returns: the engine's features, shape (n, n_mels, frames)
         """
         # Convert audio to mono if stereo
-        if len(audio_array.shape) > 1:
+        if not isinstance(audio_array, list) and len(audio_array.shape) > 1:
             audio_array = audio_array.mean(axis=1)
 
         # Process the audio input
-        input_features = self.processor(
-            audio_array,
-            sampling_rate=self.target_sampling_rate,
-            return_tensors="pt",  # noqa: E501
-        ).input_features
+        return self.engine.features(audio_array)
 
-        if torch.cuda.is_available():
-            input_features = input_features.to("cuda")
+    def generate_batch(self, input_features, **generate_kwargs):
+        """
+        Run generate on a batch of input features and decode every row,
+        with the generate keyword arguments of a DecodingOptions
+        Returns: list of transcriptions, one per row of input_features
+        """
+        return self.engine.generate_batch(input_features, **generate_kwargs)
 
-        print("Processing audio...")
-        # Generate token ids
-        predicted_ids = self.model.generate(input_features)
+    def _features(self, windows):
+        return self._timed_features(windows), [len(w) for w in windows]
 
-        # Decode the token ids to text
-        transcription = self.processor.batch_decode(
-            predicted_ids, skip_special_tokens=True
-        )[0]
+    def _timed_features(self, windows):
+        with self.observer.timed("features"):
+            return self.extract_features(windows)
 
+    def _feature_batches(self, windows, batch_size=None):
+        """
+        (features, lengths in samples) of batch_size windows at a time,
+        chunk_batch_size if None
+        """
+        return feature_batches(
+            windows, self._timed_features, batch_size or self.chunk_batch_size
+        )
+
+    def _generate(self, windows, decoding):
+        return self._generate_features(*self._features(windows), decoding)
+
+    def _generate_features(self, input_features, lengths, decoding):
+        # The token budget follows the longest window of the batch
+        duration = max(lengths) / self.target_sampling_rate
+        generate_kwargs = decoding.generate_kwargs(duration)
+        if self.batcher is not None:
+            return self.batcher.generate(input_features, **generate_kwargs)
+        return self.generate_batch(input_features, **generate_kwargs)
+
+    def iter_windows(self, audio_array):
+        """
+        Yield overlapping chunk_length_s windows of a mono 16kHz array as
+        views, so splitting never copies the signal
+        """
+        window = self.chunk_length_s * self.target_sampling_rate
+        step = (
+            self.chunk_length_s - self.chunk_overlap_s
+        ) * self.target_sampling_rate
+        start = 0
+        while True:
+            yield audio_array[start : start + window]
+            if start + window >= len(audio_array):
+                return
+            start += step
+
+    def iter_file_windows(self, audio_file, timeline=None, timings=None):
+        """
+        Stream windows straight from an audio file or file object: decode
+        in float32 blocks, downmix and resample each block, and regroup the
+        16kHz samples into the same overlapping windows as iter_windows.
+        Peak memory does not depend on the duration of the file.
+
+        With VAD enabled the windows cover only the speech, concatenated;
+        pass a SpeechTimeline to map window positions back to the file.
+        Decode and resample time add up in timings, a DecodeTimings. See
+        audio_processor.stream.iter_file_windows.
+        """
+        speech = None
+        if self.vad is not None:
+            speech = partial(self._speech_blocks, timeline=timeline)
+        return iter_file_windows(
+            audio_file,
+            self.target_sampling_rate,
+            self.chunk_length_s,
+            self.chunk_overlap_s,
+            self.block_frames,
+            timings,
+            speech,
+        )
+
+    def iter_window_texts(self, audio_array, decoding=None):
+        """
+        Transcribe audio window by window, chunk_batch_size windows per
+        generate call, yielding each window's text as soon as it is decoded
+        """
+        # Convert audio to mono if stereo
+        if len(audio_array.shape) > 1:
+            audio_array = audio_array.mean(axis=1)
+
+        if self.vad is not None:
+            speech = list(self._speech_blocks([audio_array]))
+            if not speech:
+                return iter(())
+            audio_array = np.concatenate(speech)
+
+        return self._iter_texts(
+            self._feature_batches(self.iter_windows(audio_array)), decoding
+        )
+
+    def _iter_texts(self, batches, decoding=None, collector=None):
+        decoding = decoding or self.decoding
+        for features, lengths in batches:
+            results = self._generate_features(features, lengths, decoding)
+            for length, result in zip(lengths, results):
+                yield window_text(
+                    result, length / self.target_sampling_rate, collector
+                )
+
+    def transcribe_features(self, input_features, lengths, decoding=None):
+        """
+        Run one generate call on a batch of window features, which may come
+        from different files, given each window's length in samples
+        Returns: each window's text, or its (start, end, text) segments
+            when decoding has timestamps, see window_text
+        """
+        return self._generate_features(
+            input_features, lengths, decoding or self.decoding
+        )
+
+    def transcribe(self, audio_array, decoding=None):
+        """
+        Transcribe audio using Whisper model, in overlapping 30s windows
+        when the audio is longer than one window
+        """
+        return merge_overlapping_texts(
+            self.iter_window_texts(audio_array, decoding)
+        )
+
+    def iter_transcribe(
+        self,
+        audio_file,
+        batch_size=None,
+        decoding=None,
+        segments=None,
+        content_hash=None,
+    ):
+        """
+        Transcribe an audio file or file object window by window, yielding
+        the stitched transcript so far each time a window is decoded
+        Args:
+            audio_file: A path or file object containing audio data
+            batch_size: Windows per generate call, chunk_batch_size if None.
+                1 gives the first text soonest, larger batches finish sooner.
+            decoding: DecodingOptions, self.decoding if None
+            segments: A list, extended with the start, end and text of each
+                segment in seconds of the original audio once the last
+                window is decoded; stays empty unless decoding has
+                timestamps enabled
+            content_hash: The file's SHA-256, under which its features are
+                looked up in and added to the feature cache, if enabled
+        """
+        cache_key, cached = self._cached_features(content_hash)
+        if cached is not None:
+            timeline = cached.timeline
+        else:
+            timeline = SpeechTimeline() if self.vad is not None else None
+        collector = None
+        if segments is not None:
+            collector = SegmentCollector(
+                self.chunk_length_s - self.chunk_overlap_s,
+                self.chunk_overlap_s,
+                self.target_sampling_rate,
+                timeline,
+            )
+        merger = TranscriptMerger()
+        start = time.perf_counter()
+        timings = DecodeTimings()
+        writer = None
+        if cached is not None:
+            # Decode, resample and features were done by an earlier run
+            timings.audio_seconds = cached.audio_seconds
+            batches = cached.batches(batch_size or self.chunk_batch_size)
+        else:
+            windows = self.iter_file_windows(audio_file, timeline, timings)
+            batches = self._feature_batches(windows, batch_size)
+            if cache_key is not None:
+                writer = self._feature_writer(cache_key)
+                batches = _written(batches, writer)
+        try:
+            for text in self._iter_texts(batches, decoding, collector):
+                merger.add(text)
+                yield merger.text
+            if collector is not None:
+                segments.extend(collector.segments)
+            if writer is not None:
+                writer.commit(timeline, timings.audio_seconds)
+        finally:
+            if writer is not None:
+                writer.discard()
+        timings.report(self.observer, time.perf_counter() - start)
+
+    def _feature_writer(self, cache_key):
+        """A FeatureWriter of a file's features into the feature cache"""
+        return self.feature_cache.writer(
+            cache_key, self.engine.extractor.window_shape
+        )
+
+    def file_features(self, audio_file, content_hash=None, timings=None):
+        """
+        Features of every window of an audio file or file object, as
+        FileFeatures, from the feature cache when the file's content_hash
+        is found there and added to it otherwise. Decode and resample time
+        add up in timings, a DecodeTimings. With the cache, the features
+        are written to it a batch at a time and come back memory-mapped.
+        """
+        timings = timings if timings is not None else DecodeTimings()
+        cache_key, cached = self._cached_features(content_hash)
+        if cached is not None:
+            timings.audio_seconds = cached.audio_seconds
+            return cached
+        timeline = SpeechTimeline() if self.vad is not None else None
+        windows = self.iter_file_windows(audio_file, timeline, timings)
+        return collect_file_features(
+            self._feature_batches(windows),
+            self.engine.extractor.window_shape,
+            timeline,
+            timings,
+            self.feature_cache if cache_key is not None else None,
+            cache_key,
+        )
+
+    def transcribe_stream(
+        self, audio_file, decoding=None, segments=None, content_hash=None
+    ):
+        """
+        Transcribe an audio file or file object without ever holding the
+        whole decoded signal in memory, see iter_transcribe for segments
+        and content_hash
+        """
+        transcription = ""
+        for transcription in self.iter_transcribe(
+            audio_file,
+            decoding=decoding,
+            segments=segments,
+            content_hash=content_hash,
+        ):
+            pass
         return transcription
 
+    def transcribe_files(
+        self,
+        audio_files,
+        decoding=None,
+        content_hashes=None,
+        decode_workers=4,
+    ):
+        """
+        Transcribe several audio files together: decode them and extract
+        their features concurrently on decode_workers threads, and run
+        their windows through generate chunk_batch_size at a time,
+        whichever file they came from, so short files share forward passes.
+        Files are decoded at most decode_workers ahead of the one whose
+        windows are being batched, and a file's features are let go once
+        its windows are generated, so however many files there are only a
+        few are held in memory.
+        Args:
+            audio_files: Paths or file objects containing audio data
+            decoding: DecodingOptions, self.decoding if None
+            content_hashes: SHA-256 of each file, for the feature cache
+            decode_workers: Files decoded at once
+        Returns:
+            list: For each file, its text and list of segment dicts (empty
+                without timestamps), or the exception raised decoding it
+        """
+        decoding = decoding or self.decoding
+        content_hashes = content_hashes or [None] * len(audio_files)
+        start = time.perf_counter()
+        timings = [DecodeTimings() for _ in audio_files]
+        workers = max(1, min(decode_workers, len(audio_files)))
+        prepared = [None] * len(audio_files)
+        window_results = [[] for _ in audio_files]
+        # (file, features, length) of the windows waiting for generate
+        pending = []
+
+        def generate_pending():
+            features = np.stack([row for _, row, _ in pending])
+            lengths = [length for _, _, length in pending]
+            results = self._generate_features(features, lengths, decoding)
+            for (i, _, _), result in zip(pending, results):
+                window_results[i].append(result)
+            pending.clear()
+
+        with ThreadPoolExecutor(workers, "decode") as pool:
+            futures = deque()
+            submitted = 0
+            for i, audio_file in enumerate(audio_files):
+                while submitted < len(audio_files) and len(futures) < workers:
+                    futures.append(
+                        pool.submit(
+                            self.file_features,
+                            audio_files[submitted],
+                            content_hashes[submitted],
+                            timings[submitted],
+                        )
+                    )
+                    submitted += 1
+                try:
+                    file_features = futures.popleft().result()
+                except Exception as e:
+                    logger.warning("Could not decode %s: %s", audio_file, e)
+                    prepared[i] = e
+                    continue
+                for row, length in zip(
+                    file_features.features, file_features.lengths
+                ):
+                    pending.append((i, row, length))
+                    if len(pending) == self.chunk_batch_size:
+                        generate_pending()
+                # Only pending holds the features from here on
+                prepared[i] = replace(file_features, features=None)
+            if pending:
+                generate_pending()
+
+        elapsed = time.perf_counter() - start
+        outcomes = []
+        for file_features, results, file_timings in zip(
+            prepared, window_results, timings
+        ):
+            if not isinstance(file_features, FileFeatures):
+                outcomes.append(file_features)
+                continue
+            collector = SegmentCollector(
+                self.chunk_length_s - self.chunk_overlap_s,
+                self.chunk_overlap_s,
+                self.target_sampling_rate,
+                file_features.timeline,
+            )
+            text = merge_overlapping_texts(
+                window_text(
+                    result, length / self.target_sampling_rate, collector
+                )
+                for length, result in zip(file_features.lengths, results)
+            )
+            outcomes.append((text.strip(), collector.segments))
+            file_timings.report(self.observer, elapsed)
+        return outcomes
+
     def process_audio_file(self, file_path):
         """
         Helper function to process a single audio file
         """
         try:
             info = self.get_audio_info(file_path)
-            print("\nAudio file information:")
-            print(f"Path: {file_path}")
-            print(f"Format: {info['format']}")
-            print(f"Duration: {info['duration']:.2f} seconds")
-            print(f"Sampling rate: {info['sampling_rate']} Hz")
-            print(f"Channels: {info['channels']}")
-
-            audio_array = self.load_audio_from_file(file_path)
-            print("\nStarting transcription...")
-            transcription = self.transcribe(audio_array)
-            print("\nTranscription result:", transcription)
+            logger.info(
+                "Transcribing path=%s format=%s sampling_rate=%d "
+                "channels=%d duration=%.2f",
+                file_path,
+                info["format"],
+                info["sampling_rate"],
+                info["channels"],
+                info["duration"],
+            )
+            transcription = self.transcribe_stream(file_path)
+            logger.debug("Transcription result: %s", transcription)
             return transcription.strip()
 
-        except Exception as e:
-            print(f"Error processing file: {str(e)}")
+        except Exception:
+            logger.exception("Error processing file %s", file_path)
             return None
 
-    def process_audio_object(self, audio_file):
+    def process_audio_object(self, audio_file, decoding=None):
         """
         Helper function to process an audio file object
         Args:
             audio_file: A file object containing audio data
+            decoding: DecodingOptions, self.decoding if None
         Returns:
             str: The transcription text or None if processing fails
         """
-        try:
-            # Load audio data directly from the file object using soundfile
-            audio_array, sampling_rate = sf.read(audio_file)
-
-            print("\nAudio file loaded successfully")
-            print(f"Sampling rate: {sampling_rate} Hz")
-            print(f"Shape: {audio_array.shape}")
-
-            # Resample audio to 16kHz if needed
-            if sampling_rate != self.target_sampling_rate:
-                print(
-                    f"\nResampling from {sampling_rate}Hz to {self.target_sampling_rate}Hz..."  # noqa: E501
-                )
-                audio_array = self.resample_audio(audio_array, sampling_rate)
-                print("Resampling complete")
-
-            print("\nStarting transcription...")
-            transcription = self.transcribe(audio_array)
-            print("\nTranscription result:", transcription)
-            return transcription.strip()
-
-        except Exception as e:
-            print(f"Error processing audio file object: {str(e)}")
-            return None
+        transcription, _ = self.process_audio_segments(audio_file, decoding)
+        return transcription
 
+    def process_audio_segments(
+        self, audio_file, decoding=None, content_hash=None
+    ):
+        """
+        Helper function to process an audio file object into its text and
+        timestamped segments
+        Args:
+            audio_file: A path or file object containing audio data
+            decoding: DecodingOptions, self.decoding if None
+            content_hash: SHA-256 of the file, for the feature cache
+        Returns:
+            tuple: The transcription text and a list of segment dicts (empty
+                without timestamps), or (None, None) if processing fails
+        """
+        try:
+            # Decode, downmix and resample block by block straight from the
+            # file object, feeding 30s windows to feature extraction
+            segments = []
+            transcription = self.transcribe_stream(
+                audio_file, decoding, segments, content_hash
+            )
+            logger.debug("Transcription result: %s", transcription)
+            return transcription.strip(), segments
 
-# Example usage for file path
-# I previously had some issues using wsl to process the files using whisper,
-# and it took a long time to process the files
-# So i had to transcribe the files prior to create the database
-if __name__ == "__main__":
-    audio_files = ["data/Sample 1.mp3", "data/Sample 2.mp3", "data/Sample 3.mp3"]  # noqa: E501
-    transcriber = AudioTranscriber()
-    transcriptions = []
-    for audio_file in audio_files:
-        transcription = transcriber.process_audio_file(audio_file)
-        transcriptions.append(transcription)
-    print(transcriptions)
-
-    # Save transcriptions to individual files
-    for audio_file, transcription in zip(audio_files, transcriptions):
-        if transcription:
-            # Create output filename based on input filename
-            output_filename = audio_file.replace(".mp3", "_transcription.txt")
-            try:
-                with open(output_filename, "w", encoding="utf-8") as f:
-                    f.write(transcription)
-                print(f"Transcription saved to: {output_filename}")
-            except Exception as e:
-                print(f"Error saving transcription for {audio_file}: {str(e)}")
+        except Exception:
+            logger.exception("Error processing audio file object")
+            return None, None
@@ -0,0 +1,255 @@
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """
+    Energy and spectral voice activity detection on 16kHz mono audio.
+
+    Audio is cut into frame_ms frames and every frame of a block is scored
+    at once with NumPy. A frame counts as speech when it is loud enough,
+    margin_db above the running noise floor or louder than loud_db
+    outright, when most of its energy lies in the speech band, and when its
+    spectrum is not flat like broadband noise.
+    """
+
+    def __init__(
+        self,
+        sampling_rate=16000,
+        frame_ms=30,
+        margin_db=12.0,
+        min_energy_db=-50.0,
+        loud_db=-30.0,
+        speech_band_hz=(300, 3400),
+        min_band_ratio=0.5,
+        max_flatness=0.45,
+        noise_floor_rise_db_per_s=0.5,
+    ):
+        self.sampling_rate = sampling_rate
+        self.frame_length = sampling_rate * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.loud_db = loud_db
+        self.min_band_ratio = min_band_ratio
+        self.max_flatness = max_flatness
+        self.noise_floor_rise_db_per_s = noise_floor_rise_db_per_s
+
+        freqs = np.fft.rfftfreq(self.frame_length, 1 / sampling_rate)
+        self._band = (freqs >= speech_band_hz[0]) & (freqs <= speech_band_hz[1])
+        self._window = np.hanning(self.frame_length).astype(np.float32)
+
+    def frame_features(self, frames):
+        """
+        Energy in dBFS, fraction of energy in the speech band and spectral
+        flatness of each row of a (n_frames, frame_length) array
+        """
+        eps = 1e-10
+        energy_db = 10 * np.log10(np.mean(frames**2, axis=1) + eps)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + eps
+        total = power.sum(axis=1)
+        band_ratio = power[:, self._band].sum(axis=1) / total
+        # Geometric over arithmetic mean: near 0 for tones and formants,
+        # about 0.56 for white noise
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / (
+            total / power.shape[1]
+        )
+        return energy_db, band_ratio, flatness
+
+    def classify(self, energy_db, band_ratio, flatness, noise_floor_db):
+        """Boolean speech decision per frame, given the current noise floor"""
+        threshold = min(noise_floor_db + self.margin_db, self.loud_db)
+        return (
+            (energy_db > max(threshold, self.min_energy_db))
+            & (band_ratio >= self.min_band_ratio)
+            & (flatness <= self.max_flatness)
+        )
+
+    def speech_regions(self, audio, **gate_options):
+        """
+        Speech regions of a whole mono array as (start, end) sample pairs,
+        merged and padded as SpeechGate emits them
+        """
+        gate = SpeechGate(self, **gate_options)
+        for _ in gate.process(audio):
+            pass
+        for _ in gate.flush():
+            pass
+        return gate.timeline.regions()
+
+
+class SpeechTimeline:
+    """
+    Where kept speech came from: maps positions in the concatenated speech
+    signal back to positions in the original audio
+    """
+
+    def __init__(self):
+        # Parallel lists of (compact start, original start, length)
+        self._compact = []
+        self._original = []
+        self._length = []
+        self.speech_samples = 0
+
+    def add(self, original_start, length):
+        if self._length and (
+            self._original[-1] + self._length[-1] == original_start
+        ):
+            self._length[-1] += length
+        else:
+            self._compact.append(self.speech_samples)
+            self._original.append(original_start)
+            self._length.append(length)
+        self.speech_samples += length
+
+    def to_original(self, compact_sample):
+        """Original sample index of a sample of the concatenated speech"""
+        if not self._compact:
+            return compact_sample
+        i = max(bisect_right(self._compact, compact_sample) - 1, 0)
+        return self._original[i] + compact_sample - self._compact[i]
+
+    def regions(self):
+        return [
+            (start, start + length)
+            for start, length in zip(self._original, self._length)
+        ]
+
+
+class SpeechGate:
+    """
+    Streaming speech gate: feed 16kHz blocks, get back only the speech.
+
+    Speech starts after onset_ms of consecutive speech frames, and takes
+    the pad_ms before it along. It ends after min_silence_ms without
+    speech, keeping pad_ms of the silence, so pauses shorter than
+    min_silence_ms stay inside one region. Memory is bounded by
+    min_silence_ms of held-back audio.
+    """
+
+    def __init__(self, vad, pad_ms=300, onset_ms=90, min_silence_ms=1000):
+        self.vad = vad
+        frame_ms = 1000 * vad.frame_length / vad.sampling_rate
+        self.pad_frames = max(int(pad_ms / frame_ms), 0)
+        self.onset_frames = max(int(onset_ms / frame_ms), 1)
+        self.silence_frames = max(int(min_silence_ms / frame_ms), 1)
+        self.timeline = SpeechTimeline()
+        self.total_samples = 0
+        self.noise_floor_db = np.inf
+
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._position = 0
+        self._triggered = False
+        self._voiced_run = 0
+        # Frames not yet emitted, as (original start, samples)
+        self._before = deque()
+        self._held = []
+
+    @property
+    def speech_samples(self):
+        return self.timeline.speech_samples
+
+    @property
+    def skipped_fraction(self):
+        if not self.total_samples:
+            return 0.0
+        return 1 - self.speech_samples / self.total_samples
+
+    def _update_noise_floor(self, energy_db, n_frames):
+        seconds = n_frames * self.vad.frame_length / self.vad.sampling_rate
+        quiet = float(np.percentile(energy_db, 10))
+        # Follow drops at once, rises only slowly, so a long stretch of
+        # speech does not become the floor
+        self.noise_floor_db = min(
+            self.noise_floor_db
+            + self.vad.noise_floor_rise_db_per_s * seconds,
+            quiet,
+        )
+
+    def _emit(self, frames):
+        for start, samples in frames:
+            self.timeline.add(start, len(samples))
+            yield samples
+
+    def process(self, block):
+        """Yield the speech samples of a block of 16kHz mono audio"""
+        block = np.asarray(block, dtype=np.float32)
+        self.total_samples += len(block)
+        audio = np.concatenate([self._remainder, block])
+        frame_length = self.vad.frame_length
+        n_frames = len(audio) // frame_length
+        self._remainder = audio[n_frames * frame_length :]
+        if not n_frames:
+            return
+        frames = audio[: n_frames * frame_length].reshape(n_frames, -1)
+        energy_db, band_ratio, flatness = self.vad.frame_features(frames)
+        self._update_noise_floor(energy_db, n_frames)
+        speech = self.vad.classify(
+            energy_db, band_ratio, flatness, self.noise_floor_db
+        )
+
+        out = []
+        for frame, voiced in zip(frames, speech):
+            item = (self._position, frame)
+            self._position += frame_length
+            if not self._triggered:
+                self._before.append(item)
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run >= self.onset_frames:
+                    self._triggered = True
+                    out.extend(self._before)
+                    self._before.clear()
+                else:
+                    while len(self._before) > self.pad_frames + self.onset_frames:  # noqa: E501
+                        self._before.popleft()
+            elif voiced:
+                out.extend(self._held)
+                self._held = []
+                out.append(item)
+            else:
+                self._held.append(item)
+                if len(self._held) >= self.silence_frames:
+                    out.extend(self._held[: self.pad_frames])
+                    self._before = deque(self._held[self.pad_frames :])
+                    self._held = []
+                    self._triggered = False
+                    self._voiced_run = 0
+        yield from self._emit(_join_contiguous(out))
+
+    def filter(self, blocks):
+        """Yield the speech of a whole stream of blocks, then flush"""
+        for block in blocks:
+            yield from self.process(block)
+        yield from self.flush()
+
+    def flush(self):
+        """Yield the speech left once the stream has ended"""
+        if self._triggered:
+            tail = self._held[: self.pad_frames]
+            if len(self._remainder) and not self._held:
+                tail.append((self._position, self._remainder))
+            yield from self._emit(_join_contiguous(tail))
+        self._held = []
+        self._before.clear()
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def stats(self):
+        rate = self.vad.sampling_rate
+        return {
+            "audio_seconds": self.total_samples / rate,
+            "speech_seconds": self.speech_samples / rate,
+            "skipped_fraction": self.skipped_fraction,
+        }
+
+
+def _join_contiguous(frames):
+    """Merge runs of adjacent (start, samples) frames into single arrays"""
+    runs = []
+    for start, samples in frames:
+        if runs and runs[-1][0] + runs[-1][1] == start:
+            runs[-1][1] += len(samples)
+            runs[-1][2].append(samples)
+        else:
+            runs.append([start, len(samples), [samples]])
+    return [(start, np.concatenate(parts)) for start, _, parts in runs]
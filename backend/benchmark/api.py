@@ -0,0 +1,270 @@
+"""Load generator for POST /transcribe, GET /transcriptions and GET /search.
+
+Run from the `backend` directory:
+
+    python -m benchmark.api --stub-model --concurrency 1 8 32
+    python -m benchmark.api --url http://localhost:8000 --requests 200 \\
+        --json api.json
+    python -m benchmark.api --stub-model --memory --audio-seconds 600 \\
+        --endpoints transcribe --concurrency 1 4
+    python -m benchmark.api --stub-model --endpoints transcribe batch \\
+        --batch-files 16 --concurrency 1
+
+Without --url the app is served in process, through httpx's ASGI
+transport, on a fresh SQLite database in a temporary directory; client
+and server then share one event loop, so compare runs made the same way.
+--stub-model sets INFERENCE_ENGINE=stub there, so what is measured is the
+upload, audio frontend, database and API overhead without Whisper. To do
+the same against a running server, start it with INFERENCE_ENGINE=stub.
+
+For each concurrency level, --requests requests go to each endpoint in
+turn from that many concurrent clients:
+
+- transcribe: uploads of a synthetic --audio-seconds WAV, each one
+  different so the result cache never answers (--same-audio to measure
+  cache hits instead)
+- transcriptions: pages of 100 with truncated content
+- search: --query over everything stored so far
+- batch: POST /transcribe/batch with --batch-files of those uploads per
+  request
+
+and the script prints requests and files per second, errors and latency
+percentiles per endpoint. Comparing the files per second of transcribe
+and batch at concurrency 1 weighs one batch request against the same
+number of sequential calls.
+
+--memory (in process only) traces Python and numpy allocations with
+tracemalloc and adds the peak above the idle baseline while an endpoint
+runs, in total and per concurrent request. The client's copy of each
+request body is included, so compare runs made the same way; tensors
+allocated by torch are not traced. Tracing slows everything down, so
+leave it off when measuring throughput.
+"""
+
+import argparse
+import asyncio
+import gc
+import io
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+from benchmark.results import write_results
+
+KEYS = ["endpoint", "concurrency"]
+ENDPOINTS = ("transcribe", "transcriptions", "search", "batch")
+
+
+def synthetic_wav(seconds, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    voice = sum(np.sin(2 * np.pi * f * t) for f in (220, 440, 880))
+    audio = 0.05 * voice + 0.01 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.float32), 16000, format="WAV")
+    return buffer.getvalue()
+
+
+def make_request(endpoint, args, uploads):
+    """A coroutine function sending the i-th request to endpoint"""
+    prefix = "/api/v1"
+
+    async def transcribe(client, i):
+        audio = uploads[i % len(uploads)]
+        return await client.post(
+            f"{prefix}/transcribe",
+            files={"audio_file": (f"bench_{i}.wav", audio, "audio/wav")},
+        )
+
+    async def batch(client, i):
+        first = i * args.batch_files
+        return await client.post(
+            f"{prefix}/transcribe/batch",
+            files=[
+                (
+                    "audio_files",
+                    (
+                        f"bench_{first + j}.wav",
+                        uploads[(first + j) % len(uploads)],
+                        "audio/wav",
+                    ),
+                )
+                for j in range(args.batch_files)
+            ],
+        )
+
+    async def transcriptions(client, i):
+        return await client.get(
+            f"{prefix}/transcriptions",
+            params={"limit": 100, "content": "truncate"},
+        )
+
+    async def search(client, i):
+        return await client.get(
+            f"{prefix}/search", params={"query": args.query, "limit": 50}
+        )
+
+    return {
+        "transcribe": transcribe,
+        "transcriptions": transcriptions,
+        "search": search,
+        "batch": batch,
+    }[endpoint]
+
+
+async def run(client, request, requests, concurrency, trace_memory=False):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request(client, i)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    if trace_memory:
+        # Free the previous run's garbage so it does not hide this peak
+        gc.collect()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    memory = {}
+    if trace_memory:
+        peak = (tracemalloc.get_traced_memory()[1] - baseline) / 2**20
+        memory = {
+            "peak_mib": peak,
+            "peak_mib_per_request": peak / min(concurrency, requests),
+        }
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        **memory,
+    }
+
+
+def in_process_client(directory, stub_model):
+    # Settings are read when the app is imported, so configure it first
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    os.environ["JOB_UPLOAD_DIR"] = os.path.join(directory, "job_uploads")
+    os.environ.setdefault("PROJECT_NAME", "benchmark")
+    # Keep per-request logs out of the timings and the table
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if stub_model:
+        os.environ["INFERENCE_ENGINE"] = "stub"
+    from app.main import app
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=None,
+    )
+
+
+async def benchmark(args, directory):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        client = in_process_client(directory, args.stub_model)
+    rows = []
+    async with client:
+        for level, concurrency in enumerate(args.concurrency):
+            # Fresh audio at every concurrency level, made before timing,
+            # enough for every file of every batch request to differ
+            count = args.requests * max(args.batch_files, 1)
+            uploads = [
+                synthetic_wav(args.audio_seconds, level * count + i)
+                for i in range(1 if args.same_audio else count)
+            ]
+            for endpoint in args.endpoints:
+                result = await run(
+                    client,
+                    make_request(endpoint, args, uploads),
+                    args.requests,
+                    concurrency,
+                    args.memory,
+                )
+                files = args.batch_files if endpoint == "batch" else 1
+                row = {
+                    "endpoint": endpoint,
+                    "concurrency": concurrency,
+                    **result,
+                    "files_per_second": result["requests_per_second"] * files,
+                }
+                rows.append(row)
+                print(
+                    f"{endpoint:>14} {concurrency:>5} {row['errors']:>6} "
+                    f"{row['requests_per_second']:>8.1f} "
+                    f"{row['files_per_second']:>8.1f} "
+                    f"{row['mean_ms']:>8.1f} {row['p50_ms']:>8.1f} "
+                    f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+                    + (
+                        f" {row['peak_mib_per_request']:>9.1f}"
+                        if args.memory
+                        else ""
+                    )
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server")
+    parser.add_argument("--stub-model", action="store_true")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16]
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        choices=ENDPOINTS,
+        default=["transcribe", "transcriptions", "search"],
+    )
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--same-audio", action="store_true")
+    parser.add_argument("--batch-files", type=int, default=8)
+    parser.add_argument("--query", default="transcription")
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    if args.memory and args.url:
+        parser.error("--memory needs the app in process, without --url")
+
+    print(
+        f"{'endpoint':>14} {'conc':>5} {'errors':>6} {'req/s':>8} "
+        f"{'files/s':>8} "
+        f"{'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        + (f" {'MiB/req':>9}" if args.memory else "")
+    )
+    if args.memory:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directory:
+        rows = asyncio.run(benchmark(args, directory))
+
+    if args.json:
+        write_results(args.json, "api", args, KEYS, rows)
+
+
+if __name__ == "__main__":
+    main()
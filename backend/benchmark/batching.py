@@ -0,0 +1,73 @@
+"""Throughput of Whisper generate vs. micro-batch size.
+
+Run from the `backend` directory:
+
+    python -m benchmark.batching --requests 32 --batch-sizes 1 2 4 8
+
+For each batch size, `--requests` concurrent callers each submit one 30s
+window of synthetic speech-band noise through a MicroBatcher, and the
+script prints windows per second and mean batch size actually achieved.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from audio_processor.transcriber import AudioTranscriber
+
+
+def synthetic_window(seconds=30, sampling_rate=16000, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal(seconds * sampling_rate) * 0.1
+    return noise.astype(np.float32)
+
+
+def run(transcriber, features, batch_size, max_wait_ms):
+    transcriber.enable_batching(batch_size, max_wait_ms)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(features)) as pool:
+            list(pool.map(transcriber.batcher.generate, features))
+        elapsed = time.perf_counter() - start
+        stats = transcriber.batcher.stats()
+    finally:
+        transcriber.disable_batching()
+    return {
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "windows_per_second": len(features) / elapsed,
+        "mean_batch_size": stats["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="openai/whisper-tiny")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    parser.add_argument("--max-wait-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    transcriber = AudioTranscriber(args.model)
+    features = [
+        transcriber.extract_features(synthetic_window(seed=i))
+        for i in range(args.requests)
+    ]
+    # Warm up kernels so the first batch size is not penalised
+    transcriber.generate_batch(features[0])
+
+    print(f"{'batch':>5} {'seconds':>8} {'win/s':>8} {'mean batch':>10}")
+    for batch_size in args.batch_sizes:
+        result = run(transcriber, features, batch_size, args.max_wait_ms)
+        print(
+            f"{result['batch_size']:>5} {result['seconds']:>8.2f} "
+            f"{result['windows_per_second']:>8.2f} "
+            f"{result['mean_batch_size']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Real-time factor and accuracy of the CPU inference profiles.
+
+Run from the `backend` directory:
+
+    python -m benchmark.cpu
+    python -m benchmark.cpu --profiles fp32 int8 int8+compile --threads 4
+
+Transcribes each bundled test mp3 (test/object/*.mp3) with every profile
+and reports the real-time factor (processing seconds per audio second,
+lower is faster) and the word error rate against the first profile's
+transcript (fp32 by default), so the fastest profile whose accuracy loss
+is acceptable can be picked for CPU_PROFILE / CPU_COMPILE_ENCODER. A
+"+compile" suffix also compiles the encoder; its first call pays the
+compilation and is excluded by warm-up.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+from audio_processor.cpu import configure_threads
+from audio_processor.transcriber import AudioTranscriber
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "test", "object")
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (r != h),
+                )
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run(profile, paths, repeat):
+    cpu_profile, _, compile_flag = profile.partition("+")
+    transcriber = AudioTranscriber(
+        cpu_profile=cpu_profile, compile_encoder=bool(compile_flag)
+    )
+    transcriber.disable_vad()
+    transcriber.transcribe(np.zeros(16000, dtype=np.float32))
+
+    results = {}
+    for path in paths:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = transcriber.transcribe_stream(path)
+            best = min(best, time.perf_counter() - start)
+        results[path] = (best, text)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profiles", nargs="+", default=["fp32", "int8", "int8+compile"]
+    )
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    configure_threads(intra_op_threads=args.threads)
+    paths = sorted(glob.glob(os.path.join(SAMPLES, "*.mp3")))
+    durations = {path: sf.info(path).duration for path in paths}
+    total_audio = sum(durations.values())
+
+    baseline = None
+    print(f"{'profile':>14} {'audio s':>8} {'wall s':>8} {'RTF':>6} {'WER':>6}")
+    for profile in args.profiles:
+        results = run(profile, paths, args.repeat)
+        if baseline is None:
+            baseline = {path: text for path, (_, text) in results.items()}
+        wall = sum(seconds for seconds, _ in results.values())
+        # Weight each file's WER by its length in reference words
+        words = sum(len(text.split()) for text in baseline.values()) or 1
+        errors = sum(
+            word_error_rate(baseline[path], text) * len(baseline[path].split())
+            for path, (_, text) in results.items()
+        )
+        print(
+            f"{profile:>14} {total_audio:>8.1f} {wall:>8.2f} "
+            f"{wall / total_audio:>6.3f} {errors / words:>6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Read/write contention on the SQLite database, before and after tuning.
+
+Run from the `backend` directory:
+
+    python -m benchmark.db --seconds 5 --readers 4 --writers 4
+
+For each configuration a fresh database file is seeded, then reader
+threads page through /transcriptions-style queries while writer threads
+store transcriptions as uploads do, for a fixed time. Reports committed
+writes per second and reader latency percentiles. Configurations:
+
+- default: the old engine, rollback journal and synchronous=FULL
+- tuned: WAL, synchronous=NORMAL, mmap, cache and busy_timeout pragmas
+- group: tuned, with writes going through the group-commit writer
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from app.crud import add_transcription, list_transcriptions, save_transcription
+from app.db.database import create_db_engine
+from app.db.writer import GroupCommitWriter
+from app.models.transcription import Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+SEED_ROWS = 5000
+TEXT = "the quick brown fox jumps over the lazy dog " * 20
+
+
+def make_engine(config, path):
+    url = f"sqlite:///{path}"
+    if config == "default":
+        return create_engine(
+            url, connect_args={"check_same_thread": False, "timeout": 30}
+        )
+    return create_db_engine(url)
+
+
+def seed(session_factory):
+    db = session_factory()
+    for i in range(SEED_ROWS):
+        add_transcription(db, f"seed_{i}.mp3", TEXT)
+    db.commit()
+    db.close()
+
+
+def run(config, path, seconds, readers, writers):
+    engine = make_engine(config, path)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(
+        autocommit=False, autoflush=False, bind=engine
+    )
+    seed(session_factory)
+    writer = GroupCommitWriter(session_factory) if config == "group" else None
+
+    stop = threading.Event()
+    read_latencies = []
+    writes = []
+    errors = []
+
+    def read_loop():
+        db = session_factory()
+        latencies = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                list_transcriptions(db, limit=100, content="truncate")
+                db.rollback()
+            except Exception as e:
+                errors.append(e)
+                db.rollback()
+            latencies.append(time.perf_counter() - start)
+        db.close()
+        read_latencies.extend(latencies)
+
+    def write_loop():
+        count = 0
+        while not stop.is_set():
+            try:
+                if writer is not None:
+                    writer.submit(add_transcription, "upload.mp3", TEXT).result()  # noqa: E501
+                else:
+                    db = session_factory()
+                    try:
+                        save_transcription(db, "upload.mp3", TEXT)
+                    finally:
+                        db.close()
+                count += 1
+            except Exception as e:
+                errors.append(e)
+        writes.append(count)
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    threads += [threading.Thread(target=write_loop) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if writer is not None:
+        writer.close()
+    engine.dispose()
+
+    reads = len(read_latencies)
+    read_latencies = sorted(read_latencies) or [0.0]
+    return {
+        "writes_per_s": sum(writes) / seconds,
+        "reads_per_s": reads / seconds,
+        "read_p50_ms": statistics.median(read_latencies) * 1000,
+        "read_p99_ms": read_latencies[int(len(read_latencies) * 0.99)] * 1000,  # noqa: E501
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument(
+        "--configs", nargs="+", default=["default", "tuned", "group"]
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'config':>8} {'writes/s':>9} {'reads/s':>8} "
+        f"{'read p50 ms':>11} {'read p99 ms':>11} {'errors':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for config in args.configs:
+            path = os.path.join(tmp, f"{config}.db")
+            result = run(config, path, args.seconds, args.readers, args.writers)  # noqa: E501
+            print(
+                f"{config:>8} {result['writes_per_s']:>9.0f} "
+                f"{result['reads_per_s']:>8.0f} "
+                f"{result['read_p50_ms']:>11.2f} "
+                f"{result['read_p99_ms']:>11.2f} {result['errors']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
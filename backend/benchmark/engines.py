@@ -0,0 +1,98 @@
+"""Throughput of the inference engines on the same windows.
+
+Run from the `backend` directory:
+
+    python -m benchmark.engines
+    python -m benchmark.engines --engines transformers onnx onnx:int8 \\
+        --batch-sizes 1 4 --threads 4
+
+Cuts the bundled test mp3s (test/object/*.mp3) into 30s windows and runs
+every engine over them at each batch size, reporting windows and audio
+seconds transcribed per second of wall time. "engine:int8" uses the int8
+CPU profile. The WER column compares each engine's texts to the first
+engine's, so a faster backend that changes the output shows up. The ONNX
+export is created in --onnx-dir on first run, which needs optimum.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+from audio_processor.cpu import configure_threads
+from audio_processor.stream import iter_audio_blocks
+from audio_processor.transcriber import AudioTranscriber
+
+from benchmark.cpu import word_error_rate
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "test", "object")
+WINDOW = 30 * 16000
+
+
+def sample_windows():
+    windows = []
+    for path in sorted(glob.glob(os.path.join(SAMPLES, "*.mp3"))):
+        audio = np.concatenate(list(iter_audio_blocks(path, 16000)))
+        windows.extend(
+            audio[start : start + WINDOW]
+            for start in range(0, len(audio), WINDOW)
+        )
+    return windows
+
+
+def run(transcriber, windows, batch_size):
+    texts = []
+    start = time.perf_counter()
+    for i in range(0, len(windows), batch_size):
+        features = transcriber.extract_features(windows[i : i + batch_size])
+        texts.extend(transcriber.generate_batch(features))
+    return time.perf_counter() - start, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="openai/whisper-tiny")
+    parser.add_argument(
+        "--engines", nargs="+", default=["transformers", "onnx"]
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--onnx-dir", default="onnx_models")
+    args = parser.parse_args()
+
+    configure_threads(intra_op_threads=args.threads)
+    windows = sample_windows()
+    audio_seconds = sum(len(w) for w in windows) / 16000
+
+    reference = None
+    print(
+        f"{'engine':>18} {'batch':>5} {'windows/s':>9} "
+        f"{'audio s/s':>9} {'WER':>6}"
+    )
+    for spec in args.engines:
+        engine, _, profile = spec.partition(":")
+        transcriber = AudioTranscriber(
+            args.model,
+            cpu_profile=profile or "fp32",
+            engine=engine,
+            onnx_model_dir=os.path.join(
+                args.onnx_dir, args.model.replace("/", "--")
+            ),
+        )
+        # Warm up so the first batch size does not pay for initialisation
+        transcriber.generate_batch(transcriber.extract_features(windows[:1]))
+        for batch_size in args.batch_sizes:
+            seconds, texts = run(transcriber, windows, batch_size)
+            text = " ".join(texts)
+            if reference is None:
+                reference = text
+            print(
+                f"{spec:>18} {batch_size:>5} {len(windows) / seconds:>9.2f} "
+                f"{audio_seconds / seconds:>9.1f} "
+                f"{word_error_rate(reference, text):>6.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
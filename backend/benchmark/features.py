@@ -0,0 +1,157 @@
+"""Log-mel feature extraction time per window, and feature cache loads.
+
+Run from the `backend` directory:
+
+    python -m benchmark.features
+    python -m benchmark.features --batch-sizes 1 8 32 --threads 1 4 \\
+        --json features.json
+
+Times the model's WhisperFeatureExtractor called once per window and once
+per batch against audio_processor.features.LogMelExtractor with each STFT
+backend, on random 30s windows, and reports the median milliseconds per
+window over --repeat runs. The cache rows compare decoding a synthetic
+--audio-seconds WAV and extracting its windows' features with loading the
+same features back from a FeatureCache entry, per file, reading every
+page of the memory-mapped entry.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+from audio_processor.cpu import configure_threads
+from audio_processor.features import (
+    STFT_BACKENDS,
+    FeatureCache,
+    FileFeatures,
+    LogMelExtractor,
+)
+from audio_processor.stream import iter_audio_blocks
+from transformers import WhisperFeatureExtractor
+
+from benchmark.results import write_results
+
+KEYS = ["method", "batch_size", "threads"]
+RATE = 16000
+WINDOW = 30 * RATE
+STEP = 25 * RATE
+
+
+def median_seconds(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def extractors(processor):
+    """Callables turning a list of windows into features, by method"""
+    methods = {
+        "hf_per_window": lambda windows: [
+            processor(w, sampling_rate=RATE, return_tensors="np")
+            for w in windows
+        ],
+        "hf_batched": lambda windows: processor(
+            windows, sampling_rate=RATE, return_tensors="np"
+        ),
+    }
+    for stft in STFT_BACKENDS:
+        methods[stft] = LogMelExtractor.from_processor(processor, stft)
+    return methods
+
+
+def file_windows(path):
+    audio = np.concatenate(list(iter_audio_blocks(path, RATE)))
+    starts = range(0, max(len(audio) - WINDOW + STEP, 1), STEP)
+    return [audio[start : start + WINDOW] for start in starts]
+
+
+def time_cache(extractor, args, threads):
+    """Rows for extracting a file's features against loading them"""
+    rng = np.random.default_rng(1)
+    audio = 0.1 * rng.standard_normal(int(args.audio_seconds * RATE))
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/audio.wav"
+        sf.write(path, audio.astype(np.float32), RATE)
+        cache = FeatureCache(f"{directory}/cache")
+
+        def extract():
+            windows = file_windows(path)
+            return extractor(windows), [len(w) for w in windows]
+
+        features, lengths = extract()
+        cache.put(
+            "key", FileFeatures(features, lengths, None, args.audio_seconds)
+        )
+        return [
+            {
+                "method": method,
+                "batch_size": len(lengths),
+                "threads": threads,
+                "ms_per_file": median_seconds(fn, args.repeat) * 1000,
+            }
+            for method, fn in (
+                ("decode_and_extract", extract),
+                ("cache_load", lambda: np.array(cache.get("key").features)),
+            )
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 4, 8]
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--audio-seconds", type=float, default=600)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    processor = WhisperFeatureExtractor()
+    methods = extractors(processor)
+    rng = np.random.default_rng(0)
+    windows = [
+        (0.1 * rng.standard_normal(WINDOW)).astype(np.float32)
+        for _ in range(max(args.batch_sizes))
+    ]
+
+    rows = []
+    print(f"{'method':>20} {'batch':>6} {'threads':>7} {'ms':>10}")
+    for threads in args.threads:
+        configure_threads(threads)
+        for batch_size in args.batch_sizes:
+            batch = windows[:batch_size]
+            for method, extract in methods.items():
+                seconds = median_seconds(lambda: extract(batch), args.repeat)
+                rows.append(
+                    {
+                        "method": method,
+                        "batch_size": batch_size,
+                        "threads": threads,
+                        "ms_per_window": seconds / batch_size * 1000,
+                    }
+                )
+                print(
+                    f"{method:>20} {batch_size:>6} {threads:>7} "
+                    f"{rows[-1]['ms_per_window']:>10.2f}"
+                )
+        for row in time_cache(methods["torch"], args, threads):
+            rows.append(row)
+            print(
+                f"{row['method']:>20} {row['batch_size']:>6} "
+                f"{threads:>7} {row['ms_per_file']:>10.2f}"
+            )
+
+    if args.json:
+        write_results(args.json, "features", args, KEYS, rows)
+
+
+if __name__ == "__main__":
+    main()
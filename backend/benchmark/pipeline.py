@@ -0,0 +1,167 @@
+"""Per-stage time of AudioTranscriber across durations, rates and channels.
+
+Run from the `backend` directory:
+
+    python -m benchmark.pipeline
+    python -m benchmark.pipeline --durations 10 60 --rates 16000 44100 \\
+        --channels 1 2 --engine onnx --json pipeline.json
+    python -m benchmark.pipeline --engine stub
+
+Writes a synthetic WAV for every duration, sample rate and channel count,
+and adds the bundled test mp3s (test/object/*.mp3) unless --no-files,
+then transcribes each one --repeat times with transcribe_stream. The
+transcriber's stage timings give the decode, resample, features, generate
+and detokenize seconds per file, reported as the median over the repeats
+together with the total and the real-time factor (seconds per second of
+audio). --engine stub skips Whisper, leaving the audio frontend.
+--json writes the rows for benchmark.results to compare.
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+import soundfile as sf
+from audio_processor.cpu import configure_threads
+from audio_processor.metrics import StageObserver
+from audio_processor.transcriber import AudioTranscriber
+
+from benchmark.results import write_results
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "test", "object")
+STAGES = ("decode", "resample", "features", "generate", "detokenize")
+KEYS = ["audio", "duration_s", "sampling_rate", "channels"]
+
+
+class StageTotals(StageObserver):
+    """Seconds per stage and audio seconds for one transcription"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.audio_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def observe_stage(self, stage, seconds):
+        self.seconds[stage] += seconds
+
+    def observe_audio(self, audio_seconds, seconds):
+        self.audio_seconds += audio_seconds
+        self.total_seconds += seconds
+
+
+def write_synthetic_wav(path, seconds, sampling_rate, channels, seed=0):
+    """
+    Tones in the speech band under a syllable-rate envelope, with a little
+    noise, so VAD and Whisper see something like speech
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sampling_rate)) / sampling_rate
+    voice = sum(np.sin(2 * np.pi * f * t) for f in (220, 440, 880, 1320))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    mono = 0.05 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    audio = np.repeat(mono[:, None], channels, axis=1).astype(np.float32)
+    sf.write(path, audio, sampling_rate)
+
+
+def cases(directory, durations, rates, channel_counts, files=True):
+    """(audio name, path) for the synthetic WAVs and the bundled files"""
+    for seconds in durations:
+        for rate in rates:
+            for channels in channel_counts:
+                path = os.path.join(
+                    directory, f"{seconds:g}s_{rate}hz_{channels}ch.wav"
+                )
+                write_synthetic_wav(path, seconds, rate, channels)
+                yield "synthetic", path
+    if files:
+        for path in sorted(glob.glob(os.path.join(SAMPLES, "*.mp3"))):
+            yield os.path.basename(path), path
+
+
+def measure(transcriber, path, repeat):
+    runs = []
+    for _ in range(repeat):
+        totals = StageTotals()
+        transcriber.enable_metrics(totals)
+        transcriber.transcribe_stream(path)
+        runs.append(totals)
+    info = sf.info(path)
+    audio_seconds = runs[0].audio_seconds
+    row = {
+        "duration_s": round(info.duration, 2),
+        "sampling_rate": info.samplerate,
+        "channels": info.channels,
+    }
+    for stage in STAGES:
+        row[f"{stage}_s"] = statistics.median(r.seconds[stage] for r in runs)
+    row["total_s"] = statistics.median(r.total_seconds for r in runs)
+    row["rtf"] = row["total_s"] / audio_seconds if audio_seconds else None
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="openai/whisper-tiny")
+    parser.add_argument(
+        "--engine", default="transformers", choices=("transformers", "onnx", "stub")
+    )
+    parser.add_argument("--cpu-profile", default="fp32")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument(
+        "--durations", type=float, nargs="+", default=[10, 30, 120]
+    )
+    parser.add_argument(
+        "--rates", type=int, nargs="+", default=[16000, 44100, 48000]
+    )
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--no-files", action="store_true")
+    parser.add_argument("--vad", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    configure_threads(intra_op_threads=args.threads)
+    transcriber = AudioTranscriber(
+        args.model,
+        cpu_profile=args.cpu_profile,
+        engine=args.engine,
+        onnx_model_dir=os.path.join(
+            "onnx_models", args.model.replace("/", "--")
+        ),
+    )
+    if args.vad:
+        transcriber.enable_vad()
+    # Warm up so the first case does not pay for initialisation
+    transcriber.generate_batch(
+        transcriber.extract_features([np.zeros(16000, dtype=np.float32)])
+    )
+
+    rows = []
+    print(
+        f"{'audio':>14} {'dur s':>6} {'rate':>6} {'ch':>3} "
+        + " ".join(f"{stage[:10]:>10}" for stage in STAGES)
+        + f" {'total':>8} {'RTF':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for audio, path in cases(
+            tmp, args.durations, args.rates, args.channels, not args.no_files
+        ):
+            row = {"audio": audio, **measure(transcriber, path, args.repeat)}
+            rows.append(row)
+            print(
+                f"{audio[:14]:>14} {row['duration_s']:>6g} "
+                f"{row['sampling_rate']:>6} {row['channels']:>3} "
+                + " ".join(f"{row[f'{s}_s']:>10.3f}" for s in STAGES)
+                + f" {row['total_s']:>8.2f} {row['rtf'] or 0:>6.3f}"
+            )
+
+    if args.json:
+        write_results(args.json, "pipeline", args, KEYS, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark results as JSON, and a comparison of two runs.
+
+Run from the `backend` directory:
+
+    python -m benchmark.pipeline --json before.json
+    git checkout my-branch
+    python -m benchmark.pipeline --json after.json
+    python -m benchmark.results before.json after.json
+
+A results file records the benchmark, the commit it ran on, the machine
+and the arguments next to the rows of results. Rows are identified by the
+benchmark's key columns (e.g. duration, sample rate and channels); the
+comparison lines up the rows both runs share and prints the relative
+change of every numeric column, marking changes beyond --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import torch
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Commit, interpreter and hardware the benchmark ran on"""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        # Uncommitted changes to tracked files make the commit approximate
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def write_results(path, benchmark, args, keys, rows):
+    """Write a benchmark's rows, keyed by the keys columns, to path"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "benchmark": benchmark,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "environment": environment(),
+                "args": vars(args),
+                "keys": keys,
+                "rows": rows,
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def compare(old, new, threshold=0.1):
+    """
+    Rows of (case, column, old value, new value, relative change) for the
+    numeric columns of the cases in both runs, and whether the change is
+    beyond threshold
+    """
+    keys = new["keys"]
+    old_rows = {tuple(r[k] for k in keys): r for r in old["rows"]}
+    changes = []
+    for row in new["rows"]:
+        case = tuple(row[k] for k in keys)
+        before = old_rows.get(case)
+        if before is None:
+            continue
+        for column, value in row.items():
+            previous = before.get(column)
+            if (
+                column in keys
+                or not isinstance(value, (int, float))
+                or not isinstance(previous, (int, float))
+            ):
+                continue
+            change = (value - previous) / previous if previous else 0.0
+            changes.append(
+                (case, column, previous, value, change, abs(change) > threshold)
+            )
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if old["benchmark"] != new["benchmark"]:
+        parser.error(
+            f"{args.old} is a {old['benchmark']} run, "
+            f"{args.new} a {new['benchmark']} one"
+        )
+    print(
+        f"{old['benchmark']}: {(old['environment']['commit'] or '?')[:10]} "
+        f"-> {(new['environment']['commit'] or '?')[:10]}"
+    )
+    print(
+        f"{'case':>32} {'column':>20} {'old':>10} {'new':>10} {'change':>8}"
+    )
+    for case, column, before, after, change, flagged in compare(
+        old, new, args.threshold
+    ):
+        label = "/".join(str(k) for k in case)
+        print(
+            f"{label[-32:]:>32} {column:>20} {before:>10.4g} "
+            f"{after:>10.4g} {change:>+8.1%}{' *' if flagged else ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
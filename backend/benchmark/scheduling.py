@@ -0,0 +1,132 @@
+"""Latency of short clips behind long files, FIFO against shortest first.
+
+Run from the `backend` directory:
+
+    python -m benchmark.scheduling
+    python -m benchmark.scheduling --jobs 500 --load 0.9 --aging 10 30 \\
+        --json scheduling.json
+
+Replays one mixed workload through app.core.executor.InferenceExecutor
+under each scheduler: jobs arrive at random (Poisson) times, --long-
+fraction of them --long-seconds files and the rest --short-seconds
+clips, and each one sleeps on a worker for its duration times --rtf.
+Arrivals are paced so the workers are busy --load of the time. The
+script prints p50 and p99 latency, from arrival to result, for short
+clips and long files, and the longest a long file waited, which aging
+bounds. The same seed gives the same arrivals under every scheduler.
+
+--rtf compresses time relative to a model with real-time factor
+--model-rtf, and --aging, given as INFERENCE_SJF_AGING would be for that
+model, is scaled to match, so e.g. latencies at --rtf 0.001 are those of
+a --model-rtf 0.05 deployment divided by 50.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from app.core.executor import InferenceExecutor
+
+from benchmark.results import write_results
+
+KEYS = ["scheduler", "aging", "kind"]
+
+
+def workload(args):
+    """(arrival offset, audio seconds) of every job"""
+    rng = np.random.default_rng(args.seed)
+    long = rng.random(args.jobs) < args.long_fraction
+    costs = np.where(long, args.long_seconds, args.short_seconds)
+    mean_service = costs.mean() * args.rtf / args.workers
+    gaps = rng.exponential(mean_service / args.load, args.jobs)
+    return list(zip(np.cumsum(gaps).tolist(), costs.tolist()))
+
+
+async def replay(jobs, scheduler, aging, args):
+    executor = InferenceExecutor(
+        max_workers=args.workers,
+        max_queue=len(jobs),
+        scheduler=scheduler,
+        aging=aging * args.model_rtf / args.rtf,
+    )
+    latencies = {"short": [], "long": []}
+    waits = {"short": [], "long": []}
+
+    async def submit(arrival, cost):
+        await asyncio.sleep(max(arrival - (time.perf_counter() - start), 0))
+        submitted = time.perf_counter()
+        _, waited, _ = await executor.run(
+            time.sleep, cost * args.rtf, cost=cost
+        )
+        kind = "long" if cost >= args.long_seconds else "short"
+        latencies[kind].append(time.perf_counter() - submitted)
+        waits[kind].append(waited)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(submit(arrival, cost) for arrival, cost in jobs)
+        )
+    finally:
+        executor.shutdown()
+
+    rows = []
+    for kind in ("short", "long"):
+        if len(latencies[kind]) < 2:
+            continue
+        percentiles = statistics.quantiles(
+            latencies[kind], n=100, method="inclusive"
+        )
+        rows.append(
+            {
+                "scheduler": scheduler,
+                "aging": aging if scheduler == "sjf" else None,
+                "kind": kind,
+                "jobs": len(latencies[kind]),
+                "p50_ms": percentiles[49] * 1000,
+                "p99_ms": percentiles[98] * 1000,
+                "max_wait_ms": max(waits[kind]) * 1000,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=300)
+    parser.add_argument("--short-seconds", type=float, default=5.0)
+    parser.add_argument("--long-seconds", type=float, default=600.0)
+    parser.add_argument("--long-fraction", type=float, default=0.1)
+    parser.add_argument("--rtf", type=float, default=0.001)
+    parser.add_argument("--model-rtf", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--load", type=float, default=0.8)
+    parser.add_argument("--aging", type=float, nargs="+", default=[5.0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    jobs = workload(args)
+    runs = [("fifo", None)] + [("sjf", aging) for aging in args.aging]
+    rows = []
+    print(
+        f"{'scheduler':>10} {'aging':>6} {'kind':>6} {'jobs':>5} "
+        f"{'p50 ms':>9} {'p99 ms':>9} {'max wait ms':>12}"
+    )
+    for scheduler, aging in runs:
+        for row in asyncio.run(replay(jobs, scheduler, aging or 5.0, args)):
+            rows.append(row)
+            print(
+                f"{scheduler:>10} {aging or '':>6} {row['kind']:>6} "
+                f"{row['jobs']:>5} {row['p50_ms']:>9.1f} "
+                f"{row['p99_ms']:>9.1f} {row['max_wait_ms']:>12.1f}"
+            )
+
+    if args.json:
+        write_results(args.json, "scheduling", args, KEYS, rows)
+
+
+if __name__ == "__main__":
+    main()
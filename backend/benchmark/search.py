@@ -0,0 +1,127 @@
+"""LIKE scans vs. the FTS5 index for /search, as the table grows.
+
+Run from the `backend` directory:
+
+    python -m benchmark.search --rows 10000 100000 1000000
+
+Seeds a temporary SQLite file with synthetic transcriptions (Zipf-distributed
+words, so some terms are common and some rare) up to each row count, then
+reports the median latency of the old filename ILIKE query, a content LIKE
+query (what searching transcripts would cost without an index) and the
+ranked FTS5 search for the same terms. No model is loaded.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from app.db import fts
+from app.models.transcription import Base, Transcription
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_ROW = 40
+SEED_BATCH = 10000
+
+
+def make_vocabulary(rng):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 10, VOCABULARY_SIZE)
+    return ["".join(rng.choice(letters, n)) for n in lengths]
+
+
+def synthetic_rows(rng, vocabulary, start, count):
+    # Zipf ranks, folded into the vocabulary
+    ids = (rng.zipf(1.2, (count, WORDS_PER_ROW)) - 1) % len(vocabulary)
+    for i, row in enumerate(ids):
+        words = [vocabulary[j] for j in row]
+        yield {
+            "filename": f"{words[0]}_{words[1]}_{start + i}.mp3",
+            "transcription_content": " ".join(words),
+        }
+
+
+def seed(engine, rng, vocabulary, start, stop):
+    with engine.begin() as conn:
+        for offset in range(start, stop, SEED_BATCH):
+            count = min(SEED_BATCH, stop - offset)
+            conn.execute(
+                insert(Transcription),
+                list(synthetic_rows(rng, vocabulary, offset, count)),
+            )
+
+
+def like_filename(db, term):
+    # The query /search ran before the index
+    return (
+        db.query(Transcription)
+        .filter(Transcription.filename.ilike(f"%{term}%"))
+        .limit(50)
+        .all()
+    )
+
+
+def like_content(db, term):
+    return (
+        db.query(Transcription)
+        .filter(Transcription.transcription_content.ilike(f"%{term}%"))
+        .limit(50)
+        .all()
+    )
+
+
+def fts_search(db, term):
+    return fts.search(db, term, limit=50)
+
+
+def median_ms(fn, db, term, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(db, term)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = make_vocabulary(rng)
+    # A common word, a mid-frequency word and a rare one
+    terms = [vocabulary[0], vocabulary[50], vocabulary[5000]]
+
+    print(
+        f"{'rows':>9} {'term':>10} {'ilike name ms':>13} "
+        f"{'like text ms':>12} {'fts ms':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        seeded = 0
+        for rows in sorted(args.rows):
+            seed(engine, rng, vocabulary, seeded, rows)
+            seeded = rows
+            for term in terms:
+                print(
+                    f"{rows:>9} {term:>10} "
+                    f"{median_ms(like_filename, db, term, args.repeat):>13.2f} "  # noqa: E501
+                    f"{median_ms(like_content, db, term, args.repeat):>12.2f} "
+                    f"{median_ms(fts_search, db, term, args.repeat):>8.2f}"
+                )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
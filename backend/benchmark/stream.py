@@ -0,0 +1,93 @@
+"""Whole-file sf.read + FFT resample vs. the streaming audio frontend.
+
+Run from the `backend` directory:
+
+    python -m benchmark.stream --minutes 1 5 20
+
+Writes a synthetic 44.1kHz stereo WAV per duration and reports wall time
+and peak traced memory (tracemalloc, which sees NumPy buffers) for turning
+it into 16kHz mono 30s windows with each path. No model is loaded.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+from audio_processor.stream import iter_audio_blocks, iter_stream_windows
+from scipy import signal
+
+TARGET_RATE = 16000
+WINDOW = 30 * TARGET_RATE
+STEP = 25 * TARGET_RATE
+
+
+def write_synthetic_wav(path, minutes, sampling_rate=44100, channels=2):
+    rng = np.random.default_rng(0)
+    block = sampling_rate * 10
+    with sf.SoundFile(
+        path, "w", samplerate=sampling_rate, channels=channels
+    ) as f:
+        for _ in range(int(minutes * 6)):
+            f.write(rng.standard_normal((block, channels)) * 0.1)
+
+
+def legacy_path(path):
+    # What process_audio_object used to do
+    audio, rate = sf.read(path)
+    audio = signal.resample(audio, int(len(audio) * TARGET_RATE / rate))
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    start = 0
+    while True:
+        window = audio[start : start + WINDOW]
+        if start + WINDOW >= len(audio):
+            return window
+        start += STEP
+
+
+def streaming_path(path):
+    blocks = iter_audio_blocks(path, TARGET_RATE)
+    for window in iter_stream_windows(blocks, WINDOW, STEP):
+        pass
+    return window
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--minutes", type=float, nargs="+", default=[1, 5, 20]
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'minutes':>7} {'legacy s':>9} {'legacy MiB':>10} "
+        f"{'stream s':>9} {'stream MiB':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"{minutes}.wav")
+            write_synthetic_wav(path, minutes)
+            legacy_s, legacy_mib = measure(legacy_path, path)
+            stream_s, stream_mib = measure(streaming_path, path)
+            print(
+                f"{minutes:>7g} {legacy_s:>9.2f} {legacy_mib:>10.1f} "
+                f"{stream_s:>9.2f} {stream_mib:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
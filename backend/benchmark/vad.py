@@ -0,0 +1,104 @@
+"""Transcription wall time with and without the VAD pre-pass.
+
+Run from the `backend` directory:
+
+    python -m benchmark.vad
+    python -m benchmark.vad --silence 60 --repeat 3
+    python -m benchmark.vad --vad-only
+
+Transcribes each bundled test mp3 (test/object/*.mp3) with VAD off and on
+and reports the wall time, the fraction of audio the VAD skipped and the
+time spent in the VAD itself. --silence pads each file with that many
+seconds of quiet noise before and after, standing in for recordings that
+are mostly silence or hold. --vad-only skips the model and times the
+detection alone.
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+from audio_processor.stream import iter_audio_blocks
+from audio_processor.vad import SpeechGate, VoiceActivityDetector
+
+TARGET_RATE = 16000
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "test", "object")
+
+
+def padded_copy(path, silence_s, directory):
+    """Write a 16kHz WAV of the file with silence_s of quiet noise each side"""
+    audio = np.concatenate(list(iter_audio_blocks(path, TARGET_RATE)))
+    rng = np.random.default_rng(0)
+    pad = (rng.standard_normal(int(silence_s * TARGET_RATE)) * 1e-4).astype(
+        np.float32
+    )
+    out = os.path.join(directory, os.path.basename(path) + ".wav")
+    sf.write(out, np.concatenate([pad, audio, pad]), TARGET_RATE)
+    return out
+
+
+def time_vad(path):
+    gate = SpeechGate(VoiceActivityDetector(TARGET_RATE))
+    blocks = list(iter_audio_blocks(path, TARGET_RATE))
+    start = time.perf_counter()
+    for block in blocks:
+        for _ in gate.process(block):
+            pass
+    for _ in gate.flush():
+        pass
+    return time.perf_counter() - start, gate
+
+
+def time_transcribe(transcriber, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transcriber.transcribe_stream(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--silence", type=float, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--vad-only", action="store_true")
+    args = parser.parse_args()
+
+    transcriber = None
+    if not args.vad_only:
+        from audio_processor.transcriber import AudioTranscriber
+
+        transcriber = AudioTranscriber()
+        transcriber.transcribe(np.zeros(TARGET_RATE, dtype=np.float32))
+
+    print(
+        f"{'file':>24} {'audio s':>8} {'skipped':>8} {'vad ms':>7} "
+        f"{'off s':>7} {'on s':>7} {'saved':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in sorted(glob.glob(os.path.join(SAMPLES, "*.mp3"))):
+            if args.silence:
+                path = padded_copy(path, args.silence, tmp)
+            vad_s, gate = time_vad(path)
+            stats = gate.stats()
+            row = (
+                f"{os.path.basename(path)[:24]:>24} "
+                f"{stats['audio_seconds']:>8.1f} "
+                f"{stats['skipped_fraction']:>8.0%} {vad_s * 1000:>7.1f}"
+            )
+            if transcriber is not None:
+                transcriber.disable_vad()
+                off = time_transcribe(transcriber, path, args.repeat)
+                transcriber.enable_vad()
+                on = time_transcribe(transcriber, path, args.repeat)
+                row += f" {off:>7.2f} {on:>7.2f} {1 - on / off:>6.0%}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Memory per worker and aggregate throughput of app.serve by worker count.
+
+Run from the `backend` directory:
+
+    python -m benchmark.workers
+    python -m benchmark.workers --workers 1 2 4 8 --model openai/whisper-base \\
+        --json workers.json
+    python -m benchmark.workers --random-model --cpu-profile fp32 int8
+
+For each --workers count and --cpu-profile the script starts
+`python -m app.serve` on a free port and a fresh SQLite database, waits
+until every worker has loaded the model, and uploads --requests distinct
+synthetic --audio-seconds WAVs to POST /transcribe from --per-worker
+concurrent clients per worker. It prints files per second across all
+workers, latency percentiles, and each worker's memory from
+/proc/<pid>/smaps_rollup after the run:
+
+- rss: resident pages, counting pages shared with other workers in full
+- pss: resident pages, with each shared page split between the processes
+  mapping it, so the workers' pss adds up to what they really use
+- private: pages only this worker maps, e.g. activations and int8 weights
+
+total_pss adds up the workers' and the supervisor's pss. With fp32 the
+weights are memory-mapped from the checkpoint and shared, so pss per
+worker should fall as workers are added, while int8 gives every worker
+its own quantised copy. Linux only.
+
+--random-model serves a randomly initialised checkpoint of whisper-base's
+size with a placeholder tokenizer instead of --model, so no download is
+needed; its transcriptions are noise, its cost per file is about right.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmark.api import make_request, run, synthetic_wav
+from benchmark.results import write_results
+
+KEYS = ["workers", "cpu_profile"]
+SPECIAL_TOKENS = [
+    "<|endoftext|>",
+    "<|startoftranscript|>",
+    "<|en|>",
+    "<|transcribe|>",
+    "<|translate|>",
+    "<|notimestamps|>",
+]
+
+
+def random_checkpoint(path, max_length=32):
+    """Write a random whisper-base sized checkpoint and processor to path"""
+    import torch
+    from transformers import (
+        GenerationConfig,
+        WhisperConfig,
+        WhisperFeatureExtractor,
+        WhisperForConditionalGeneration,
+        WhisperProcessor,
+        WhisperTokenizer,
+    )
+
+    vocab_size = 51865
+    plain = vocab_size - len(SPECIAL_TOKENS)
+    vocab = {f"t{i}": i for i in range(plain)}
+    vocab.update({token: plain + i for i, token in enumerate(SPECIAL_TOKENS)})
+    with open(f"{path}/vocab.json", "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    with open(f"{path}/merges.txt", "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = WhisperTokenizer(f"{path}/vocab.json", f"{path}/merges.txt")
+
+    eos, start = vocab["<|endoftext|>"], vocab["<|startoftranscript|>"]
+    torch.manual_seed(0)
+    model = WhisperForConditionalGeneration(
+        WhisperConfig(
+            vocab_size=vocab_size,
+            d_model=512,
+            encoder_layers=6,
+            decoder_layers=6,
+            encoder_attention_heads=8,
+            decoder_attention_heads=8,
+            encoder_ffn_dim=2048,
+            decoder_ffn_dim=2048,
+            decoder_start_token_id=start,
+            eos_token_id=eos,
+            pad_token_id=eos,
+            bos_token_id=eos,
+        )
+    )
+    model.generation_config = GenerationConfig(
+        decoder_start_token_id=start,
+        eos_token_id=eos,
+        pad_token_id=eos,
+        max_length=max_length,
+        is_multilingual=True,
+        lang_to_id={"<|en|>": vocab["<|en|>"]},
+        task_to_id={
+            "transcribe": vocab["<|transcribe|>"],
+            "translate": vocab["<|translate|>"],
+        },
+        no_timestamps_token_id=vocab["<|notimestamps|>"],
+    )
+    model.save_pretrained(path)
+    WhisperProcessor(WhisperFeatureExtractor(), tokenizer).save_pretrained(
+        path
+    )
+    return path
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(server_pid):
+    """uvicorn's worker processes, or the server itself with one worker"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # pid (comm) state ppid ..., comm may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == server_pid and b"spawn_main" in cmdline:
+            pids.append(int(entry))
+    return sorted(pids) or [server_pid]
+
+
+def memory_mib(pid):
+    """rss, pss and private MiB of a process, from smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def start_server(args, workers, cpu_profile, directory):
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{directory}/workers.db",
+        "JOB_UPLOAD_DIR": os.path.join(directory, "job_uploads"),
+        "PROJECT_NAME": os.environ.get("PROJECT_NAME", "benchmark"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "WHISPER_MODEL_ID": args.model,
+        "CPU_PROFILE": cpu_profile,
+        # Every client waits for a worker rather than getting a 503
+        "INFERENCE_QUEUE_SIZE": str(workers * args.per_worker),
+    }
+    if args.stub_model:
+        env["INFERENCE_ENGINE"] = "stub"
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.serve",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+        ],
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_loaded(url, workers, process, timeout):
+    """Poll GET /model until every worker says its model is loaded"""
+    loaded = set()
+    deadline = time.monotonic() + timeout
+    while len(loaded) < workers:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{len(loaded)}/{workers} workers loaded")
+        # A new connection each time, so that it may reach another worker
+        try:
+            async with httpx.AsyncClient(base_url=url) as client:
+                response = await client.get("/api/v1/model")
+            stats = response.json()
+            if stats["loaded"]:
+                loaded.add(stats["pid"])
+        except (httpx.HTTPError, ValueError):
+            pass
+        await asyncio.sleep(0.05)
+
+
+async def measure(args, workers, cpu_profile, directory):
+    process, url = start_server(args, workers, cpu_profile, directory)
+    try:
+        await wait_until_loaded(url, workers, process, args.load_timeout)
+        uploads = [
+            synthetic_wav(args.audio_seconds, i) for i in range(args.requests)
+        ]
+        concurrency = workers * args.per_worker
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            result = await run(
+                client,
+                make_request("transcribe", args, uploads),
+                args.requests,
+                concurrency,
+            )
+        pids = worker_pids(process.pid)
+        memory = [memory_mib(pid) for pid in pids]
+        total_pss = sum(m["pss"] for m in memory)
+        if pids != [process.pid]:
+            total_pss += memory_mib(process.pid)["pss"]
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {
+        "workers": workers,
+        "cpu_profile": cpu_profile,
+        "concurrency": concurrency,
+        "requests": result["requests"],
+        "errors": result["errors"],
+        "files_per_second": result["requests_per_second"],
+        "p50_ms": result["p50_ms"],
+        "p99_ms": result["p99_ms"],
+        "rss_mib_per_worker": statistics.fmean(m["rss"] for m in memory),
+        "pss_mib_per_worker": statistics.fmean(m["pss"] for m in memory),
+        "private_mib_per_worker": statistics.fmean(
+            m["private"] for m in memory
+        ),
+        "total_pss_mib": total_pss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--cpu-profile", nargs="+", choices=("fp32", "int8"), default=["fp32"]
+    )
+    parser.add_argument("--model", default="openai/whisper-tiny")
+    parser.add_argument("--random-model", action="store_true")
+    parser.add_argument("--stub-model", action="store_true")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--per-worker", type=int, default=2)
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--load-timeout", type=float, default=600)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    rows = []
+    print(
+        f"{'workers':>7} {'profile':>7} {'errors':>6} {'files/s':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'rss MiB':>8} {'pss MiB':>8} "
+        f"{'priv MiB':>8} {'total pss':>9}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        if args.random_model:
+            os.makedirs(f"{directory}/model")
+            args.model = random_checkpoint(f"{directory}/model")
+        for cpu_profile in args.cpu_profile:
+            for workers in args.workers:
+                run_directory = f"{directory}/{cpu_profile}-{workers}"
+                os.makedirs(run_directory)
+                row = asyncio.run(
+                    measure(args, workers, cpu_profile, run_directory)
+                )
+                rows.append(row)
+                print(
+                    f"{workers:>7} {cpu_profile:>7} {row['errors']:>6} "
+                    f"{row['files_per_second']:>8.2f} "
+                    f"{row['p50_ms']:>8.0f} {row['p99_ms']:>8.0f} "
+                    f"{row['rss_mib_per_worker']:>8.0f} "
+                    f"{row['pss_mib_per_worker']:>8.0f} "
+                    f"{row['private_mib_per_worker']:>8.0f} "
+                    f"{row['total_pss_mib']:>9.0f}"
+                )
+
+    if args.json:
+        write_results(args.json, "workers", args, KEYS, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+# Settings are read when the app is first imported, so point it at a
+# throwaway database before any test module imports it, rather than at
+# the checked-in transcription.db
+_directory = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory.name}/test.db"
+os.environ.setdefault(
+    "JOB_UPLOAD_DIR", os.path.join(_directory.name, "job_uploads")
+)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Sessions on a fresh file database, which job workers, writer threads
+    and ingest can reach from their own connections and threads
+    """
+    from app.db.database import create_db_engine
+    from app.models.transcription import Base
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'session.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
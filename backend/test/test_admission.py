@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from app.core.admission import (
+    AudioRejectedError,
+    admit_audio,
+    scheduling_key,
+)
+from app.core.config import settings
+
+
+def _wav(tmp_path, seconds, rate=16000, channels=1):
+    path = str(tmp_path / "audio.wav")
+    sf.write(path, np.zeros((int(seconds * rate), channels)), rate)
+    return path
+
+
+def test_admit_audio_reads_the_header(tmp_path):
+    info = admit_audio(_wav(tmp_path, 2.5, rate=8000, channels=2))
+
+    assert info.duration == pytest.approx(2.5)
+    assert (info.channels, info.sampling_rate) == (2, 8000)
+    assert info.cost == pytest.approx(2.5)
+
+
+@pytest.mark.parametrize(
+    "setting, value, status_code",
+    [
+        ("AUDIO_MAX_SECONDS", 2, 413),
+        ("AUDIO_MAX_CHANNELS", 1, 422),
+        ("AUDIO_MAX_SAMPLE_RATE", 16000, 422),
+    ],
+)
+def test_admit_audio_rejects_over_limits(
+    tmp_path, monkeypatch, setting, value, status_code
+):
+    monkeypatch.setattr(settings, setting, value)
+    path = _wav(tmp_path, 3, rate=44100, channels=2)
+
+    with pytest.raises(AudioRejectedError) as exc_info:
+        admit_audio(path)
+
+    assert exc_info.value.status_code == status_code
+
+
+def test_admit_audio_rejects_unreadable_headers(tmp_path):
+    path = tmp_path / "broken.mp3"
+    path.write_bytes(b"not audio")
+
+    with pytest.raises(AudioRejectedError) as exc_info:
+        admit_audio(str(path))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_scheduling_key_ages_long_jobs():
+    # A 10 minute file queued 25s before a 5s clip still goes first
+    long_key = scheduling_key(0.0, 600, "sjf", aging=30)
+    assert long_key < scheduling_key(25.0, 5, "sjf", aging=30)
+    # but not when the clip arrives sooner
+    assert long_key > scheduling_key(10.0, 5, "sjf", aging=30)
+    assert scheduling_key(0.0, 600, "fifo") == 0.0
+    assert scheduling_key(3.0, None, "sjf") == 3.0
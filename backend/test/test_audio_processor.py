@@ -2,22 +2,34 @@ import os
 from io import BytesIO
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
-from audio_processor.transcriber import AudioTranscriber
+import soundfile as sf
+from audio_processor.decoding import DecodingOptions
+from audio_processor.metrics import StageObserver
+from audio_processor.transcriber import (
+    AudioTranscriber,
+    SegmentCollector,
+    merge_overlapping_texts,
+)
+from audio_processor.vad import SpeechTimeline
+from transformers import WhisperFeatureExtractor
 
 
 @pytest.fixture
 def mock_transformers():
     with (
-        patch("audio_processor.transcriber.WhisperProcessor") as mock_processor,  # noqa: E501
+        patch("audio_processor.engines.WhisperProcessor") as mock_processor,
         patch(
-            "audio_processor.transcriber.WhisperForConditionalGeneration"
+            "audio_processor.engines.WhisperForConditionalGeneration"
         ) as mock_model,
     ):
         # Setup mock processor
         processor_instance = Mock()
         processor_instance.from_pretrained.return_value = processor_instance
         processor_instance.return_value = processor_instance
+        # Features are computed from the real extractor's parameters
+        processor_instance.feature_extractor = WhisperFeatureExtractor()
         processor_instance.batch_decode.return_value = ["This is a test transcription"]  # noqa: E501
         mock_processor.from_pretrained.return_value = processor_instance
 
@@ -71,3 +83,257 @@ def test_process_audio_object_empty_file():
 
     result = transcriber.process_audio_object(empty_audio)
     assert result is None
+
+
+def test_merge_overlapping_texts_drops_repeated_words():
+    texts = [
+        " My name is Ethan. I was asked",
+        " I was asked to come here by 11.",
+        " by 11. Now it is already 3 p.m.",
+    ]
+    assert merge_overlapping_texts(texts) == (
+        "My name is Ethan. I was asked to come here by 11. "
+        "Now it is already 3 p.m."
+    )
+
+
+def test_merge_overlapping_texts_handles_cut_words():
+    assert merge_overlapping_texts(["a b c d fra", "c d e f"]) == "a b c d e f"
+    assert merge_overlapping_texts(["one two", "three four"]) == (
+        "one two three four"
+    )
+
+
+def test_iter_windows_overlap(mock_transformers):
+    transcriber = AudioTranscriber()
+    audio = np.zeros(70 * 16000, dtype=np.float32)
+
+    windows = list(transcriber.iter_windows(audio))
+
+    # 0-30s, 25-55s, 50-70s
+    assert [len(w) for w in windows] == [480000, 480000, 320000]
+    assert all(np.shares_memory(w, audio) for w in windows)
+
+
+def test_transcribe_long_audio_in_batched_windows(mock_transformers):
+    mock_processor, mock_model = mock_transformers
+    processor = mock_processor.from_pretrained.return_value
+    transcriber = AudioTranscriber()
+    transcriber.chunk_batch_size = 2
+    batches = []
+    extract = transcriber.engine.features
+
+    def features(audio):
+        batches.append(len(audio))
+        return extract(audio)
+
+    transcriber.engine.features = features
+    processor.batch_decode.side_effect = [
+        ["one two three four", "three four five six"],
+        ["five six seven"],
+    ]
+
+    result = transcriber.transcribe(np.zeros(70 * 16000, dtype=np.float32))
+
+    assert batches == [2, 1]
+    assert result == "one two three four five six seven"
+
+
+def test_iter_transcribe_yields_transcript_per_window(
+    mock_transformers, tmp_path
+):
+    mock_processor, _ = mock_transformers
+    processor = mock_processor.from_pretrained.return_value
+    processor.batch_decode.side_effect = [
+        ["one two three four"],
+        ["three four five six"],
+        ["five six seven"],
+    ]
+    path = tmp_path / "long.wav"
+    sf.write(path, np.zeros(70 * 16000, dtype=np.float32), 16000)
+    transcriber = AudioTranscriber()
+
+    partials = list(transcriber.iter_transcribe(str(path), batch_size=1))
+
+    assert partials == [
+        "one two three four",
+        "one two three four five six",
+        "one two three four five six seven",
+    ]
+
+
+class RecordingObserver(StageObserver):
+    def __init__(self):
+        self.stages = []
+        self.files = []
+
+    def observe_stage(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+    def observe_audio(self, audio_seconds, seconds):
+        self.files.append((audio_seconds, seconds))
+
+
+def test_enable_metrics_reports_every_stage(mock_transformers, tmp_path):
+    path = tmp_path / "long.wav"
+    sf.write(path, np.zeros(70 * 44100, dtype=np.float32), 44100)
+    transcriber = AudioTranscriber()
+    transcriber.chunk_batch_size = 2
+    observer = RecordingObserver()
+    transcriber.enable_metrics(observer)
+
+    transcriber.transcribe_stream(str(path))
+
+    stages = [stage for stage, _ in observer.stages]
+    assert sorted(set(stages)) == [
+        "decode",
+        "detokenize",
+        "features",
+        "generate",
+        "resample",
+    ]
+    # Per batch of two windows, per file for decoding and resampling
+    assert stages.count("generate") == 2 and stages.count("decode") == 1
+    [(audio_seconds, seconds)] = observer.files
+    assert audio_seconds == pytest.approx(70) and seconds > 0
+
+
+def test_transcribe_with_vad_skips_silence(mock_transformers):
+    mock_processor, mock_model = mock_transformers
+    processor = mock_processor.from_pretrained.return_value
+    windows = []
+    processor.batch_decode.return_value = ["hello"]
+    transcriber = AudioTranscriber()
+    transcriber.enable_vad()
+    extract = transcriber.engine.features
+
+    def features(audio):
+        windows.extend(len(a) for a in audio)
+        return extract(audio)
+
+    transcriber.engine.features = features
+
+    assert transcriber.transcribe(np.zeros(70 * 16000, dtype=np.float32)) == ""  # noqa: E501
+    assert windows == []
+
+    t = np.arange(2 * 16000) / 16000
+    voice = sum(np.sin(2 * np.pi * f * t) for f in (300, 600, 900, 1200))
+    audio = np.concatenate(
+        [np.zeros(60 * 16000), 0.1 * voice, np.zeros(60 * 16000)]
+    ).astype(np.float32)
+
+    assert transcriber.transcribe(audio) == "hello"
+    # One window holding the 2s of speech and its padding, not 122s of audio
+    assert len(windows) == 1 and windows[0] < 4 * 16000
+    stats = transcriber.vad_stats()
+    assert stats["audio_seconds"] == 192
+    assert stats["skipped_fraction"] > 0.95
+
+
+def test_decoding_options_reach_generate(mock_transformers):
+    mock_processor, mock_model = mock_transformers
+    model = mock_model.from_pretrained.return_value
+    transcriber = AudioTranscriber()
+    transcriber.chunk_batch_size = 2
+    decoding = DecodingOptions(language="en", max_tokens_per_second=8)
+
+    transcriber.transcribe(np.zeros(70 * 16000, dtype=np.float32), decoding)
+
+    # The 30s windows get the full budget, the 20s remainder a smaller one
+    calls = model.generate.call_args_list
+    assert [c.kwargs for c in calls] == [
+        {"language": "en", "max_new_tokens": 256},
+        {"language": "en", "max_new_tokens": 176},
+    ]
+
+
+def test_segment_collector_splits_overlaps_at_the_middle():
+    collector = SegmentCollector(25, 5, 16000)
+
+    collector.add(
+        [(0, 10, " a"), (10, 24, " b"), (24, 29.5, " c"), (28, None, " d")], 30
+    )
+    # Starts 26s in, before the 27.5s cut, so window 0's copy is kept
+    collector.add([(1, 3, " c"), (3, 8, " d"), (8, None, " e")], 20)
+
+    assert collector.segments == [
+        {"start": 0, "end": 10, "text": "a"},
+        {"start": 10, "end": 24, "text": "b"},
+        {"start": 24, "end": 28, "text": "c"},
+        {"start": 28, "end": 33, "text": "d"},
+        {"start": 33, "end": 45, "text": "e"},
+    ]
+
+
+def test_segment_collector_maps_times_around_cut_silence():
+    # Speech at 0-2s and 10-13s of the original audio
+    timeline = SpeechTimeline()
+    timeline.add(0, 2 * 16000)
+    timeline.add(10 * 16000, 3 * 16000)
+    collector = SegmentCollector(25, 5, 16000, timeline)
+
+    collector.add([(0, 1.5, "x"), (1.5, 3, "y"), (3, None, "z")], 5)
+
+    assert collector.segments == [
+        {"start": 0, "end": 1.5, "text": "x"},
+        {"start": 1.5, "end": 11, "text": "y"},
+        {"start": 11, "end": 13, "text": "z"},
+    ]
+
+
+def test_transcribe_files_batches_windows_across_files(tmp_path):
+    transcriber = AudioTranscriber(engine="stub")
+    transcriber.decoding = DecodingOptions(timestamps=True)
+    batches = []
+    generate = transcriber.engine.generate_batch
+
+    def generate_batch(features, **kwargs):
+        batches.append(len(features))
+        return generate(features, **kwargs)
+
+    transcriber.engine.generate_batch = generate_batch
+    paths = []
+    for name, seconds in (("long.wav", 70), ("short.wav", 10)):
+        paths.append(str(tmp_path / name))
+        sf.write(paths[-1], np.zeros(seconds * 16000, np.float32), 16000)
+    broken = tmp_path / "broken.mp3"
+    broken.write_bytes(b"not audio")
+    paths.insert(1, str(broken))
+
+    long, failed, short = transcriber.transcribe_files(paths)
+
+    # Three windows of the long file and one of the short in one call
+    assert batches == [4]
+    assert long[0] == short[0] == "stub transcription"
+    assert long[1] and long[1][0]["start"] == 0.0
+    assert isinstance(failed, Exception)
+
+
+def test_transcribe_files_generates_before_decoding_every_file(tmp_path):
+    transcriber = AudioTranscriber(engine="stub")
+    transcriber.chunk_batch_size = 1
+    events = []
+    generate = transcriber.engine.generate_batch
+    file_features = transcriber.file_features
+
+    def generate_batch(features, **kwargs):
+        events.append("generate")
+        return generate(features, **kwargs)
+
+    def record_decode(audio_file, *args):
+        events.append(audio_file)
+        return file_features(audio_file, *args)
+
+    transcriber.engine.generate_batch = generate_batch
+    transcriber.file_features = record_decode
+    paths = []
+    for name in ("a.wav", "b.wav", "c.wav"):
+        paths.append(str(tmp_path / name))
+        sf.write(paths[-1], np.zeros(10 * 16000, np.float32), 16000)
+
+    results = transcriber.transcribe_files(paths, decode_workers=1)
+
+    assert [text for text, _ in results] == ["stub transcription"] * 3
+    # Each file is decoded only once the one before it is generated
+    a, b, c = paths
+    assert events == [a, "generate", b, "generate", c, "generate"]
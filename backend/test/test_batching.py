@@ -0,0 +1,142 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import torch
+from audio_processor.batching import MicroBatcher
+
+
+def _features(value, n=1):
+    return torch.full((n, 80, 3000), float(value))
+
+
+def _fake_generate(calls):
+    def generate(features):
+        calls.append(len(features))
+        return [f"text {int(row[0, 0])}" for row in features]
+
+    return generate
+
+
+def test_single_request_is_not_delayed_past_max_wait():
+    calls = []
+    batcher = MicroBatcher(
+        _fake_generate(calls), max_batch_size=4, max_wait_ms=5
+    )
+    try:
+        assert batcher.generate(_features(3)) == ["text 3"]
+    finally:
+        batcher.close()
+    assert calls == [1]
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+    gate = threading.Event()
+
+    def generate(features):
+        gate.wait(5)
+        return _fake_generate(calls)(features)
+
+    batcher = MicroBatcher(generate, max_batch_size=4, max_wait_ms=200)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(batcher.generate, _features(i)) for i in range(4)
+            ]
+            gate.set()
+            results = [f.result() for f in futures]
+    finally:
+        batcher.close()
+
+    # Every caller gets back its own text
+    assert results == [[f"text {i}"] for i in range(4)]
+    assert calls == [4]
+    assert batcher.stats()["mean_batch_size"] == 4
+
+
+def test_multi_window_request_is_split_back():
+    calls = []
+    batcher = MicroBatcher(
+        _fake_generate(calls), max_batch_size=8, max_wait_ms=50
+    )
+    try:
+        first = batcher.submit(_features(1, n=3))
+        second = batcher.submit(_features(2, n=2))
+        assert first.result() == ["text 1"] * 3
+        assert second.result() == ["text 2"] * 2
+    finally:
+        batcher.close()
+    assert sum(calls) == 5
+
+
+def test_generate_error_reaches_every_caller():
+    def generate(features):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(generate, max_batch_size=2, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            batcher.generate(_features(0))
+    finally:
+        batcher.close()
+
+
+def test_submit_after_close_fails():
+    batcher = MicroBatcher(_fake_generate([]))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(_features(0))
+
+
+def test_requests_with_different_options_are_batched_apart():
+    calls = []
+
+    def generate(features, **kwargs):
+        calls.append((len(features), kwargs))
+        return [f"text {int(row[0, 0])}" for row in features]
+
+    batcher = MicroBatcher(generate, max_batch_size=8, max_wait_ms=50)
+    try:
+        futures = [
+            batcher.submit(_features(1)),
+            batcher.submit(_features(2), language="en"),
+            batcher.submit(_features(3)),
+            batcher.submit(_features(4), language="en"),
+        ]
+        results = [f.result() for f in futures]
+    finally:
+        batcher.close()
+
+    assert results == [[f"text {i}"] for i in range(1, 5)]
+    assert sorted(calls, key=lambda c: len(c[1])) == [
+        (2, {}),
+        (2, {"language": "en"}),
+    ]
+
+
+def test_token_budgets_share_a_batch_at_the_largest():
+    calls = []
+
+    def generate(features, **kwargs):
+        calls.append((len(features), kwargs))
+        return [f"text {int(row[0, 0])}" for row in features]
+
+    batcher = MicroBatcher(generate, max_batch_size=8, max_wait_ms=50)
+    try:
+        futures = [
+            batcher.submit(_features(1), max_new_tokens=20),
+            batcher.submit(_features(2), max_new_tokens=256),
+            batcher.submit(_features(3), max_new_tokens=41),
+            batcher.submit(_features(4)),
+        ]
+        results = [f.result() for f in futures]
+    finally:
+        batcher.close()
+
+    assert results == [[f"text {i}"] for i in range(1, 5)]
+    # Uncapped requests are not held to another request's budget
+    assert sorted(calls, key=lambda c: len(c[1])) == [
+        (1, {}),
+        (3, {"max_new_tokens": 256}),
+    ]
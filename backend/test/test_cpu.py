@@ -0,0 +1,48 @@
+import pytest
+import torch
+from audio_processor.cpu import configure_threads, optimise_for_cpu
+
+
+class TinyModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(8, 4)
+
+    def forward(self, x):
+        return self.proj(x)
+
+
+def test_int8_profile_quantises_linear_layers():
+    model = TinyModel()
+    x = torch.randn(2, 8)
+    expected = model(x)
+
+    quantised = optimise_for_cpu(model, "int8")
+
+    assert isinstance(
+        quantised.proj, torch.ao.nn.quantized.dynamic.Linear
+    )
+    assert not quantised.training
+    torch.testing.assert_close(quantised(x), expected, atol=0.05, rtol=0.05)
+
+
+def test_fp32_profile_keeps_weights():
+    model = TinyModel()
+    assert optimise_for_cpu(model, "fp32").proj is model.proj
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        optimise_for_cpu(TinyModel(), "fp16")
+
+
+def test_configure_threads():
+    threads = torch.get_num_threads()
+    try:
+        configure_threads(intra_op_threads=1)
+        assert torch.get_num_threads() == 1
+        # 0 leaves the setting alone
+        configure_threads()
+        assert torch.get_num_threads() == 1
+    finally:
+        torch.set_num_threads(threads)
@@ -1,7 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from app.api.routes.transcription import _get_unique_filename
+from app.crud import (
+    add_transcriptions,
+    get_segments,
+    get_unique_filename,
+    get_unique_filenames,
+    locate_segments,
+    save_transcription,
+)
+from app.db.migrations import run_migrations
 from app.models.transcription import Base, Transcription
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -79,11 +89,11 @@ def test_search_transcription(db_session):
 
 
 def test_duplicate_filename_handling(db_session):
-    # Test the _get_unique_filename function directly
+    # Test the get_unique_filename function directly
     filename = "test.mp3"
 
     # First call should return original filename
-    result1 = _get_unique_filename(db_session, filename)
+    result1 = get_unique_filename(db_session, filename)
     assert result1 == filename
 
     # Create a transcription with the original filename
@@ -94,7 +104,7 @@ def test_duplicate_filename_handling(db_session):
     db_session.commit()
 
     # Second call should return modified filename
-    result2 = _get_unique_filename(db_session, filename)
+    result2 = get_unique_filename(db_session, filename)
     assert result2 == "test_1.mp3"
 
     # Create another transcription with the modified filename
@@ -105,5 +115,187 @@ def test_duplicate_filename_handling(db_session):
     db_session.commit()
 
     # Third call should return another modified filename
-    result3 = _get_unique_filename(db_session, filename)
+    result3 = get_unique_filename(db_session, filename)
     assert result3 == "test_2.mp3"
+
+
+def test_save_transcription_skips_names_already_taken(db_session):
+    save_transcription(db_session, "audio_1.mp3", "literal name")
+    first = save_transcription(db_session, "audio.mp3", "first")
+    second = save_transcription(db_session, "audio.mp3", "second")
+
+    assert first.filename == "audio.mp3"
+    # audio_1.mp3 is taken by an upload of that name
+    assert second.filename == "audio_2.mp3"
+
+
+def test_concurrent_uploads_get_distinct_names(tmp_path):
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'names.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=file_engine)
+    make_session = sessionmaker(bind=file_engine)
+
+    def upload(_):
+        db = make_session()
+        try:
+            return save_transcription(db, "same.mp3", "text").filename
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        names = list(pool.map(upload, range(40)))
+
+    assert len(set(names)) == 40
+    assert "same.mp3" in names and "same_39.mp3" in names
+    file_engine.dispose()
+
+
+def test_migration_seeds_filename_counters(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE transcription (id INTEGER PRIMARY KEY, "
+                "filename VARCHAR(255), transcription_content TEXT, "
+                "created_at DATETIME)"
+            )
+        )
+        # Names given out by the LIKE-based allocator
+        names = ("talk.mp3", "talk_1.mp3", "talk_2.mp3", "notes.mp3")
+        for name in names + ("take_2023.mp3",):
+            conn.execute(
+                text(
+                    "INSERT INTO transcription (filename, transcription_content) "  # noqa: E501
+                    "VALUES (:name, '')"
+                ),
+                {"name": name},
+            )
+
+    run_migrations(old)
+    run_migrations(old)
+
+    db = sessionmaker(bind=old)()
+    assert get_unique_filename(db, "talk.mp3") == "talk_3.mp3"
+    assert get_unique_filename(db, "notes.mp3") == "notes_1.mp3"
+    assert get_unique_filename(db, "new.mp3") == "new.mp3"
+    # A suffix alone does not make a copy of a name never stored
+    assert get_unique_filename(db, "take.mp3") == "take.mp3"
+    db.close()
+    assert any(
+        index["unique"] and index["column_names"] == ["filename"]
+        for index in inspect(old).get_indexes("transcription")
+    )
+    old.dispose()
+
+
+def test_get_unique_filenames_reserves_a_batch_at_once(db_session):
+    save_transcription(db_session, "talk.mp3", "text")
+
+    names = get_unique_filenames(
+        db_session, ["talk.mp3", "new.mp3", "talk.mp3", "new.mp3"]
+    )
+
+    assert names == ["talk_1.mp3", "new.mp3", "talk_2.mp3", "new_1.mp3"]
+    # The counters carry on where the batch left them
+    assert get_unique_filename(db_session, "new.mp3") == "new_2.mp3"
+
+
+def test_add_transcriptions_with_a_taken_numbered_name(db_session):
+    save_transcription(db_session, "talk.mp3", "text")
+    save_transcription(db_session, "talk_1.mp3", "text")
+
+    rows = add_transcriptions(
+        db_session,
+        [
+            ("talk.mp3", "one", "hash", [SEGMENTS[0]]),
+            ("other.mp3", "two", None, None),
+        ],
+    )
+    db_session.commit()
+
+    assert [row.filename for row in rows] == ["talk_2.mp3", "other.mp3"]
+    assert len(get_segments(db_session, rows[0].id)) == 1
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": "Welcome to the quarterly review."},
+    {"start": 4.0, "end": 9.5, "text": "Revenue grew in every region."},
+    # Spans a long pause cut out by the VAD
+    {"start": 9.5, "end": 60.0, "text": "Next, the hiring plan for review."},
+    {"start": 60.0, "end": 64.0, "text": "Thanks, everyone."},
+]
+
+
+def test_get_segments_by_time_range(db_session):
+    transcription = save_transcription(
+        db_session, "review.mp3", "text", segments=SEGMENTS
+    )
+    save_transcription(db_session, "other.mp3", "other", segments=SEGMENTS)
+
+    def texts(start, end=None):
+        return [
+            s.text[:4]
+            for s in get_segments(db_session, transcription.id, start, end)
+        ]
+
+    assert texts(0) == ["Welc", "Reve", "Next", "Than"]
+    assert texts(5, 9.5) == ["Reve"]
+    assert texts(45, 61) == ["Next", "Than"]
+    assert texts(64) == []
+
+
+def test_locate_segments_ranks_by_words_matched(db_session):
+    transcription = save_transcription(
+        db_session, "review.mp3", "text", segments=SEGMENTS
+    )
+
+    matches = locate_segments(db_session, transcription.id, "review plan")
+    assert [(s.start, matched) for s, matched in matches] == [
+        (9.5, 2),
+        (0.0, 1),
+    ]
+    matches = locate_segments(db_session, transcription.id, "rev")
+    assert [s.start for s, _ in matches] == [0.0, 4.0, 9.5]
+    assert locate_segments(db_session, transcription.id, "rev", False) == []
+
+
+def test_locate_segments_tokenises_as_search(db_session):
+    cafe = save_transcription(
+        db_session,
+        "cafe.mp3",
+        "text",
+        segments=[{"start": 0.0, "end": 2.0, "text": "Meet at the Café."}],
+    )
+    other = save_transcription(
+        db_session, "other.mp3", "text", segments=SEGMENTS
+    )
+
+    # unicode61 folds the accent away, as /search does
+    [(segment, matched)] = locate_segments(db_session, cafe.id, "cafe")
+    assert (segment.text, matched) == ("Meet at the Café.", 1)
+    # Only the transcription's own segments are matched
+    assert locate_segments(db_session, cafe.id, "review") == []
+    assert len(locate_segments(db_session, other.id, "review")) == 2
+
+
+def test_migration_indexes_existing_segments(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=old)
+    db = sessionmaker(bind=old)()
+    transcription = save_transcription(
+        db, "review.mp3", "text", segments=SEGMENTS
+    )
+    db.close()
+    # As a database from before the segment index
+    with old.begin() as conn:
+        conn.execute(text("DROP TABLE transcription_segment_fts"))
+
+    run_migrations(old)
+
+    db = sessionmaker(bind=old)()
+    matches = locate_segments(db, transcription.id, "review")
+    assert [s.start for s, _ in matches] == [0.0, 9.5]
+    db.close()
+    old.dispose()
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+from app.crud import add_transcription
+from app.db.database import create_db_engine, sqlite_pragmas
+from app.db.writer import GroupCommitWriter
+from app.models.transcription import Base, Transcription
+from sqlalchemy import text
+
+
+def test_engine_applies_pragmas(session_factory):
+    db = session_factory()
+    assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    # NORMAL
+    assert db.execute(text("PRAGMA synchronous")).scalar() == 1
+    assert db.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    db.close()
+    assert "PRAGMA cache_size=-1024" in sqlite_pragmas(cache_size_kib=1024)
+
+
+def test_memory_engine_shares_one_connection():
+    engine = create_db_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM transcription")).scalar() == 0  # noqa: E501
+    engine.dispose()
+
+
+def test_concurrent_writes_share_a_commit(session_factory):
+    writer = GroupCommitWriter(
+        session_factory, max_batch_size=16, max_wait_ms=200
+    )
+    # Hold the writer until every write is queued
+    gate = threading.Event()
+    writer.submit(lambda db: gate.wait())
+    futures = [
+        writer.submit(add_transcription, "same.mp3", f"text {i}")
+        for i in range(10)
+    ]
+    gate.set()
+    results = [future.result(timeout=10) for future in futures]
+    writer.close()
+
+    assert len({t.filename for t in results}) == 10
+    # Committed rows stay readable after the writer's session closed
+    assert results[0].created_at is not None
+    assert writer.writes == 11
+    assert writer.batches <= 2
+    db = session_factory()
+    assert db.query(Transcription).count() == 10
+    db.close()
+
+
+def test_failed_write_does_not_fail_the_batch(session_factory):
+    writer = GroupCommitWriter(session_factory, max_wait_ms=100)
+
+    def broken(db):
+        db.add(Transcription(filename="broken.mp3", transcription_content="x"))  # noqa: E501
+        raise RuntimeError("boom")
+
+    bad = writer.submit(broken)
+    good = writer.submit(add_transcription, "good.mp3", "fine")
+    assert good.result(timeout=10).filename == "good.mp3"
+    with pytest.raises(RuntimeError):
+        bad.result(timeout=10)
+    writer.close()
+
+    db = session_factory()
+    assert [t.filename for t in db.query(Transcription)] == ["good.mp3"]
+    db.close()
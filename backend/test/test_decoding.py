@@ -0,0 +1,50 @@
+import pytest
+from audio_processor.decoding import MAX_NEW_TOKENS, DecodingOptions
+
+
+def test_defaults_leave_generate_alone():
+    assert DecodingOptions().generate_kwargs(30) == {}
+
+
+def test_token_budget_follows_duration():
+    options = DecodingOptions(max_tokens_per_second=8)
+
+    assert options.generate_kwargs(30) == {"max_new_tokens": 256}
+    assert options.max_new_tokens(2.5) == 36
+    assert DecodingOptions(max_tokens_per_second=100).max_new_tokens(30) == (
+        MAX_NEW_TOKENS
+    )
+
+
+def test_profile_and_request_overrides():
+    deployment = DecodingOptions(language="English", max_tokens_per_second=8)
+    assert deployment.language == "en"
+
+    options = deployment.override(profile="accurate", beam_size=3, task=None)
+
+    assert options == DecodingOptions(
+        beam_size=3,
+        language="en",
+        temperature_fallback=True,
+        max_tokens_per_second=8,
+    )
+    kwargs = options.generate_kwargs(10)
+    assert kwargs["num_beams"] == 3
+    assert kwargs["language"] == "en"
+    assert kwargs["temperature"][0] == 0.0
+    assert kwargs["max_new_tokens"] == 96
+    assert options.cache_params() != deployment.cache_params()
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"language": "klingon"},
+        {"task": "summarise"},
+        {"beam_size": 0},
+        {"profile": "fastest"},
+    ],
+)
+def test_invalid_options(fields):
+    with pytest.raises(ValueError):
+        DecodingOptions().override(**fields)
@@ -0,0 +1,239 @@
+import numpy as np
+import pytest
+import torch
+from audio_processor.cpu import file_backed_bytes
+from audio_processor.engines import create_engine
+from transformers import (
+    GenerationConfig,
+    WhisperConfig,
+    WhisperFeatureExtractor,
+    WhisperForConditionalGeneration,
+)
+
+START, EOS, ENGLISH, GERMAN, TRANSCRIBE, NO_TIMESTAMPS = 1, 2, 10, 11, 20, 30
+
+
+@pytest.fixture(scope="module")
+def tiny_checkpoint(tmp_path_factory):
+    # A randomly initialised two-layer Whisper, small enough to export and
+    # run in a test, with the multilingual prompt tokens of the real models
+    torch.manual_seed(0)
+    config = WhisperConfig(
+        vocab_size=64,
+        d_model=32,
+        encoder_layers=1,
+        decoder_layers=2,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=64,
+        decoder_ffn_dim=64,
+        max_target_positions=64,
+        decoder_start_token_id=START,
+        eos_token_id=EOS,
+        pad_token_id=EOS,
+        bos_token_id=EOS,
+    )
+    model = WhisperForConditionalGeneration(config)
+    model.generation_config = GenerationConfig(
+        decoder_start_token_id=START,
+        eos_token_id=EOS,
+        max_length=24,
+        lang_to_id={"<|en|>": ENGLISH, "<|de|>": GERMAN},
+        task_to_id={"transcribe": TRANSCRIBE, "translate": 21},
+        no_timestamps_token_id=NO_TIMESTAMPS,
+        suppress_tokens=[40, 41],
+        begin_suppress_tokens=[EOS],
+    )
+    path = tmp_path_factory.mktemp("tiny-whisper")
+    model.save_pretrained(path)
+    return str(path)
+
+
+class _Processor(WhisperFeatureExtractor):
+    """Whisper's feature extractor, with each token id decoding to itself"""
+
+    def decode(self, ids, skip_special_tokens=False):
+        return " ".join(map(str, ids))
+
+
+@pytest.fixture(scope="module", params=["transformers", "onnx"])
+def engine(request, tiny_checkpoint, tmp_path_factory):
+    if request.param == "onnx":
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("optimum.exporters.onnx")
+    return create_engine(
+        request.param,
+        tiny_checkpoint,
+        onnx_model_dir=str(tmp_path_factory.mktemp("onnx")),
+        processor=_Processor(),
+    )
+
+
+def _audio(seconds, seed):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * 16000)) * 0.1).astype(
+        np.float32
+    )
+
+
+def test_features_are_padded_log_mel_windows(engine):
+    features = engine.features([_audio(3, 0), _audio(30, 1)])
+
+    assert tuple(features.shape) == (2, 80, 3000)
+
+
+def test_cached_decoding_matches_full_decoding(engine):
+    states = engine.encode(engine.features([_audio(5, 0), _audio(5, 1)]))
+    ids = np.array([[START, ENGLISH, TRANSCRIBE, 5, 6]] * 2, dtype=np.int64)
+
+    full, _ = engine.decode(states, ids)
+    logits, cache = engine.decode(states, ids[:, :3])
+    for step in range(3, ids.shape[1]):
+        logits, cache = engine.decode(states, ids[:, step : step + 1], cache)
+
+    np.testing.assert_allclose(logits, full, rtol=1e-4, atol=1e-4)
+
+
+def test_generate_ids_follows_whisper_prompt(engine):
+    ids = engine.generate_ids(engine.features([_audio(5, 0), _audio(9, 1)]))
+
+    assert ids.shape[0] == 2 and ids.shape[1] <= 24
+    assert (ids[:, 0] == START).all()
+    assert set(ids[:, 1]) <= {ENGLISH, GERMAN}
+    assert (ids[:, 2:4] == [TRANSCRIBE, NO_TIMESTAMPS]).all()
+    # Suppressed tokens never come out, end-of-text is not the first one
+    assert not np.isin(ids[:, 4:], [40, 41]).any()
+    assert (ids[:, 4] != EOS).all()
+    for row in ids:
+        ended = np.flatnonzero(row == EOS)
+        if len(ended):
+            assert (row[ended[0] :] == EOS).all()
+
+
+def test_batched_generation_matches_one_by_one(engine):
+    audio = [_audio(5, 0), _audio(9, 1), _audio(2, 2)]
+
+    batched = engine.generate_ids(engine.features(audio))
+
+    for row, clip in zip(batched, audio):
+        single = engine.generate_ids(engine.features([clip]))[0]
+        np.testing.assert_array_equal(row[: len(single)], single)
+        assert (row[len(single) :] == EOS).all()
+
+
+def test_onnx_engine_matches_transformers(tiny_checkpoint, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.exporters.onnx")
+    engines = [
+        create_engine(
+            name,
+            tiny_checkpoint,
+            onnx_model_dir=str(tmp_path),
+            processor=WhisperFeatureExtractor(),
+        )
+        for name in ("transformers", "onnx")
+    ]
+    audio = [_audio(5, 0), _audio(9, 1)]
+
+    reference, onnx = (e.encode(e.features(audio)) for e in engines)
+    np.testing.assert_allclose(onnx, reference.numpy(), rtol=1e-3, atol=1e-4)
+    reference, onnx = (e.generate_ids(e.features(audio)) for e in engines)
+    np.testing.assert_array_equal(onnx, reference)
+
+
+@pytest.mark.parametrize("cpu_profile", ["fp32", "int8"])
+def test_fp32_weights_stay_memory_mapped(tiny_checkpoint, cpu_profile):
+    engine = create_engine(
+        "transformers",
+        tiny_checkpoint,
+        cpu_profile=cpu_profile,
+        processor=_Processor(),
+    )
+    if engine.device != "cpu" or file_backed_bytes(engine.model) is None:
+        pytest.skip("Needs /proc/self/maps and the CPU")
+
+    shared = file_backed_bytes(engine.model)
+    tensors = list(engine.model.parameters()) + list(engine.model.buffers())
+    total = sum(t.numel() * t.element_size() for t in tensors)
+
+    # fp32 weights are the checkpoint's pages, shared between processes;
+    # int8 quantises a copy in each process's own memory
+    assert shared == (total if cpu_profile == "fp32" else 0)
+
+
+def test_unknown_engine(tiny_checkpoint):
+    with pytest.raises(ValueError):
+        create_engine("tensorrt", tiny_checkpoint)
+
+
+def test_forced_language_task_and_token_budget(engine):
+    features = engine.features([_audio(5, 0), _audio(9, 1)])
+
+    ids = engine.generate_ids(
+        features, language="de", task="translate", max_new_tokens=3
+    )
+
+    assert (ids[:, 1:3] == [GERMAN, 21]).all()
+    assert ids.shape[1] <= 4 + 3
+    with pytest.raises(ValueError):
+        engine.generate_ids(features, num_beams=2)
+
+
+def test_timestamp_decoding_pairs_rising_timestamps(engine):
+    begin = NO_TIMESTAMPS + 1
+    features = engine.features([_audio(5, 0), _audio(9, 1)])
+
+    ids = engine.generate_ids(features, timestamps=True)
+
+    assert not (ids == NO_TIMESTAMPS).any()
+    # Generation opens with a timestamp right after the task
+    assert (ids[:, 3] >= begin).all()
+    for row in ids:
+        ended = np.flatnonzero(row == EOS)
+        row = row[3 : ended[0] if len(ended) else None]
+        is_stamp = row >= begin
+        assert (np.diff(row[is_stamp]) >= 0).all()
+        # Text between timestamps, never three timestamps in a row: one
+        # closing a segment and one opening the next at most
+        assert not (is_stamp[:-2] & is_stamp[1:-1] & is_stamp[2:]).any()
+
+
+def test_split_segments(tiny_checkpoint):
+    engine = create_engine(
+        "transformers", tiny_checkpoint, processor=_Processor()
+    )
+    begin = NO_TIMESTAMPS + 1
+    ids = [
+        [START, ENGLISH, TRANSCRIBE, begin, 5, 6, begin + 5, begin + 5, 7]
+        + [begin + 9, EOS, 8],
+        [START, ENGLISH, TRANSCRIBE, begin + 2, 5, begin + 4, begin + 4, 6]
+        + [EOS] * 4,
+    ]
+
+    assert engine.split_segments(ids) == [
+        [(0.0, 0.1, "5 6"), (0.1, 0.18, "7")],
+        [(0.04, 0.08, "5"), (0.08, None, "6")],
+    ]
+
+
+def test_generate_batch_returns_segments(engine):
+    features = engine.features([_audio(5, 0), _audio(9, 1)])
+
+    rows = engine.generate_batch(features, return_timestamps=True)
+
+    assert len(rows) == 2
+    for segments in rows:
+        for start, end, text in segments:
+            assert start >= 0 and (end is None or end >= start)
+            assert text.strip()
+
+
+def test_stub_engine_needs_no_model():
+    engine = create_engine("stub", "no/such-model")
+    features = engine.features([_audio(3, 0), _audio(5, 1)])
+
+    assert features.shape == (2, 80, 3000)
+    assert engine.generate_batch(features) == [engine.STUB_TEXT] * 2
+    assert engine.generate_batch(features, return_timestamps=True) == [
+        [(0.0, None, engine.STUB_TEXT)]
+    ] * 2
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+from app.core.executor import InferenceExecutor, QueueFullError
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_and_timings():
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    try:
+        result, waited, ran = await executor.run(sum, [1, 2, 3])
+    finally:
+        executor.shutdown()
+
+    assert result == 6
+    assert waited >= 0
+    assert ran >= 0
+    stats = executor.stats()
+    assert stats["run"]["count"] == 1
+    assert stats["queue_wait"]["count"] == 1
+    assert stats["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_block_event_loop():
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        job = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        # The loop is still free while the worker is blocked
+        assert executor.running == 1
+        release.set()
+        result, _, _ = await job
+    finally:
+        executor.shutdown()
+
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_run_rejects_when_queue_full():
+    executor = InferenceExecutor(max_workers=1, max_queue=1, retry_after=3)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(executor.run(release.wait, 5))
+        queued = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        assert executor.queued == 1
+
+        with pytest.raises(QueueFullError) as exc_info:
+            await executor.run(release.wait, 5)
+
+        release.set()
+        await asyncio.gather(running, queued)
+    finally:
+        executor.shutdown()
+
+    assert exc_info.value.retry_after >= 3
+    assert executor.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiting_jobs_run_shortest_first():
+    executor = InferenceExecutor(max_workers=1, max_queue=4, scheduler="sjf")
+    release = threading.Event()
+    order = []
+    try:
+        running = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        waiting = [
+            asyncio.create_task(executor.run(order.append, name, cost=cost))
+            for name, cost in (("long", 3600), ("medium", 60), ("short", 5))
+        ]
+        await asyncio.sleep(0.05)
+        assert executor.queued == 3
+
+        release.set()
+        await asyncio.gather(running, *waiting)
+    finally:
+        executor.shutdown()
+
+    assert order == ["short", "medium", "long"]
+    assert executor.stats()["scheduler"] == "sjf"
+
+
+@pytest.mark.asyncio
+async def test_fifo_ignores_cost_and_cancelled_jobs_give_way():
+    executor = InferenceExecutor(max_workers=1, max_queue=4)
+    release = threading.Event()
+    order = []
+    try:
+        running = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        first = asyncio.create_task(executor.run(order.append, 1, cost=60))
+        gone = asyncio.create_task(executor.run(order.append, 2, cost=5))
+        last = asyncio.create_task(executor.run(order.append, 3, cost=5))
+        await asyncio.sleep(0.05)
+        gone.cancel()
+
+        release.set()
+        await asyncio.gather(running, first, last)
+    finally:
+        executor.shutdown()
+
+    assert order == [1, 3]
+    assert executor.pending == 0
+
+
+def _count_to(n):
+    yield from range(n)
+
+
+@pytest.mark.asyncio
+async def test_stream_runs_generator_in_a_worker_process():
+    executor = InferenceExecutor(kind="process", max_workers=1)
+    try:
+        items = [item async for item in executor.stream(_count_to, 3)]
+        assert items == [0, 1, 2]
+        assert executor.run_time.count == 1
+        assert executor.pending == 0
+    finally:
+        executor.shutdown()
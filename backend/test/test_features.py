@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_processor.features import (
+    FeatureCache,
+    FileFeatures,
+    LogMelExtractor,
+)
+from audio_processor.transcriber import AudioTranscriber
+from audio_processor.vad import SpeechTimeline
+from transformers import WhisperFeatureExtractor
+
+
+def _windows():
+    rng = np.random.default_rng(0)
+    return [
+        (rng.standard_normal(n) * 0.1).astype(np.float32)
+        for n in (480000, 100000, 16000)
+    ]
+
+
+@pytest.mark.parametrize("stft", ["torch", "numpy"])
+def test_extractor_matches_whisper_feature_extractor(stft):
+    processor = WhisperFeatureExtractor()
+    windows = _windows()
+    expected = processor(
+        windows, sampling_rate=16000, return_tensors="np"
+    ).input_features
+
+    features = LogMelExtractor.from_processor(processor, stft)(windows)
+
+    assert features.dtype == np.float32
+    assert features.shape == expected.shape == (3, 80, 3000)
+    np.testing.assert_allclose(features, expected, atol=1e-4)
+
+
+def test_feature_cache_round_trip_and_eviction(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_bytes=0)
+    timeline = SpeechTimeline()
+    timeline.add(16000, 8000)
+    timeline.add(48000, 4000)
+    features = np.ones((2, 80, 3000), dtype=np.float32)
+    cache.put("a", FileFeatures(features, [480000, 12000], timeline, 9.5))
+    cache.put("b", FileFeatures(features[:0], [], SpeechTimeline(), 3.0))
+    cache.put("c", FileFeatures(features[:1], [480000], None, 30.0))
+
+    a, b, c = (cache.get(key) for key in "abc")
+
+    np.testing.assert_array_equal(a.features, features)
+    assert a.lengths == [480000, 12000]
+    assert a.timeline.regions() == timeline.regions()
+    assert a.audio_seconds == 9.5
+    # VAD that found no speech still has a timeline, no VAD has none
+    assert b.timeline is not None and b.lengths == []
+    assert c.timeline is None
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    assert isinstance(a.features, np.memmap)
+    size = sum(p.stat().st_size for p in tmp_path.glob("c.*"))
+    cache.max_bytes = size
+    cache.put("d", FileFeatures(features[:1], [480000], None, 30.0))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["d.f32", "d.json"]
+
+
+def test_feature_writer_adds_batches_and_discards(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    features = np.arange(3 * 2 * 4, dtype=np.float32).reshape(3, 2, 4)
+
+    writer = cache.writer("a", (2, 4))
+    writer.add(features[:2], [480000, 480000])
+    writer.add(features[2:], [16000])
+    stored = writer.commit(None, 61.0)
+    writer.discard()
+    abandoned = cache.writer("b", (2, 4))
+    abandoned.add(features[:1], [480000])
+    with pytest.raises(ValueError):
+        abandoned.add(np.zeros((1, 3, 4)), [480000])
+    abandoned.discard()
+
+    np.testing.assert_array_equal(stored.features, features)
+    assert cache.get("a").lengths == [480000, 480000, 16000]
+    assert cache.get("b") is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.f32", "a.json"]
+
+
+def test_transcriber_reuses_cached_features(tmp_path):
+    transcriber = AudioTranscriber(engine="stub")
+    transcriber.enable_feature_cache(FeatureCache(str(tmp_path / "cache")))
+    rng = np.random.default_rng(0)
+    path = tmp_path / "audio.wav"
+    sf.write(path, (rng.standard_normal(16000 * 40) * 0.1), 16000)
+
+    first = transcriber.transcribe_stream(str(path), content_hash="abc")
+    path.unlink()
+    # The audio is gone, so only the cache can answer
+    second = transcriber.transcribe_stream(str(path), content_hash="abc")
+
+    assert first == second == "stub transcription"
+    assert transcriber.feature_cache.hits == 1
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+from app.core.result_cache import ResultCache
+from app.ingest import (
+    Ingester,
+    find_audio_files,
+    hash_file,
+    ingest,
+    ingested_hashes,
+    prepare_file,
+)
+from app.models.transcription import (
+    Transcription,
+    TranscriptionCacheEntry,
+    TranscriptionSegment,
+)
+from audio_processor.decoding import DecodingOptions
+from audio_processor.features import FeatureCache, LogMelExtractor
+from audio_processor.transcriber import AudioTranscriber
+from sqlalchemy import func, select
+from transformers import WhisperFeatureExtractor
+
+EXTRACTOR = LogMelExtractor.from_processor(WhisperFeatureExtractor())
+
+
+class StubRegistry:
+    model_name = "stub"
+    decoding = DecodingOptions(timestamps=True)
+
+    def __init__(self):
+        self.transcriber = AudioTranscriber(engine="stub")
+
+    def get(self):
+        return self.transcriber
+
+
+def _write_wav(path, seconds, seed):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    audio = 0.1 * rng.standard_normal(int(seconds * 16000))
+    sf.write(path, audio.astype(np.float32), 16000)
+
+
+def _ingester(session_factory, **options):
+    return Ingester(
+        session_factory, StubRegistry(), ResultCache(max_bytes=1024), **options
+    )
+
+
+def test_find_audio_files_walks_the_tree_in_order(tmp_path):
+    for name in ("b/2.wav", "b/1.MP3", "a/c/3.flac", "a/notes.txt"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+    paths = list(find_audio_files(str(tmp_path)))
+
+    assert [os.path.relpath(p, tmp_path) for p in paths] == [
+        os.path.join("a", "c", "3.flac"),
+        os.path.join("b", "1.MP3"),
+        os.path.join("b", "2.wav"),
+    ]
+
+
+def test_prepare_file_features_cache_and_errors(tmp_path):
+    path = str(tmp_path / "audio" / "long.wav")
+    _write_wav(path, 70, seed=0)
+    cache = FeatureCache(str(tmp_path / "features"))
+
+    prepared = prepare_file(path, EXTRACTOR, feature_cache=cache)
+    again = prepare_file(path, EXTRACTOR, feature_cache=cache)
+    broken = tmp_path / "audio" / "broken.mp3"
+    broken.write_bytes(b"not audio")
+    failed = prepare_file(str(broken), EXTRACTOR)
+
+    assert prepared.content_hash == hash_file(path)
+    assert prepared.features.lengths == [480000, 480000, 320000]
+    assert prepared.features.features.shape == (3, 80, 3000)
+    assert prepared.features.audio_seconds == pytest.approx(70)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(
+        again.features.features, prepared.features.features
+    )
+    assert failed.error is not None and failed.features is None
+
+
+def test_prepared_features_are_found_by_the_transcriber(tmp_path):
+    path = str(tmp_path / "audio.wav")
+    _write_wav(path, 40, seed=0)
+    cache = FeatureCache(str(tmp_path / "features"))
+    transcriber = AudioTranscriber(engine="stub")
+    transcriber.enable_vad()
+    transcriber.enable_feature_cache(cache)
+
+    prepared = prepare_file(path, EXTRACTOR, vad=True, feature_cache=cache)
+    found = transcriber.file_features(path, prepared.content_hash)
+
+    assert cache.hits == 1
+    assert found.lengths == prepared.features.lengths
+    assert found.timeline.regions() == prepared.features.timeline.regions()
+
+
+def test_ingester_batches_across_files_and_commits_in_bulk(
+    tmp_path, session_factory
+):
+    ingester = _ingester(session_factory, batch_size=4, commit_every=2)
+    for i, seconds in enumerate((70, 10, 40)):
+        path = str(tmp_path / "audio" / f"{i}.wav")
+        _write_wav(path, seconds, seed=i)
+        ingester.add(prepare_file(path, EXTRACTOR))
+    # The first two files share the first batch and are committed together
+    with session_factory() as db:
+        assert db.scalar(select(func.count(Transcription.id))) == 2
+
+    ingester.flush()
+
+    with session_factory() as db:
+        rows = db.scalars(select(Transcription).order_by(Transcription.id))
+        rows = list(rows)
+        assert [r.filename for r in rows] == ["0.wav", "1.wav", "2.wav"]
+        assert all(r.transcription_content for r in rows)
+        assert all(r.content_hash for r in rows)
+        assert db.scalar(select(func.count(TranscriptionSegment.id))) > 0
+        assert db.scalar(select(func.count(TranscriptionCacheEntry.id))) == 3
+    assert ingester.done == 3
+    assert ingester.audio_seconds == pytest.approx(120)
+
+
+def test_ingest_skips_duplicates_and_resumes(tmp_path, session_factory):
+    root = tmp_path / "audio"
+    _write_wav(str(root / "a.wav"), 5, seed=0)
+    _write_wav(str(root / "copy" / "a.wav"), 5, seed=0)
+    _write_wav(str(root / "b.wav"), 5, seed=1)
+
+    first = _ingester(session_factory)
+    ingest(list(find_audio_files(str(root))), first, workers=1, vad=False)
+    _write_wav(str(root / "c.wav"), 5, seed=2)
+    second = _ingester(session_factory)
+    ingest(
+        list(find_audio_files(str(root))),
+        second,
+        workers=1,
+        skip_hashes=ingested_hashes(session_factory),
+    )
+
+    assert (first.done, first.skipped) == (2, 1)
+    assert (second.done, second.skipped) == (1, 3)
+    with session_factory() as db:
+        assert db.scalar(select(func.count(Transcription.id))) == 3
@@ -0,0 +1,234 @@
+import asyncio
+import io
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+from app.core.executor import InferenceExecutor
+from app.core.jobs import JobRunner, get_job_runner, new_job_id
+from app.core.result_cache import ResultCache
+from app.crud import requeue_interrupted_jobs
+from app.db.database import get_db
+from app.main import app
+from app.models.transcription import Transcription, TranscriptionJob
+from audio_processor.decoding import DecodingOptions
+from fastapi.testclient import TestClient
+
+
+class StubTranscriber:
+    def __init__(self, text):
+        self.text = text
+        self.paths = []
+
+    def process_audio_segments(
+        self, audio_file, decoding=None, content_hash=None
+    ):
+        self.paths.append(audio_file)
+        if self.text is None:
+            return None, None
+        return self.text, [{"start": 0.0, "end": 1.5, "text": self.text}]
+
+
+class StubRegistry:
+    model_name = "stub"
+    decoding = DecodingOptions()
+
+    def __init__(self, text="stub transcription"):
+        self.transcriber = StubTranscriber(text)
+
+    def get(self):
+        return self.transcriber
+
+
+def _runner(session_factory, tmp_path, text="stub transcription", **options):
+    return JobRunner(
+        session_factory=session_factory,
+        registry=StubRegistry(text),
+        cache=ResultCache(max_bytes=1024),
+        upload_dir=str(tmp_path / "uploads"),
+        workers=1,
+        **options,
+    )
+
+
+def _queue_job(runner, db, filename="test.mp3"):
+    job_id = new_job_id()
+    path = runner.new_upload_path(job_id)
+    with open(path, "wb") as f:
+        f.write(b"audio")
+    return runner.create_job(db, job_id, filename, path, "hash")
+
+
+def test_run_job_stores_transcription(session_factory, tmp_path):
+    runner = _runner(session_factory, tmp_path)
+    db = session_factory()
+    job = _queue_job(runner, db)
+    audio_path = job.audio_path
+
+    runner.run_job(job.id)
+
+    db.expire_all()
+    job = db.get(TranscriptionJob, job.id)
+    assert job.status == "done"
+    assert job.queue_seconds >= 0
+    assert job.run_seconds >= 0
+    transcription = db.get(Transcription, job.transcription_id)
+    assert transcription.transcription_content == "stub transcription"
+    assert transcription.content_hash == "hash"
+    assert runner.registry.transcriber.paths == [audio_path]
+    assert not os.path.exists(audio_path)
+    db.close()
+
+
+def test_run_job_records_failure(session_factory, tmp_path):
+    runner = _runner(session_factory, tmp_path, text=None)
+    db = session_factory()
+    job = _queue_job(runner, db)
+
+    runner.run_job(job.id)
+
+    db.expire_all()
+    job = db.get(TranscriptionJob, job.id)
+    assert job.status == "failed"
+    assert job.error == "Failed to transcribe audio"
+    assert job.transcription_id is None
+    assert db.query(Transcription).count() == 0
+    db.close()
+
+
+def test_start_resumes_unfinished_jobs(session_factory, tmp_path):
+    # Jobs left behind by a process that died mid-run
+    previous = _runner(session_factory, tmp_path)
+    db = session_factory()
+    queued = _queue_job(previous, db, "a.mp3")
+    running = _queue_job(previous, db, "b.mp3")
+    running.status = "running"
+    db.commit()
+
+    runner = _runner(session_factory, tmp_path)
+    runner.start()
+    runner.stop()
+
+    db.expire_all()
+    assert db.get(TranscriptionJob, queued.id).status == "done"
+    assert db.get(TranscriptionJob, running.id).status == "done"
+    assert db.query(Transcription).count() == 2
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_on_the_inference_executor(session_factory, tmp_path):
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    runner = _runner(session_factory, tmp_path, executor=executor)
+    runner.start()
+    db = session_factory()
+    try:
+        job = _queue_job(runner, db)
+        while db.get(TranscriptionJob, job.id).status != "done":
+            await asyncio.sleep(0.01)
+            db.expire_all()
+    finally:
+        await asyncio.to_thread(runner.stop)
+        executor.shutdown()
+        db.close()
+
+    assert executor.run_time.count == 1
+    assert runner.registry.transcriber.paths == [job.audio_path]
+
+
+def test_sibling_processes_run_a_job_once(session_factory, tmp_path):
+    # Two server processes that both queued the job on start
+    first = _runner(session_factory, tmp_path)
+    second = _runner(session_factory, tmp_path, requeue_running=False)
+    db = session_factory()
+    job = _queue_job(first, db)
+    running = _queue_job(first, db, "running.mp3")
+    running.status = "running"
+    db.commit()
+
+    first.run_job(job.id)
+    second.start()
+    second.stop()
+
+    db.expire_all()
+    assert db.get(TranscriptionJob, job.id).status == "done"
+    # Left to the sibling running it
+    assert db.get(TranscriptionJob, running.id).status == "running"
+    assert second.registry.transcriber.paths == []
+    assert db.query(Transcription).count() == 1
+    assert requeue_interrupted_jobs(db) == 1
+    db.close()
+
+
+def test_queued_jobs_run_shortest_first(session_factory, tmp_path):
+    # Queued by a previous process, so costs come from the audio headers
+    previous = _runner(session_factory, tmp_path)
+    db = session_factory()
+    for filename, seconds in (("long.wav", 600), ("short.wav", 2)):
+        job = _queue_job(previous, db, filename)
+        sf.write(job.audio_path, np.zeros(seconds * 1000), 1000, format="WAV")
+    _queue_job(previous, db, "unreadable.mp3")
+
+    runner = _runner(session_factory, tmp_path)
+    runner.start()
+    runner.stop()
+
+    db.expire_all()
+    rows = db.query(Transcription).order_by(Transcription.id).all()
+    # Unknown costs count as free, then the shorter audio goes first
+    assert [row.filename for row in rows] == [
+        "unreadable.mp3",
+        "short.wav",
+        "long.wav",
+    ]
+    db.close()
+
+
+def test_job_api_round_trip(session_factory, tmp_path):
+    runner = _runner(session_factory, tmp_path)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # Other test modules install their own get_db override at import time
+    saved_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_job_runner] = lambda: runner
+    audio = io.BytesIO()
+    sf.write(audio, np.zeros(16000, dtype=np.float32), 16000, format="WAV")
+    runner.start()
+    try:
+        with TestClient(app) as client:
+            rejected = client.post(
+                "/api/v1/jobs",
+                files={"audio_file": ("test.mp3", b"audio", "audio/mpeg")},
+            )
+            assert rejected.status_code == 400
+            response = client.post(
+                "/api/v1/jobs",
+                files={
+                    "audio_file": ("test.wav", audio.getvalue(), "audio/wav")
+                },
+            )
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+            assert response.json()["status"] in ("queued", "running", "done")
+
+            response = client.get(f"/api/v1/jobs/{job_id}/wait?timeout=10")
+            assert response.status_code == 200
+            body = response.json()
+            assert body["status"] == "done"
+            assert body["transcription"]["transcription_content"] == (
+                "stub transcription"
+            )
+
+            assert client.get("/api/v1/jobs/missing").status_code == 404
+    finally:
+        runner.stop()
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(saved_overrides)
@@ -0,0 +1,44 @@
+from app.core.executor import InferenceExecutor
+from app.core.metrics import Histogram, Metrics
+from app.core.result_cache import ResultCache
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("stage_seconds", "Stage time", (0.1, 1.0), "stage")
+
+    for seconds in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(seconds, "generate")
+    histogram.observe(0.1, "features")
+
+    assert histogram.render() == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="features",le="0.1"} 1',
+        'stage_seconds_bucket{stage="features",le="1.0"} 1',
+        'stage_seconds_bucket{stage="features",le="+Inf"} 1',
+        'stage_seconds_sum{stage="features"} 0.1',
+        'stage_seconds_count{stage="features"} 1',
+        'stage_seconds_bucket{stage="generate",le="0.1"} 1',
+        'stage_seconds_bucket{stage="generate",le="1.0"} 3',
+        'stage_seconds_bucket{stage="generate",le="+Inf"} 4',
+        'stage_seconds_sum{stage="generate"} 4.05',
+        'stage_seconds_count{stage="generate"} 4',
+    ]
+
+
+def test_metrics_record_stages_audio_and_gauges():
+    metrics = Metrics()
+
+    with metrics.timed("upload_read"):
+        pass
+    metrics.observe_audio(60.0, 6.0)
+    with metrics.track_request():
+        text = metrics.render(InferenceExecutor(), None, ResultCache(1024))
+
+    assert metrics.stage_seconds.snapshot("upload_read")["count"] == 1
+    assert metrics.real_time_factor.snapshot() == {"sum": 0.1, "count": 1}
+    assert "transcriber_audio_duration_seconds_sum 60.0" in text
+    assert "transcriber_http_requests_in_flight 1" in text
+    assert "transcriber_inference_queue_depth 0" in text
+    assert 'transcriber_cache_hits_total{tier="memory"} 0' in text
+    assert metrics.in_flight == 0
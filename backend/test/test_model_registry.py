@@ -0,0 +1,74 @@
+from unittest.mock import Mock
+
+import numpy as np
+from app.core.model_registry import ModelRegistry
+
+
+def _factory():
+    transcriber = Mock()
+    transcriber.target_sampling_rate = 16000
+    transcriber.transcribe.return_value = ""
+    return Mock(return_value=transcriber)
+
+
+def test_registry_is_lazy():
+    factory = _factory()
+    registry = ModelRegistry("openai/whisper-tiny", factory=factory)
+
+    assert not registry.is_loaded
+    factory.assert_not_called()
+    assert registry.stats()["load_seconds"] is None
+
+
+def test_registry_loads_once():
+    factory = _factory()
+    registry = ModelRegistry("openai/whisper-tiny", factory=factory)
+
+    first = registry.get()
+    second = registry.get()
+
+    assert first is second
+    factory.assert_called_once_with("openai/whisper-tiny")
+    stats = registry.stats()
+    assert stats["loaded"] is True
+    assert stats["load_seconds"] >= 0
+
+
+def test_registry_warm_up_runs_silence():
+    factory = _factory()
+    registry = ModelRegistry("openai/whisper-tiny", factory=factory)
+
+    registry.warm_up()
+
+    transcriber = registry.get()
+    ((audio,),), _ = transcriber.extract_features.call_args
+    transcriber.generate_batch.assert_called_once()
+    assert isinstance(audio, np.ndarray)
+    assert len(audio) == 16000
+    assert not audio.any()
+    assert registry.stats()["warmup_seconds"] >= 0
+
+
+def test_registry_unload():
+    factory = _factory()
+    registry = ModelRegistry("openai/whisper-tiny", factory=factory)
+    registry.get()
+
+    registry.unload()
+
+    assert not registry.is_loaded
+    registry.get()
+    assert factory.call_count == 2
+
+
+def test_registry_passes_transcriber_options():
+    factory = _factory()
+    registry = ModelRegistry(
+        "openai/whisper-tiny",
+        factory=factory,
+        transcriber_options={"cpu_profile": "int8"},
+    )
+
+    registry.get()
+
+    factory.assert_called_once_with("openai/whisper-tiny", cpu_profile="int8")
@@ -0,0 +1,91 @@
+import pytest
+from app.core.result_cache import LRUCache, ResultCache, make_cache_key
+from app.models.transcription import Base, TranscriptionCacheEntry
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)  # noqa: E501
+
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_cache_key_depends_on_model_and_params():
+    key = make_cache_key("abc", "openai/whisper-tiny")
+    assert key == make_cache_key("abc", "openai/whisper-tiny", {})
+    assert key != make_cache_key("abc", "openai/whisper-base")
+    assert key != make_cache_key("abc", "openai/whisper-tiny", {"beams": 5})
+    assert make_cache_key("abc", "m", {"a": 1, "b": 2}) == make_cache_key(
+        "abc", "m", {"b": 2, "a": 1}
+    )
+
+
+def test_lru_evicts_least_recently_used_by_size():
+    lru = LRUCache(max_bytes=10)
+    lru.put("a", "aaaa")
+    lru.put("b", "bbbb")
+    lru.get("a")
+    lru.put("c", "cccc")
+
+    assert lru.get("b") is None
+    assert lru.get("a") == "aaaa"
+    assert lru.get("c") == "cccc"
+    assert lru.size_bytes == 8
+
+
+def test_lru_skips_values_larger_than_budget():
+    lru = LRUCache(max_bytes=3)
+    lru.put("a", "too long")
+    assert len(lru) == 0
+
+
+def test_result_cache_miss_then_hits(db_session):
+    cache = ResultCache(max_bytes=1024)
+    assert cache.get(db_session, "key") is None
+
+    cache.put(db_session, "key", "hash", "model", "hello")
+    db_session.commit()
+    assert cache.get(db_session, "key") == "hello"
+
+    # A fresh process only has the table
+    cold = ResultCache(max_bytes=1024)
+    assert cold.get(db_session, "key") == "hello"
+    assert cold.get(db_session, "key") == "hello"
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cold.stats()["db_hits"] == 1
+    assert cold.stats()["memory_hits"] == 1
+
+
+def test_result_cache_put_ignores_duplicates(db_session):
+    cache = ResultCache(max_bytes=1024)
+    cache.put(db_session, "key", "hash", "model", "first")
+    cache.put(db_session, "key", "hash", "model", "second")
+    db_session.commit()
+
+    rows = db_session.query(TranscriptionCacheEntry).all()
+    assert [r.transcription_content for r in rows] == ["first"]
+
+
+def test_result_cache_disabled(db_session):
+    cache = ResultCache(max_bytes=1024, enabled=False)
+    cache.put(db_session, "key", "hash", "model", "hello")
+    db_session.commit()
+    assert cache.get(db_session, "key") is None
+    assert db_session.query(TranscriptionCacheEntry).count() == 0
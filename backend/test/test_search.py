@@ -0,0 +1,130 @@
+import pytest
+from app.db import fts
+from app.db.migrations import run_migrations
+from app.models.transcription import Base, Transcription
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)  # noqa: E501
+
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def _add(db, filename, content):
+    transcription = Transcription(
+        filename=filename, transcription_content=content
+    )
+    db.add(transcription)
+    db.commit()
+    return transcription
+
+
+def test_build_match_query():
+    assert fts.build_match_query("hello world") == '"hello"* AND "world"*'
+    assert fts.build_match_query("hello", prefix=False) == '"hello"'
+    assert (
+        fts.build_match_query("my_audio.mp3", scope="filename")
+        == 'filename : "my_audio"* AND filename : "mp3"*'
+    )
+    # FTS5 syntax is searched for literally, not interpreted
+    assert fts.build_match_query('NOT "x" OR') == '"NOT"* AND "x"* AND "OR"*'
+    assert fts.build_match_query("  .-  ") is None
+    with pytest.raises(ValueError):
+        fts.build_match_query("x", scope="title")
+
+
+def test_search_ranks_filename_above_content(db_session):
+    _add(db_session, "weather.mp3", "nothing to see here")
+    _add(db_session, "notes.mp3", "the weather today is sunny")
+    _add(db_session, "other.mp3", "unrelated")
+
+    results = fts.search(db_session, "weather")
+
+    assert [r["filename"] for r in results] == ["weather.mp3", "notes.mp3"]
+    assert results[0]["rank"] < results[1]["rank"]
+    assert results[0]["filename_highlight"] == "<mark>weather</mark>.mp3"
+    assert "<mark>weather</mark>" in results[1]["snippet"]
+
+
+def test_search_scope_and_prefix(db_session):
+    _add(db_session, "meeting.mp3", "budget review")
+    _add(db_session, "budget.mp3", "a short meeting")
+
+    content = fts.search(db_session, "budg", scope="content")
+    assert [r["filename"] for r in content] == ["meeting.mp3"]
+    filename = fts.search(db_session, "budg", scope="filename")
+    assert [r["filename"] for r in filename] == ["budget.mp3"]
+    assert fts.search(db_session, "budg", prefix=False) == []
+
+
+def test_index_follows_updates_and_deletes(db_session):
+    transcription = _add(db_session, "a.mp3", "first words")
+
+    transcription.transcription_content = "second words"
+    db_session.commit()
+    assert fts.search(db_session, "first") == []
+    assert len(fts.search(db_session, "second")) == 1
+
+    db_session.delete(transcription)
+    db_session.commit()
+    assert fts.search(db_session, "words") == []
+
+
+def test_migration_backfills_existing_rows(tmp_path):
+    # A database created before the index existed
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE transcription (id INTEGER PRIMARY KEY, "
+                "filename VARCHAR(255), transcription_content TEXT, "
+                "created_at DATETIME)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO transcription (filename, transcription_content) "
+                "VALUES ('old.mp3', 'recorded long ago')"
+            )
+        )
+
+    run_migrations(old)
+    run_migrations(old)
+
+    assert fts.FTS_TABLE in inspect(old).get_table_names()
+    db = sessionmaker(bind=old)()
+    assert [r["filename"] for r in fts.search(db, "recorded")] == ["old.mp3"]
+    db.add(Transcription(filename="new.mp3", transcription_content="recorded"))
+    db.commit()
+    assert len(fts.search(db, "recorded")) == 2
+    db.close()
+    old.dispose()
+
+
+def test_search_ranks_every_match_unless_capped(db_session):
+    _add(db_session, "topic.mp3", "topic")
+    _add(db_session, "b.mp3", "topic mentioned once")
+
+    ranked = fts.search(db_session, "topic")
+    capped = fts.search(db_session, "topic", rank_candidates=1)
+
+    # The older, better match is only found without the cap
+    assert [r["filename"] for r in ranked] == ["topic.mp3", "b.mp3"]
+    assert [r["filename"] for r in capped] == ["b.mp3"]
+    assert fts.more_matches_than(db_session, "topic", 1)
+    assert not fts.more_matches_than(db_session, "topic", 2)
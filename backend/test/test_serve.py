@@ -0,0 +1,31 @@
+from app.core.config import settings
+from app.serve import threads_per_worker, worker_environment
+
+
+def test_worker_environment_splits_the_cores(monkeypatch):
+    monkeypatch.setattr(settings, "TORCH_INTRA_OP_THREADS", 0)
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+
+    single = worker_environment(1, cpus=8)
+    several = worker_environment(4, cpus=8)
+
+    assert single == {"TORCH_INTRA_OP_THREADS": "8", "OMP_NUM_THREADS": "8"}
+    assert several == {
+        "TORCH_INTRA_OP_THREADS": "2",
+        "OMP_NUM_THREADS": "2",
+        "JOB_REQUEUE_RUNNING": "false",
+    }
+
+
+def test_worker_environment_keeps_configured_threads(monkeypatch):
+    monkeypatch.setattr(settings, "TORCH_INTRA_OP_THREADS", 3)
+
+    assert worker_environment(4, cpus=8) == {"JOB_REQUEUE_RUNNING": "false"}
+
+
+def test_threads_per_worker():
+    assert threads_per_worker(1, cpus=8) == 8
+    assert threads_per_worker(3, cpus=8) == 2
+    # Never less than one, even with more workers than cores
+    assert threads_per_worker(16, cpus=8) == 1
+    assert threads_per_worker(1) >= 1
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_processor.stream import (
+    StreamingResampler,
+    iter_audio_blocks,
+    iter_stream_windows,
+)
+from scipy import signal
+
+
+@pytest.mark.parametrize(
+    "orig_rate, up, down",
+    [(44100, 160, 441), (48000, 1, 3), (8000, 2, 1), (22050, 320, 441)],
+)
+def test_streaming_resampler_matches_resample_poly(orig_rate, up, down):
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(50000)
+    expected = signal.resample_poly(audio, up, down)
+
+    resampler = StreamingResampler(orig_rate, 16000)
+    blocks = [audio[i : i + 4097] for i in range(0, len(audio), 4097)]
+    result = np.concatenate(
+        [resampler.process(b) for b in blocks] + [resampler.flush()]
+    )
+
+    assert result.dtype == np.float32
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_streaming_resampler_identity():
+    resampler = StreamingResampler(16000, 16000)
+    block = np.arange(10, dtype=np.float32)
+    np.testing.assert_array_equal(resampler.process(block), block)
+    assert len(resampler.flush()) == 0
+
+
+@pytest.mark.parametrize("length", [0, 100, 480000, 480001, 1_120_000])
+def test_stream_windows_match_array_windows(length):
+    window, step = 480000, 400000
+    audio = np.arange(length, dtype=np.float32)
+    blocks = [audio[i : i + 65536] for i in range(0, length, 65536)]
+
+    expected = []
+    start = 0
+    while True:
+        expected.append(audio[start : start + window])
+        if start + window >= length:
+            break
+        start += step
+
+    result = list(iter_stream_windows(blocks, window, step))
+
+    assert len(result) == len(expected)
+    for got, want in zip(result, expected):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_iter_audio_blocks_downmixes_and_resamples(tmp_path):
+    path = tmp_path / "stereo.wav"
+    rng = np.random.default_rng(1)
+    stereo = rng.standard_normal((44100 * 2, 2)).astype(np.float32) * 0.1
+    sf.write(path, stereo, 44100)
+
+    blocks = list(iter_audio_blocks(str(path), 16000, block_frames=10000))
+
+    assert all(b.ndim == 1 and b.dtype == np.float32 for b in blocks)
+    assert sum(len(b) for b in blocks) == 32000
+
+
+def test_iter_audio_blocks_reads_mp3():
+    path = os.path.join(os.path.dirname(__file__), "object", "sample_test.mp3")
+    info = sf.info(path)
+
+    total = sum(len(b) for b in iter_audio_blocks(path, 16000))
+
+    assert total == pytest.approx(info.duration * 16000, abs=1)
@@ -1,9 +1,29 @@
+import hashlib
+import json
 import os
 
 import pytest
+from app.api.routes.transcription import DEFAULT_PAGE_SIZE
+from app.core.config import settings
+from app.core.executor import (
+    InferenceExecutor,
+    QueueFullError,
+    get_inference_executor,
+)
+from app.core.model_registry import get_model_registry, model_registry
+from app.core.result_cache import (
+    ResultCache,
+    get_result_cache,
+    make_cache_key,
+)
 from app.db.database import get_db
 from app.main import app
-from app.models.transcription import Base
+from app.models.transcription import (
+    Base,
+    Transcription,
+    TranscriptionCacheEntry,
+)
+from audio_processor.decoding import DecodingOptions
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -33,11 +53,37 @@ app.dependency_overrides[get_db] = override_get_db
 @pytest.fixture
 def client():
     Base.metadata.create_all(bind=engine)
+    # Fresh result cache per test so in-memory hits do not leak across tests
+    cache = ResultCache(max_bytes=1024 * 1024)
+    app.dependency_overrides[get_result_cache] = lambda: cache
     with TestClient(app) as test_client:
         yield test_client
+    del app.dependency_overrides[get_result_cache]
     Base.metadata.drop_all(bind=engine)
 
 
+STUB_SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": "stub"},
+    {"start": 2.5, "end": 4.0, "text": "transcription"},
+]
+
+
+class StubExecutor(InferenceExecutor):
+    """Executor that returns a fixed transcription without running Whisper"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.args = []
+        self.costs = []
+
+    async def run(self, fn, *args, cost=None):
+        self.calls += 1
+        self.args.append(args)
+        self.costs.append(cost)
+        return ("stub transcription", STUB_SEGMENTS), 0.0, 0.0
+
+
 @pytest.fixture
 def sample_mp3():
     # Use the actual sample file from the test directory
@@ -54,18 +100,170 @@ def test_health_check(client):
     assert response.json() == {"status": "healthy"}
 
 
+def test_model_info(client):
+    response = client.get("/api/v1/model")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["model_name"] == "openai/whisper-tiny"
+    assert {
+        "pid",
+        "loaded",
+        "load_seconds",
+        "resident_bytes",
+        "shared_bytes",
+    } <= body.keys()
+
+
+def test_metrics_after_upload(client, sample_mp3):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    response = client.get("/api/v1/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for stage in ("upload_read", "db_commit"):
+        assert f'transcriber_stage_seconds_count{{stage="{stage}"}}' in text
+    assert "transcriber_inference_queue_depth 0" in text
+    assert "transcriber_cache_misses_total" in text
+    assert 'transcriber_model_loaded{model="openai/whisper-tiny"}' in text
+
+
 def test_get_transcriptions_empty(client):
     response = client.get("/api/v1/transcriptions")
     assert response.status_code == 200
     assert response.json() == []
 
 
+def _add_transcriptions(count, content="words " * 100):
+    db = testing_session()
+    for i in range(count):
+        db.add(Transcription(filename=f"{i}.mp3", transcription_content=content))  # noqa: E501
+    db.commit()
+    db.close()
+
+
+def test_get_transcriptions_pages_with_cursor(client):
+    _add_transcriptions(5)
+
+    filenames = []
+    cursor = None
+    for _ in range(3):
+        url = "/api/v1/transcriptions?limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url)
+        assert response.status_code == 200
+        filenames += [t["filename"] for t in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    assert filenames == [f"{i}.mp3" for i in range(5)]
+    assert cursor is None
+
+    response = client.get("/api/v1/transcriptions?cursor=garbage")
+    assert response.status_code == 400
+
+
+def test_get_transcriptions_without_cursor_returns_every_row(client):
+    _add_transcriptions(DEFAULT_PAGE_SIZE + 1, content="hello")
+
+    response = client.get("/api/v1/transcriptions")
+    assert response.status_code == 200
+    assert len(response.json()) == DEFAULT_PAGE_SIZE + 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_transcriptions_newest_first(client):
+    _add_transcriptions(3, content="hello")
+
+    first = client.get("/api/v1/transcriptions?order=newest&limit=2")
+    assert [t["filename"] for t in first.json()] == ["2.mp3", "1.mp3"]
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get(f"/api/v1/transcriptions?order=newest&cursor={cursor}")
+    assert [t["filename"] for t in rest.json()] == ["0.mp3"]
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_cors_exposes_next_cursor(client):
+    response = client.get(
+        "/api/v1/transcriptions", headers={"Origin": settings.FRONTEND_HOST}
+    )
+    assert "X-Next-Cursor" in response.headers["access-control-expose-headers"]
+
+
+def test_get_transcriptions_content_modes(client):
+    _add_transcriptions(1)
+
+    truncated = client.get(
+        "/api/v1/transcriptions?content=truncate&content_chars=11"
+    ).json()
+    assert truncated[0]["transcription_content"] == "words words"
+    omitted = client.get("/api/v1/transcriptions?content=none").json()
+    assert omitted[0]["transcription_content"] is None
+    assert omitted[0]["filename"] == "0.mp3"
+
+
+def test_export_transcriptions_ndjson(client):
+    _add_transcriptions(3, content="hello")
+
+    response = client.get("/api/v1/transcriptions/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["filename"] for r in rows] == ["0.mp3", "1.mp3", "2.mp3"]
+    assert rows[0]["transcription_content"] == "hello"
+
+
 def test_search_transcriptions_empty(client):
     response = client.get("/api/v1/search?query=test")
     assert response.status_code == 200
     assert response.json() == []
 
 
+def test_search_transcript_text(client):
+    db = testing_session()
+    db.add(Transcription(filename="call.mp3", transcription_content="Quarterly figures"))  # noqa: E501
+    db.add(Transcription(filename="quarterly.mp3", transcription_content="Other"))  # noqa: E501
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/search?query=quarter&scope=content")
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["filename"] for r in body] == ["call.mp3"]
+    assert body[0]["snippet"] == "<mark>Quarterly</mark> figures"
+
+    response = client.get("/api/v1/search?query=quarter")
+    assert len(response.json()) == 2
+
+    response = client.get("/api/v1/search?query=quarter&scope=title")
+    assert response.status_code == 422
+
+
+def test_search_marks_truncated_results(client, monkeypatch):
+    db = testing_session()
+    db.add(Transcription(filename="a.mp3", transcription_content="budget"))
+    db.add(Transcription(filename="b.mp3", transcription_content="budget"))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/search?query=budget")
+    assert "x-search-truncated" not in response.headers
+    assert len(response.json()) == 2
+
+    monkeypatch.setattr(settings, "SEARCH_RANK_CANDIDATES", 1)
+    response = client.get("/api/v1/search?query=budget")
+    assert response.headers["x-search-truncated"] == "true"
+    assert len(response.json()) == 1
+
+
 def test_upload_invalid_file(client):
     response = client.post(
         "/api/v1/transcribe",
@@ -75,6 +273,383 @@ def test_upload_invalid_file(client):
     assert "File must be an audio file" in response.json()["detail"]
 
 
+def test_upload_when_queue_full(client, sample_mp3):
+    class FullExecutor(InferenceExecutor):
+        async def run(self, fn, *args, cost=None):
+            raise QueueFullError(retry_after=7)
+
+    app.dependency_overrides[get_inference_executor] = FullExecutor
+    try:
+        response = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_upload_cache_hit_skips_inference(client, sample_mp3):
+    content_hash = hashlib.sha256(sample_mp3).hexdigest()
+    db = testing_session()
+    db.add(
+        TranscriptionCacheEntry(
+            cache_key=make_cache_key(
+                content_hash,
+                "openai/whisper-tiny",
+                model_registry.decoding.cache_params(),
+            ),
+            content_hash=content_hash,
+            model_name="openai/whisper-tiny",
+            transcription_content="cached transcription",
+        )
+    )
+    db.commit()
+    db.close()
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        response = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json()["transcription_content"] == "cached transcription"
+    assert executor.calls == 0
+
+
+def test_upload_is_spooled_to_disk_and_removed(client, sample_mp3):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        response = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert response.status_code == 200
+    # The decoder was handed a path rather than the bytes of the upload
+    path = executor.args[0][1]
+    assert isinstance(path, str)
+    assert not os.path.exists(path)
+
+
+def test_upload_over_max_size_is_rejected(client, sample_mp3, monkeypatch):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        # Within the form overhead, so caught while spooling
+        monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", len(sample_mp3) - 1)
+        spooled = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+        # Refused on its Content-Length before the body is read
+        monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+        declared = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert [spooled.status_code, declared.status_code] == [413, 413]
+    assert executor.calls == 0
+
+
+def test_upload_is_admitted_by_its_audio_header(
+    client, sample_mp3, monkeypatch
+):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        admitted = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+        monkeypatch.setattr(settings, "AUDIO_MAX_SECONDS", 1)
+        too_long = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+        unreadable = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", b"not audio", "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert admitted.status_code == 200
+    assert [too_long.status_code, unreadable.status_code] == [413, 400]
+    # Only the admitted upload was queued, with its duration as the cost
+    assert executor.calls == 1
+    assert executor.costs[0] > 1
+
+
+def test_upload_same_audio_twice_transcribes_once(client, sample_mp3):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        responses = [
+            client.post(
+                "/api/v1/transcribe",
+                files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+            )
+            for _ in range(2)
+        ]
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert [r.headers["X-Cache"] for r in responses] == ["MISS", "HIT"]
+    assert executor.calls == 1
+    # Each upload still gets its own record
+    assert responses[0].json()["id"] != responses[1].json()["id"]
+    stats = client.get("/api/v1/cache").json()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_transcription_segments_and_locate(client, sample_mp3):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        ids = [
+            client.post(
+                "/api/v1/transcribe",
+                files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+            ).json()["id"]
+            for _ in range(2)
+        ]
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    # The second upload is a cache hit and gets the segments from the cache
+    for transcription_id in ids:
+        url = f"/api/v1/transcriptions/{transcription_id}"
+        segments = client.get(f"{url}/segments").json()
+        assert [(s["start"], s["end"], s["text"]) for s in segments] == [
+            (0.0, 2.5, "stub"),
+            (2.5, 4.0, "transcription"),
+        ]
+    url = f"/api/v1/transcriptions/{ids[0]}"
+    ranged = client.get(f"{url}/segments", params={"start": 3}).json()
+    assert [s["text"] for s in ranged] == ["transcription"]
+    located = client.get(f"{url}/locate", params={"query": "trans"}).json()
+    assert [(s["text"], s["matched"]) for s in located] == [
+        ("transcription", 1)
+    ]
+    missing = "/api/v1/transcriptions/999"
+    assert client.get(f"{missing}/segments").status_code == 404
+    assert client.get(f"{missing}/locate?query=a").status_code == 404
+
+
+def test_upload_decoding_options(client, sample_mp3):
+    executor = StubExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    try:
+        responses = [
+            client.post(
+                "/api/v1/transcribe",
+                files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+                data=data,
+            )
+            for data in (
+                {"language": "english", "beam_size": "3"},
+                {"language": "en", "beam_size": "3"},
+                {"profile": "greedy"},
+            )
+        ]
+        invalid = client.post(
+            "/api/v1/transcribe",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+            data={"language": "klingon"},
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    # Same options, however spelled, share a cache entry; others do not
+    assert [r.headers["X-Cache"] for r in responses] == ["MISS", "HIT", "MISS"]
+    # transcribe_file(registry, path, decoding, content_hash)
+    decoding = executor.args[0][2]
+    assert decoding.language == "en" and decoding.beam_size == 3
+    assert executor.args[1][2].beam_size == 1
+    assert invalid.status_code == 400
+
+
+class StubBatchExecutor(StubExecutor):
+    """Executor answering transcribe_files"""
+
+    async def run(self, fn, registry, paths, *args, cost=None):
+        self.calls += 1
+        self.args.append((registry, paths, *args))
+        self.costs.append(cost)
+        return [("stub transcription", STUB_SEGMENTS)] * len(paths), 0.0, 0.0
+
+
+def test_batch_upload_transcribes_each_audio_once(client, sample_mp3):
+    executor = StubBatchExecutor()
+    app.dependency_overrides[get_inference_executor] = lambda: executor
+    files = [
+        ("audio_files", ("a.mp3", sample_mp3, "audio/mpeg")),
+        ("audio_files", ("notes.txt", b"not audio", "text/plain")),
+        ("audio_files", ("a.mp3", sample_mp3, "audio/mpeg")),
+        ("audio_files", ("bad.mp3", b"broken", "audio/mpeg")),
+    ]
+    try:
+        response = client.post(
+            "/api/v1/transcribe/batch", files=files, data={"beam_size": 2}
+        )
+        again = client.post(
+            "/api/v1/transcribe/batch", files=files[:1], data={"beam_size": 2}
+        )
+    finally:
+        del app.dependency_overrides[get_inference_executor]
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    results = body["results"]
+    assert [r["original_filename"] for r in results] == [
+        "a.mp3",
+        "notes.txt",
+        "a.mp3",
+        "bad.mp3",
+    ]
+    assert [r["transcription"]["filename"] for r in results[::2]] == [
+        "a.mp3",
+        "a_1.mp3",
+    ]
+    assert results[1]["error"] == "File must be an audio file"
+    assert results[3]["error"].startswith("Could not read the audio")
+    # Identical audio is transcribed once, in one call for the whole batch
+    registry, paths, decoding, hashes, _ = executor.args[0]
+    assert len(paths) == 1 and decoding.beam_size == 2
+    assert not any(os.path.exists(path) for path in paths)
+    # and the result cache answers for it afterwards
+    assert again.json()["results"][0]["cached"] is True
+    assert executor.calls == 1
+    transcription_id = results[0]["transcription"]["id"]
+    segments = client.get(
+        f"/api/v1/transcriptions/{transcription_id}/segments"
+    ).json()
+    assert [s["text"] for s in segments] == ["stub", "transcription"]
+
+
+def test_batch_upload_rejects_too_many_files(client, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_UPLOAD_MAX_FILES", 1)
+    response = client.post(
+        "/api/v1/transcribe/batch",
+        files=[
+            ("audio_files", ("a.mp3", b"a", "audio/mpeg")),
+            ("audio_files", ("b.mp3", b"b", "audio/mpeg")),
+        ],
+    )
+    assert response.status_code == 400
+
+
+class StubStreamingRegistry:
+    model_name = "stub"
+    decoding = DecodingOptions()
+
+    def get(self):
+        return self
+
+    def iter_transcribe(
+        self,
+        audio_file,
+        batch_size=None,
+        decoding=None,
+        segments=None,
+        content_hash=None,
+    ):
+        yield "Hello"
+        yield "Hello world"
+        segments.append({"start": 0.5, "end": 1.2, "text": "Hello world"})
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_transcription_sends_partials_then_record(client, sample_mp3):
+    app.dependency_overrides[get_model_registry] = StubStreamingRegistry
+    try:
+        response = client.post(
+            "/api/v1/transcribe/stream",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+        )
+    finally:
+        del app.dependency_overrides[get_model_registry]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == ["partial", "partial", "done"]
+    assert events[1][1]["transcript"] == "Hello world"
+    record = events[2][1]
+    assert record["transcription_content"] == "Hello world"
+    assert record["filename"].endswith(".mp3")
+
+    listing = client.get("/api/v1/transcriptions").json()
+    assert [t["id"] for t in listing] == [record["id"]]
+    segments = client.get(
+        f"/api/v1/transcriptions/{record['id']}/segments"
+    ).json()
+    assert [s["text"] for s in segments] == ["Hello world"]
+
+
+class RecordingStreamingRegistry(StubStreamingRegistry):
+    decodings = []
+
+    def iter_transcribe(self, audio_file, decoding=None, **kwargs):
+        self.decodings.append(decoding)
+        yield from super().iter_transcribe(audio_file, **kwargs)
+
+
+def test_stream_transcription_decoding_options(client, sample_mp3):
+    app.dependency_overrides[get_model_registry] = RecordingStreamingRegistry
+    try:
+        response = client.post(
+            "/api/v1/transcribe/stream",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+            data={"language": "english", "beam_size": "3"},
+        )
+        invalid = client.post(
+            "/api/v1/transcribe/stream",
+            files={"audio_file": ("test.mp3", sample_mp3, "audio/mpeg")},
+            data={"language": "klingon"},
+        )
+    finally:
+        del app.dependency_overrides[get_model_registry]
+
+    assert response.status_code == 200
+    assert [name for name, _ in _parse_sse(response.text)][-1] == "done"
+    [decoding] = RecordingStreamingRegistry.decodings
+    assert decoding.language == "en" and decoding.beam_size == 3
+    assert invalid.status_code == 400
+
+
+def test_stream_transcription_rejects_non_audio(client):
+    response = client.post(
+        "/api/v1/transcribe/stream",
+        files={"audio_file": ("test.txt", b"not audio", "text/plain")},
+    )
+    assert response.status_code == 400
+
+
 def test_upload_valid_mp3(client, sample_mp3):
     response = client.post(
         "/api/v1/transcribe",
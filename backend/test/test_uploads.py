@@ -0,0 +1,44 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from app.core.uploads import UploadTooLargeError, spool_upload
+from fastapi import UploadFile
+
+
+class ThreadRecordingFile(io.BytesIO):
+    """File recording which threads it was read from"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.threads = set()
+
+    def read(self, size=-1):
+        self.threads.add(threading.get_ident())
+        return super().read(size)
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_copies_off_the_event_loop(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 5)
+    source = ThreadRecordingFile(data)
+    path = str(tmp_path / "audio.upload")
+
+    upload = await spool_upload(UploadFile(source), path, max_bytes=0)
+
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert upload.content_hash == hashlib.sha256(data).hexdigest()
+    assert upload.size == len(data)
+    assert threading.get_ident() not in source.threads
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_removes_file_over_the_limit(tmp_path):
+    path = str(tmp_path / "audio.upload")
+
+    with pytest.raises(UploadTooLargeError):
+        await spool_upload(UploadFile(io.BytesIO(b"x" * 10)), path, 9)
+    assert not os.path.exists(path)
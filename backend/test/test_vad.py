@@ -0,0 +1,89 @@
+import numpy as np
+from audio_processor.vad import SpeechGate, SpeechTimeline, VoiceActivityDetector
+
+SR = 16000
+
+
+def _voice(seconds):
+    # Voiced-speech stand-in: a 150Hz harmonic series shaped by two
+    # formant-like peaks, with a syllable-rate envelope
+    t = np.arange(int(seconds * SR)) / SR
+    signal = np.zeros_like(t)
+    for k in range(1, 24):
+        f = 150 * k
+        gain = np.exp(-((f - 700) / 300) ** 2) + 0.6 * np.exp(
+            -((f - 1800) / 400) ** 2
+        )
+        signal += gain * np.sin(2 * np.pi * f * t)
+    envelope = 0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 2 * t))
+    return (0.1 * signal * envelope).astype(np.float32)
+
+
+def _silence(seconds, level=1e-4, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * SR)) * level).astype(np.float32)
+
+
+def test_detects_speech_between_silence():
+    audio = np.concatenate([_silence(3), _voice(2), _silence(4), _voice(1)])
+    regions = VoiceActivityDetector().speech_regions(audio, pad_ms=300)
+
+    assert len(regions) == 2
+    (start1, end1), (start2, end2) = regions
+    # Padded by about 300ms around each burst
+    assert 2.6 * SR <= start1 <= 3.0 * SR
+    assert 5.0 * SR <= end1 <= 5.4 * SR
+    assert 8.6 * SR <= start2 <= 9.0 * SR
+    assert end2 <= len(audio)
+
+
+def test_skips_loud_broadband_noise():
+    rng = np.random.default_rng(1)
+    noise = (rng.standard_normal(5 * SR) * 0.1).astype(np.float32)
+
+    assert VoiceActivityDetector().speech_regions(noise) == []
+
+
+def test_short_pauses_stay_in_one_region():
+    audio = np.concatenate(
+        [_silence(1), _voice(1), _silence(0.4), _voice(1), _silence(2)]
+    )
+    regions = VoiceActivityDetector().speech_regions(
+        audio, min_silence_ms=1000
+    )
+
+    assert len(regions) == 1
+
+
+def test_streaming_matches_whole_array():
+    audio = np.concatenate([_silence(2), _voice(1.5), _silence(3), _voice(2)])
+    vad = VoiceActivityDetector()
+    whole = vad.speech_regions(audio)
+
+    gate = SpeechGate(vad)
+    kept = []
+    for start in range(0, len(audio), 7777):
+        kept.extend(gate.process(audio[start : start + 7777]))
+    kept.extend(gate.flush())
+
+    assert gate.timeline.regions() == whole
+    assert sum(len(k) for k in kept) == gate.speech_samples
+    assert 0 < gate.skipped_fraction < 1
+    # Kept audio is the original samples, untouched
+    start, end = whole[0]
+    np.testing.assert_array_equal(
+        np.concatenate(kept)[: end - start], audio[start:end]
+    )
+
+
+def test_timeline_maps_back_to_original_positions():
+    timeline = SpeechTimeline()
+    timeline.add(1000, 500)
+    timeline.add(1500, 500)
+    timeline.add(9000, 100)
+
+    assert timeline.regions() == [(1000, 2000), (9000, 9100)]
+    assert timeline.to_original(0) == 1000
+    assert timeline.to_original(999) == 1999
+    assert timeline.to_original(1000) == 9000
+    assert timeline.speech_samples == 1100